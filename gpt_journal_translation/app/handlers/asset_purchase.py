@@ -1,14 +1,16 @@
 from fastapi import APIRouter
 from app.schemas import AssetPurchaseRequest
+from app.logging_config import log_request, log_entries
+from app.metrics import entries_per_request
+from app.services.journal_store import get_journal_store
 
 router = APIRouter()
+ROUTE = "/journal/asset_purchase"
 
 @router.post("/asset_purchase")
 def handle_asset(data: AssetPurchaseRequest):
-    print("\n✅ 固定資産購入取引リクエスト受信")
-    print("📅 日付:", data.date)
-    print("🖋 資産名:", data.asset_name)
-    print("📝 概要:", data.summary)
-    for entry in data.entries:
-        print(f"  借方: {entry.debit}, 貸方: {entry.credit}, 金額: {entry.amount}")
-    return {"status": "success", "message": "asset_purchase 取引を正常に受信しました。"}
\ No newline at end of file
+    log_request(ROUTE, "固定資産購入取引リクエスト受信", date=data.date, asset_name=data.asset_name, summary=data.summary, entries=len(data.entries))
+    log_entries(ROUTE, data.entries)
+    entries_per_request.observe(len(data.entries), route=ROUTE)
+    journal_id = get_journal_store().record(data)
+    return {"status": "success", "id": journal_id, "message": "asset_purchase 取引を正常に受信しました。"}
@@ -0,0 +1,124 @@
+import json
+import tempfile
+from typing import Any, List
+
+from fastapi import APIRouter, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from app.handlers import sales, purchase, depreciation, asset_purchase, supplies_purchase
+from app.schemas import journal_request_adapter, BatchItemResult, BatchResponse
+from app.logging_config import log_request
+from app.metrics import validation_failures_total
+from app.services.journal_store import get_journal_store
+
+router = APIRouter()
+NDJSON_COMMIT_SIZE = 500
+# 結果の一時ファイルはこの大きさまでメモリに置き、超えたらディスクに書き出す
+NDJSON_SPOOL_MEMORY = 4 * 1024 * 1024
+
+# type → 単体ルートのハンドラ
+HANDLERS = {
+    "sales": sales.handle_sales,
+    "purchase": purchase.handle_purchase,
+    "depreciation": depreciation.handle_depreciation,
+    "asset_purchase": asset_purchase.handle_asset,
+    "supplies_purchase": supplies_purchase.handle_supplies,
+}
+
+
+def process_item(index: int, raw: Any, route: str = "/journal/batch") -> BatchItemResult:
+    """
+    1件を検証して該当ハンドラに渡す。失敗してもほかの明細は処理を続ける。
+    検証エラーは単体ルートの 422 と同じく route ごとに validation_failures_total に数える。
+    """
+    type_ = raw.get("type") if isinstance(raw, dict) else None
+    try:
+        data = journal_request_adapter.validate_python(raw)
+    except ValidationError as e:
+        validation_failures_total.inc(route=route)
+        return BatchItemResult(index=index, type=type_, status="error", errors=e.errors(include_url=False, include_context=False))
+    try:
+        result = HANDLERS[data.type](data)
+    except Exception as e:
+        return BatchItemResult(index=index, type=data.type, status="error", message=str(e))
+    return BatchItemResult(index=index, type=data.type, status="success", message=result.get("message"))
+
+
+def summarize(results: List[BatchItemResult]) -> BatchResponse:
+    accepted = sum(1 for r in results if r.status == "success")
+    rejected = len(results) - accepted
+    status = "success" if rejected == 0 else ("error" if accepted == 0 else "partial")
+    return BatchResponse(status=status, accepted=accepted, rejected=rejected, results=results)
+
+
+@router.post("/batch", response_model=BatchResponse)
+def handle_batch(items: List[Any]):
+    # オブジェクトでない明細もリクエスト全体の 422 にせず、その明細だけを error にする
+    # 全件を1回のコミットで保存する（失敗した明細だけ取り消される）
+    with get_journal_store().batch():
+        response = summarize([process_item(i, raw) for i, raw in enumerate(items)])
+    log_request("/journal/batch", "一括仕訳リクエスト受信", items=len(items), accepted=response.accepted, rejected=response.rejected)
+    return response
+
+
+def _iter_file(spool, chunk_size=64 * 1024):
+    try:
+        while chunk := spool.read(chunk_size):
+            yield chunk
+    finally:
+        spool.close()
+
+
+@router.post("/batch/ndjson")
+async def handle_batch_ndjson(request: Request):
+    """
+    1行1件の NDJSON を受け取り、読み込んだ行から順に処理して結果も NDJSON で返す。
+    リクエスト全体をメモリに載せないため、大量の取り込みに使う。
+    リクエスト本文はレスポンスを返す前にすべて読み込んで保存し（応答開始後は本文を読めない）、
+    明細ごとの結果は一時ファイル（大きくなるとディスク）に書き出してから返す。
+    SQLite への書き込みはスレッドプールで行い、イベントループを止めない。
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=NDJSON_SPOOL_MEMORY, mode="w+b")
+    counts = {"index": 0, "accepted": 0, "rejected": 0}
+
+    def handle_lines(lines):
+        # NDJSON_COMMIT_SIZE 行ごとに1回コミットする
+        output = []
+        with get_journal_store().batch():
+            for line in lines:
+                try:
+                    result = process_item(counts["index"], json.loads(line), route="/journal/batch/ndjson")
+                except json.JSONDecodeError as e:
+                    validation_failures_total.inc(route="/journal/batch/ndjson")
+                    result = BatchItemResult(index=counts["index"], status="error", message=f"JSONとして読めません: {e}")
+                counts["accepted" if result.status == "success" else "rejected"] += 1
+                counts["index"] += 1
+                output.append(result.model_dump_json(exclude_none=True) + "\n")
+        spool.write("".join(output).encode("utf-8"))
+
+    try:
+        buffer = b""
+        pending = []
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            pending.extend(line for line in lines if line.strip())
+            if len(pending) >= NDJSON_COMMIT_SIZE:
+                await run_in_threadpool(handle_lines, pending)
+                pending = []
+        if buffer.strip():
+            pending.append(buffer)
+        if pending:
+            await run_in_threadpool(handle_lines, pending)
+    except BaseException:
+        spool.close()
+        raise
+
+    log_request("/journal/batch/ndjson", "NDJSON一括仕訳リクエスト受信",
+                items=counts["index"], accepted=counts["accepted"], rejected=counts["rejected"])
+    summary = {"summary": {"accepted": counts["accepted"], "rejected": counts["rejected"]}}
+    spool.write((json.dumps(summary, ensure_ascii=False) + "\n").encode("utf-8"))
+    spool.seek(0)
+    return StreamingResponse(_iter_file(spool), media_type="application/x-ndjson")
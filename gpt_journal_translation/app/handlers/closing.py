@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+from app.schemas import ClosingRequest, ClosingResponse
+from app.logging_config import log_request
+from app.metrics import entries_per_request
+from app.services.closing_run import run_closing
+
+router = APIRouter()
+ROUTE = "/journal/closing"
+
+# 固定資産台帳の全資産について決算の減価償却を一括計上（1回のコミット）
+@router.post("/closing", response_model=ClosingResponse)
+def handle_closing(data: ClosingRequest):
+    response = run_closing(data.closing_date, dry_run=data.dry_run)
+    log_request(
+        ROUTE, "決算の減価償却一括計上リクエスト受信",
+        closing_date=data.closing_date,
+        dry_run=data.dry_run,
+        depreciated=response.depreciated,
+        unchanged=response.unchanged,
+        skipped=response.skipped,
+        total=response.total_depreciation,
+        elapsed_sec=round(response.elapsed_sec, 3),
+    )
+    entries_per_request.observe(response.depreciated, route=ROUTE)
+    return response
@@ -1,25 +1,30 @@
 from fastapi import APIRouter
 from app.schemas import DepreciationRequest
+from app.logging_config import log_request, log_entries
+from app.metrics import entries_per_request
+from app.services.journal_store import get_journal_store
 
 router = APIRouter()
+ROUTE = "/journal/depreciation"
 
 @router.post("/depreciation")
 def handle_depreciation(data: DepreciationRequest):
-    print("\n✅ 減価償却リクエスト受信")
-    print("📅 日付:", data.date)
-    print("📝 概要:", data.summary)
-    print("🧮 償却方法:", data.method)
-    print("📦 取得額:", data.amount)
-    print("📆 取得日:", data.acquisition_date)
-    print("📆 決算日:", data.closing_date)
-    if data.calc_closing_date:
-        print("📆 初年度決算日:", data.calc_closing_date)
-    print("🧾 耐用年数:", data.life)
-    if data.target_year:
-        print("🔍 対象年度:", data.target_year)
-
-    for entry in data.entries:
-        print(f"  借方: {entry.debit}, 貸方: {entry.credit}, 金額: {entry.amount}")
     total = sum(e.amount for e in data.entries)
-    print(f"💰 合計減価償却費（エントリ合計）: {total}")
-    return {"status": "success", "message": "depreciation 取引を正常に受信しました。"}
\ No newline at end of file
+    log_request(
+        ROUTE, "減価償却リクエスト受信",
+        date=data.date,
+        summary=data.summary,
+        method=data.method,
+        amount=data.amount,
+        acquisition_date=data.acquisition_date,
+        closing_date=data.closing_date,
+        calc_closing_date=data.calc_closing_date,
+        life=data.life,
+        target_year=data.target_year,
+        entries=len(data.entries),
+        total=total,  # 合計減価償却費（エントリ合計）
+    )
+    log_entries(ROUTE, data.entries)
+    entries_per_request.observe(len(data.entries), route=ROUTE)
+    journal_id = get_journal_store().record(data)
+    return {"status": "success", "id": journal_id, "message": "depreciation 取引を正常に受信しました。"}
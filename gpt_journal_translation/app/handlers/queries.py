@@ -0,0 +1,34 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from app.services.journal_store import get_journal_store, MAX_PAGE_SIZE
+
+router = APIRouter()
+
+# 日付範囲・タイプで仕訳を取得（next_cursor を cursor に渡すと続きを取得）
+@router.get("/entries")
+def list_entries(
+    start: Optional[str] = Query(None, description="開始日 (YYYY-MM-DD)"),
+    end: Optional[str] = Query(None, description="終了日 (YYYY-MM-DD)"),
+    type: Optional[str] = Query(None, description="取引タイプ"),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+):
+    try:
+        return get_journal_store().list_entries(start=start, end=end, type_=type, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# 勘定科目ごとの明細を取得
+@router.get("/accounts/{account}/lines")
+def list_account_lines(
+    account: str,
+    start: Optional[str] = Query(None, description="開始日 (YYYY-MM-DD)"),
+    end: Optional[str] = Query(None, description="終了日 (YYYY-MM-DD)"),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+):
+    try:
+        return get_journal_store().list_account_lines(account, start=start, end=end, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
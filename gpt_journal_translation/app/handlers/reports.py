@@ -0,0 +1,22 @@
+from typing import Optional
+
+from fastapi import APIRouter, Query
+from app.services.journal_store import get_journal_store
+
+router = APIRouter()
+
+# 試算表（勘定科目・月ごとの残高表から集計する）
+@router.get("/trial_balance")
+def handle_trial_balance(
+    period_from: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="開始月 (YYYY-MM)"),
+    period_to: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="終了月 (YYYY-MM)"),
+):
+    return get_journal_store().trial_balance(period_from=period_from, period_to=period_to)
+
+# 固定資産台帳（as_of までの取得分と減価償却累計額・帳簿価額）
+@router.get("/fixed_assets")
+def handle_fixed_assets(
+    as_of: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="基準日 (YYYY-MM-DD)"),
+):
+    assets = get_journal_store().list_fixed_assets(as_of=as_of)
+    return {"as_of": as_of, "items": assets, "book_value_total": sum(a["book_value"] for a in assets)}
@@ -0,0 +1,86 @@
+# --- 構造化ログ（キュー経由のノンブロッキング出力）---
+#
+# ハンドラからは QueueHandler にログを積むだけにし、標準出力への書き込みは
+# QueueListener の別スレッドで行う。1行1件の JSON で出力する。
+# 明細ごとのログ（journal.entries）は LOG_ENTRY_SAMPLE_RATE の割合だけ出力する。
+
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_ENTRY_SAMPLE_RATE = float(os.getenv("LOG_ENTRY_SAMPLE_RATE", "0.1"))
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        payload.update(getattr(record, "fields", {}) or {})
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """INFO 以下のログを rate の割合だけ通す（WARNING 以上は常に通す）"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+def setup_logging():
+    """アプリ起動時に1回だけ呼ぶ"""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter())
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger("journal")
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(QueueHandler(log_queue))
+    root.propagate = False
+    logging.getLogger("journal.entries").addFilter(SamplingFilter(LOG_ENTRY_SAMPLE_RATE))
+
+
+def shutdown_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+logger = logging.getLogger("journal.api")
+entry_logger = logging.getLogger("journal.entries")
+
+
+def log_request(route: str, message: str, **fields):
+    logger.info(message, extra={"fields": {"route": route, **fields}})
+
+
+def log_entries(route: str, entries):
+    """明細ごとのログ（サンプリング対象）"""
+    for entry in entries:
+        entry_logger.info(
+            "entry",
+            extra={"fields": {"route": route, "debit": entry.debit, "credit": entry.credit, "amount": entry.amount}},
+        )
@@ -1,11 +1,75 @@
-from fastapi import FastAPI
-from app.handlers import sales, purchase, depreciation, asset_purchase, supplies_purchase
+import time
+from contextlib import asynccontextmanager
 
-app = FastAPI()
+from fastapi import FastAPI, Request
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
+from app.handlers import sales, purchase, depreciation, asset_purchase, supplies_purchase, batch, closing, metrics, queries, reports
+from app.logging_config import setup_logging, shutdown_logging
+from app.metrics import requests_total, validation_failures_total, request_duration_seconds
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_logging()
+    yield
+    shutdown_logging()
+
+app = FastAPI(lifespan=lifespan)
 
 # ルーター登録
 app.include_router(sales.router, prefix="/journal")
 app.include_router(purchase.router, prefix="/journal")
 app.include_router(depreciation.router, prefix="/journal")
 app.include_router(asset_purchase.router, prefix="/journal")
-app.include_router(supplies_purchase.router, prefix="/journal")
\ No newline at end of file
+app.include_router(supplies_purchase.router, prefix="/journal")
+app.include_router(batch.router, prefix="/journal")
+app.include_router(closing.router, prefix="/journal")
+app.include_router(queries.router, prefix="/journal")
+app.include_router(reports.router, prefix="/reports")
+app.include_router(metrics.router)
+
+
+def _route_label(request: Request) -> str:
+    """
+    マウントされた完全なパス（"/journal/sales"、"/journal/accounts/{account}/lines"）をラベルにする。
+    ハンドラの ROUTE・log_request と同じ表記にし、メトリクスを同じエンドポイントで突き合わせられるようにする。
+    未定義のパスはまとめる（ラベルの種類が増えすぎないように）。
+    """
+    route = request.scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    if path_format is None:
+        return "unmatched"
+    # include_router の prefix は FastAPI のバージョンによって route.path に含まれないため、
+    # 実際のパスの末尾（パスパラメータを当てはめたもの）より前を prefix とみなす
+    path = request.scope.get("path", "")
+    params = {name: str(value) for name, value in request.scope.get("path_params", {}).items()}
+    try:
+        matched = path_format.format(**params)
+    except (KeyError, IndexError, ValueError):
+        matched = path_format
+    prefix = path[: len(path) - len(matched)] if path.endswith(matched) else ""
+    return request.scope.get("root_path", "") + prefix + path_format
+
+
+# ルートごとのリクエスト数・処理時間を記録
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = _route_label(request)
+        if route != "/metrics":
+            requests_total.inc(route=route, status=status)
+            request_duration_seconds.observe(time.perf_counter() - start, route=route)
+
+
+# 検証エラー（422）の件数を記録してから既定の処理に渡す
+@app.exception_handler(RequestValidationError)
+async def count_validation_errors(request: Request, exc: RequestValidationError):
+    validation_failures_total.inc(route=_route_label(request))
+    return await request_validation_exception_handler(request, exc)
@@ -0,0 +1,85 @@
+# --- Prometheus 形式のメトリクス ---
+#
+# 追加の依存を増やさないよう、カウンタとヒストグラムだけを自前で実装する。
+# /metrics で Prometheus のテキスト形式（version 0.0.4）を返す。
+
+import threading
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+ENTRY_BUCKETS = (1, 2, 3, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_):
+        self.name = name
+        self.help = help_
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(dict(key))} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_, buckets):
+        self.name = name
+        self.help = help_
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                labels = dict(key)
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_labels({**labels, 'le': bound})} {count}")
+                lines.append(f"{self.name}_bucket{_labels({**labels, 'le': '+Inf'})} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(labels)} {series[-2]}")
+                lines.append(f"{self.name}_count{_labels(labels)} {series[-1]}")
+        return lines
+
+
+requests_total = Counter("journal_requests_total", "ルート・ステータス別のリクエスト数")
+validation_failures_total = Counter("journal_validation_failures_total", "ルート別の検証エラー数")
+request_duration_seconds = Histogram("journal_request_duration_seconds", "ルート別の処理時間（秒）", LATENCY_BUCKETS)
+entries_per_request = Histogram("journal_entries_per_request", "1リクエストあたりの明細数", ENTRY_BUCKETS)
+
+REGISTRY = [requests_total, validation_failures_total, request_duration_seconds, entries_per_request]
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
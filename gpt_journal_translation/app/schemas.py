@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional, Literal
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import List, Optional, Literal, Union, Annotated
 
 class Entry(BaseModel):
     debit: str
@@ -36,6 +36,9 @@ class AssetPurchaseRequest(BaseModel):
     summary: str
     asset_name: str
     amount: float
+    # 固定資産台帳で決算時に減価償却するための項目（わかる場合だけ）
+    method: Optional[str] = None
+    life: Optional[int] = None
     entries: List[Entry]
 
 class DepreciationRequest(BaseModel):
@@ -52,4 +55,46 @@ class DepreciationRequest(BaseModel):
     target_year: Optional[str] = None
     current_volume: Optional[float] = None
     total_volume: Optional[float] = None
-    entries: List[Entry]
\ No newline at end of file
+    entries: List[Entry]
+
+# type で判別する仕訳リクエスト（/journal/batch 用）
+JournalRequest = Annotated[
+    Union[SalesRequest, PurchaseRequest, SuppliesPurchaseRequest, AssetPurchaseRequest, DepreciationRequest],
+    Field(discriminator="type"),
+]
+journal_request_adapter = TypeAdapter(JournalRequest)
+
+class BatchItemResult(BaseModel):
+    index: int
+    type: Optional[str] = None
+    status: Literal["success", "error"]
+    message: Optional[str] = None
+    errors: Optional[list] = None
+
+class BatchResponse(BaseModel):
+    status: Literal["success", "partial", "error"]
+    accepted: int
+    rejected: int
+    results: List[BatchItemResult]
+
+# 決算の減価償却一括計上（/journal/closing 用）
+class ClosingRequest(BaseModel):
+    closing_date: str = Field(pattern=r"^\d{4}-\d{2}-\d{2}$")
+    dry_run: bool = False
+
+class SkippedAsset(BaseModel):
+    asset_id: int
+    asset_name: str
+    reason: str
+
+class ClosingResponse(BaseModel):
+    status: Literal["success", "partial"]  # partial: 計上できない資産がある
+    closing_date: str
+    dry_run: bool
+    depreciated: int
+    unchanged: int
+    skipped: int
+    total_depreciation: float
+    elapsed_sec: float
+    entries: List[DepreciationRequest]
+    skipped_assets: List[SkippedAsset]
@@ -0,0 +1,230 @@
+# --- 画像フォルダの一括取り込み（バッチモード）---
+#
+# 使い方（プロジェクト直下で実行）:
+#   python -m app.services.batch_ingest "slips/*.jpg" --report review.json
+#   python -m app.services.batch_ingest slips/ --ocr-concurrency 4 --gpt-concurrency 4
+#   python -m app.services.batch_ingest --apply review.json   # 確認後にスプレッドシートへ記入
+#
+# OCR → GPT → 日付補完・減価償却費計算 → FastAPI送信 をステージごとの同時実行数で
+# 並列に処理し、ネットワーク待ちを重ねる。カメラモードの Y/N 確認の代わりに
+# レビュー用レポート（JSON）を出力する。
+# 1枚に複数の取引がある画像は取引ごとに分け、GPT はまとめて1回、FastAPI は /journal/batch で送る。
+
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from app.services import journal_entry
+from app.services.vision_ocr import MAX_IMAGES_PER_REQUEST, NO_TEXT
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+
+def collect_image_paths(targets) -> list:
+    """フォルダ・glob・ファイルパスを画像パスの一覧に展開する"""
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            candidates = [os.path.join(target, name) for name in os.listdir(target)]
+        else:
+            candidates = glob.glob(target, recursive=True)
+        paths.extend(p for p in candidates if p.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(p))
+    return sorted(set(paths))
+
+
+class BatchPipeline:
+    """ステージごとにセマフォで同時実行数を制限したパイプライン"""
+
+    def __init__(self, ocr_concurrency=4, gpt_concurrency=4, api_concurrency=8, ocr_batch_size=MAX_IMAGES_PER_REQUEST, use_gpt_cache=True):
+        self.use_gpt_cache = use_gpt_cache
+        self.ocr_batch_size = max(1, min(ocr_batch_size, MAX_IMAGES_PER_REQUEST))
+        self.limits = {"ocr": ocr_concurrency, "gpt": gpt_concurrency, "api": api_concurrency}
+        self._stages = {name: threading.BoundedSemaphore(n) for name, n in self.limits.items()}
+
+    def _stage(self, name, item, func, *args):
+        start = time.perf_counter()
+        with self._stages[name]:
+            item["timings"][f"{name}_wait"] = round(time.perf_counter() - start, 3)
+            start = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                item["timings"][name] = round(time.perf_counter() - start, 3)
+
+    def _ocr_chunk(self, chunk) -> list:
+        """画像をまとめて batch_annotate_images に送る（画像は塊ごとに読み込む）"""
+        import cv2
+
+        items, frames = [], []
+        for item in chunk:
+            frame = cv2.imread(item["file"])
+            if frame is None:
+                item["status"] = "image_error"
+                continue
+            items.append(item)
+            frames.append(frame)
+        if not frames:
+            return items
+
+        start = time.perf_counter()
+        with self._stages["ocr"]:
+            wait = round(time.perf_counter() - start, 3)
+            start = time.perf_counter()
+            texts = journal_entry.extract_texts_from_frames(frames)
+            elapsed = round(time.perf_counter() - start, 3)
+        for item, text in zip(items, texts):
+            item["timings"]["ocr_wait"] = wait
+            item["timings"]["ocr"] = elapsed
+            item["ocr_text"] = text
+        return items
+
+    def process(self, item) -> dict:
+        try:
+            ocr_text = item.get("ocr_text")
+            if not ocr_text or ocr_text == NO_TEXT:
+                item["status"] = "ocr_empty"
+                return item
+
+            segments = journal_entry.split_ocr_text(ocr_text)
+            if len(segments) > 1:
+                return self._process_multi(item, segments)
+
+            gpt_data = self._stage("gpt", item, journal_entry.build_journal_proposal, ocr_text, self.use_gpt_cache)
+            if gpt_data is None:
+                item["status"] = "gpt_error"
+                return item
+            item["journal"] = gpt_data
+            item["transaction"] = journal_entry.convert_gpt_entries_to_transaction(gpt_data)
+
+            sent = self._stage("api", item, journal_entry.send_to_fastapi, gpt_data.get("type"), gpt_data)
+            item["status"] = "ok" if sent else "api_error"
+            item["approved"] = sent
+        except Exception as e:
+            item["status"] = "error"
+            item["error"] = str(e)
+        return item
+
+    def _process_multi(self, item, segments) -> dict:
+        """1枚に複数の取引がある画像（GPT はまとめて抽出し、FastAPI には /journal/batch で送る）"""
+        journals = self._stage("gpt", item, journal_entry.build_journal_proposals, segments, self.use_gpt_cache)
+        journals = [journal for journal in journals if journal is not None]
+        item["segments"] = len(segments)
+        if not journals:
+            item["status"] = "gpt_error"
+            return item
+        item["journals"] = journals
+        item["transactions"] = [journal_entry.convert_gpt_entries_to_transaction(journal) for journal in journals]
+
+        result = self._stage("api", item, journal_entry.send_batch_to_fastapi, journals)
+        # 取引がすべて仕訳になり、すべて受理された時だけ ok・承認済みにする（状態と承認は同じ件数で判定する）
+        accepted = result.get("accepted", 0)
+        complete = accepted == len(segments)
+        item["status"] = "ok" if complete else ("partial" if accepted else "api_error")
+        item["approved"] = complete
+        return item
+
+    def run(self, paths) -> list:
+        items = [{"file": path, "status": "pending", "approved": False, "timings": {}} for path in paths]
+        # OCR と GPT 以降は別のスレッドプールで動かす（待機中の OCR の塊が GPT・API のスレッドを塞がないように）
+        ocr_workers = max(1, self.limits["ocr"])
+        downstream_workers = max(1, self.limits["gpt"] + self.limits["api"])
+        with ThreadPoolExecutor(max_workers=ocr_workers, thread_name_prefix="ocr") as ocr_executor, \
+                ThreadPoolExecutor(max_workers=downstream_workers, thread_name_prefix="process") as executor:
+            ocr_jobs = {}
+            for i in range(0, len(items), self.ocr_batch_size):
+                chunk = items[i:i + self.ocr_batch_size]
+                ocr_jobs[ocr_executor.submit(self._ocr_chunk, chunk)] = chunk
+
+            # OCRが終わった塊から GPT 以降へ流す
+            downstream = []
+            for job in as_completed(ocr_jobs):
+                try:
+                    readable = job.result()
+                except Exception as e:
+                    for item in ocr_jobs[job]:
+                        item["status"] = "ocr_error"
+                        item["error"] = str(e)
+                    continue
+                downstream.extend(executor.submit(self.process, item) for item in readable)
+            for job in downstream:
+                job.result()
+        return items
+
+
+def write_report(items, report_path, elapsed):
+    counts = {}
+    for item in items:
+        counts[item["status"]] = counts.get(item["status"], 0) + 1
+    report = {
+        "summary": {
+            "total": len(items),
+            "elapsed_sec": round(elapsed, 2),
+            "status_counts": counts,
+            "stages": journal_entry.profiler.summary(),
+        },
+        "items": items,
+    }
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+def apply_report(report_path):
+    """レポートで approved: true の取引だけをスプレッドシートに記入する"""
+    with open(report_path, encoding="utf-8") as f:
+        report = json.load(f)
+    writer = journal_entry.get_sheets_writer()
+    queued = 0
+    for item in report["items"]:
+        if not item.get("approved"):
+            continue
+        # 複数の取引がある画像は transactions にまとめて入っている
+        for transaction in item.get("transactions") or ([item["transaction"]] if item.get("transaction") else []):
+            writer.enqueue(transaction)
+            queued += 1
+    try:
+        writer.flush()
+    except Exception as e:
+        print(f"⚠️ スプレッドシートへの書き込みに失敗しました: {e}")
+        return
+    print(f"✅ {queued}件の仕訳をスプレッドシートに記入しました。")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="画像フォルダを一括で仕訳化する")
+    parser.add_argument("targets", nargs="*", help="画像フォルダ・globパターン・画像ファイル")
+    parser.add_argument("--report", default="batch_review.json", help="レビュー用レポートの出力先")
+    parser.add_argument("--ocr-concurrency", type=int, default=4)
+    parser.add_argument("--gpt-concurrency", type=int, default=4)
+    parser.add_argument("--api-concurrency", type=int, default=8)
+    parser.add_argument("--ocr-batch-size", type=int, default=MAX_IMAGES_PER_REQUEST, help="1回のVisionリクエストで送る画像数")
+    parser.add_argument("--no-gpt-cache", action="store_true", help="GPT応答キャッシュを使わずに再問い合わせする")
+    parser.add_argument("--apply", metavar="REPORT", help="確認済みレポートの approved な仕訳をスプレッドシートに記入する")
+    args = parser.parse_args(argv)
+
+    if args.apply:
+        apply_report(args.apply)
+        return
+
+    paths = collect_image_paths(args.targets)
+    if not paths:
+        parser.error("処理対象の画像が見つかりません。")
+    print(f"📂 {len(paths)}件の画像を処理します。")
+
+    start = time.perf_counter()
+    pipeline = BatchPipeline(args.ocr_concurrency, args.gpt_concurrency, args.api_concurrency, args.ocr_batch_size,
+                             use_gpt_cache=not args.no_gpt_cache)
+    items = pipeline.run(paths)
+    report = write_report(items, args.report, time.perf_counter() - start)
+
+    print(f"📊 処理結果: {report['summary']}")
+    print(f"📝 レビュー用レポート: {args.report}")
+    print("➡️ 内容を確認し approved を調整してから --apply でスプレッドシートに記入してください。")
+
+
+if __name__ == "__main__":
+    main()
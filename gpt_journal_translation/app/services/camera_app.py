@@ -0,0 +1,208 @@
+# --- カメラ撮影の操作画面（CLI）---
+#
+# 使い方（プロジェクト直下で実行）:
+#   python -m app.services.camera_app            # 's' キーで撮影
+#   python -m app.services.camera_app --auto     # 書類が静止したら自動撮影
+#
+# カメラのプレビュー・キー操作・レビューキューを扱う。仕訳を作る処理そのものは
+# app.services.journal_entry にあり、こちらはカメラを使う時だけ読み込む
+# （journal_entry を import してもカメラや cv2 は起動・読み込みされない）。
+
+import argparse
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from app.services import journal_entry
+from app.services.capture_worker import CaptureWorker, ReviewQueue
+from app.services.document_capture import AutoCapture
+
+CAPTURE_WORKERS = int(os.getenv("CAPTURE_WORKERS", "2"))
+CAPTURE_QUEUE_SIZE = int(os.getenv("CAPTURE_QUEUE_SIZE", "8"))
+# 自動撮影（'c' キーでも切り替え可能）
+AUTO_CAPTURE = os.getenv("AUTO_CAPTURE", "0") == "1"
+
+
+def create_auto_capture() -> AutoCapture:
+    return AutoCapture(
+        min_sharpness=float(os.getenv("AUTO_CAPTURE_MIN_SHARPNESS", "100")),
+        stable_frames=int(os.getenv("AUTO_CAPTURE_STABLE_FRAMES", "8")),
+        max_motion=float(os.getenv("AUTO_CAPTURE_MAX_MOTION", "0.01")),
+        min_area_ratio=float(os.getenv("AUTO_CAPTURE_MIN_AREA", "0.2")),
+        analysis_width=int(os.getenv("AUTO_CAPTURE_ANALYSIS_WIDTH", "480")),
+    )
+
+
+def format_proposal(item: dict) -> str:
+    transaction = item["transaction"]
+    debit = " / ".join(f"{e['account']} {e['amount']}" for e in transaction["debit_entries"])
+    credit = " / ".join(f"{e['account']} {e['amount']}" for e in transaction["credit_entries"])
+    return f"#{item['id']} {transaction['date']} {transaction['summary']}｜借方: {debit}｜貸方: {credit}"
+
+
+def print_review_queue(review_queue: ReviewQueue):
+    items = review_queue.pending()
+    print(f"\n📋 レビュー待ち {len(items)}件（'a' ですべて承認、'x' ですべて却下）")
+    for item in items:
+        print("  " + format_proposal(item))
+
+
+def write_approved(items: list):
+    """承認された取引を FastAPI に送り、受理された取引をスプレッドシートに記入する"""
+    try:
+        journal_entry.record_approved_proposals(items)
+    except Exception as e:
+        print(f"⚠️ 承認した仕訳の送信・記入に失敗しました: {e}")
+
+
+def review_in_terminal(review_queue: ReviewQueue):
+    """終了時に残ったレビュー待ちを端末で1件ずつ確認する（A ですべて承認、Q で残りを却下）"""
+    approved = []
+    for item in review_queue.pending():
+        print("\n" + format_proposal(item))
+        answer = input("📌 この内容をスプレッドシートに記入しますか？ [Y/N/A/Q]: ").strip().lower()
+        if answer == "a":
+            approved.extend(review_queue.approve())
+            break
+        if answer == "q":
+            review_queue.reject()
+            break
+        if answer == "y":
+            approved.extend(review_queue.approve({item["id"]}))
+        else:
+            review_queue.reject({item["id"]})
+    write_approved(approved)
+
+
+def draw_status(frame, status: dict):
+    # cv2.putText は日本語を描けないため英字で表示する
+    text = f"queued:{status['queued']} processing:{status['processing']} review:{status['review']} failed:{status['failed']}"
+    cv2.putText(frame, text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 4, cv2.LINE_AA)
+    cv2.putText(frame, text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2, cv2.LINE_AA)
+    cv2.putText(frame, "s:capture  c:auto  r:list  a:approve all  x:reject all  ESC:quit", (10, frame.shape[0] - 15),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 255, 255), 1, cv2.LINE_AA)
+
+
+def draw_auto_capture(frame, state: dict, auto_capture: AutoCapture, fps: float):
+    if state["quad"] is not None:
+        # 緑: 撮影条件を満たした / 黄: ピント・静止待ち
+        color = (0, 255, 0) if state["ready"] or state["stable"] else (0, 255, 255)
+        cv2.polylines(frame, [state["quad"].astype(np.int32)], True, color, 2)
+    text = (f"auto sharp:{state['sharpness']:.0f}/{auto_capture.min_sharpness:.0f} "
+            f"stable:{state['stable']}/{auto_capture.stable_frames} "
+            f"check:{auto_capture.analysis_ms:.1f}ms fps:{fps:.0f}")
+    if not state["armed"]:
+        text += " (remove document)"
+    cv2.putText(frame, text, (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 4, cv2.LINE_AA)
+    cv2.putText(frame, text, (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2, cv2.LINE_AA)
+
+
+# === メインループ ===
+# カメラ起動・白枠描画・キー操作ループを統合
+# 撮影した書類はバックグラウンドで処理し、プレビューは止めない
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="カメラで書類を撮影して仕訳にする")
+    parser.add_argument("--camera", type=int, default=0, help="cv2.VideoCapture に渡すカメラ番号")
+    parser.add_argument("--auto", action="store_true", default=AUTO_CAPTURE, help="自動撮影で開始する")
+    args = parser.parse_args(argv)
+
+    print("📷 カメラを起動中... (ESCキーで終了、's'キーで撮影、'r'でレビュー一覧、'a'ですべて承認、'x'ですべて却下)")
+
+    review_queue = ReviewQueue()
+    worker = CaptureWorker(journal_entry.prepare_journal_proposals, review_queue,
+                           workers=CAPTURE_WORKERS, max_pending=CAPTURE_QUEUE_SIZE)
+    writers = []
+    auto_capture = create_auto_capture()
+    auto_mode = args.auto
+    fps = 0.0
+    last_frame_at = time.perf_counter()
+    cap = cv2.VideoCapture(args.camera)
+
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            print("❌ カメラからフレームを取得できませんでした。")
+            break
+
+        now = time.perf_counter()
+        fps = fps * 0.9 + 0.1 / max(now - last_frame_at, 1e-6) if fps else 1 / max(now - last_frame_at, 1e-6)
+        last_frame_at = now
+
+        # 自動撮影: 書類が検出され、ピントが合って静止したら台形補正して処理待ちに追加
+        if auto_mode:
+            state, document = auto_capture.update(frame)
+            if document is not None:
+                capture_id = worker.submit(document)
+                if capture_id:
+                    print(f"📸 書類を自動撮影しました（#{capture_id}、ピント {state['sharpness']:.0f}）。")
+                else:
+                    print("⚠️ 処理待ちがいっぱいのため自動撮影をスキップしました。")
+
+        height, width, _ = frame.shape
+        # 中央90%の範囲を計算
+        box_width = int(width * 0.8)  # ←ここを変更することで撮影する範囲を設定できる
+        box_height = int(height * 0.8)
+        start_x = (width - box_width) // 2
+        start_y = (height - box_height) // 2
+        end_x = start_x + box_width
+        end_y = start_y + box_height
+
+        # 枠を描く前に切り出しておく（ワーカーに渡すのでコピーする）
+        cropped_frame = frame[start_y:end_y, start_x:end_x].copy()
+
+        # 白枠の描画（自動撮影中は検出した書類の枠を描く）
+        if auto_mode:
+            draw_auto_capture(frame, state, auto_capture, fps)
+        else:
+            cv2.rectangle(frame, (start_x, start_y), (end_x, end_y), (255, 255, 255), 2)
+        draw_status(frame, worker.status())
+        # フレームを表示
+        cv2.imshow("Camera", frame)
+
+        # キー操作を取得
+        key = cv2.waitKey(1)
+        # 's'キーで撮影（OCR→GPT処理はワーカーで行う）
+        if key == ord('s'):
+            capture_id = worker.submit(cropped_frame)
+            if capture_id:
+                print(f"📸 撮影 #{capture_id} を処理待ちに追加しました。")
+            else:
+                print("⚠️ 処理待ちがいっぱいです。少し待ってから撮影してください。")
+        elif key == ord('r'):
+            print_review_queue(review_queue)
+        elif key == ord('a'):
+            items = review_queue.approve()
+            print(f"✅ {len(items)}件を承認しました。FastAPIに送信してスプレッドシートに記入します。")
+            thread = threading.Thread(target=write_approved, args=(items,), daemon=True)
+            thread.start()
+            writers.append(thread)
+        elif key == ord('x'):
+            print(f"🛑 {len(review_queue.reject())}件を却下しました。")
+        elif key == ord('c'):
+            auto_mode = not auto_mode
+            print("🤖 自動撮影を開始しました。" if auto_mode else "✋ 自動撮影を停止しました（'s' で手動撮影）。")
+
+        if key == 27:
+            break
+
+    cap.release()
+    cv2.destroyAllWindows()
+
+    status = worker.status()
+    if status["queued"] or status["processing"]:
+        print(f"⏳ 処理中の撮影（{status['queued'] + status['processing']}件）が終わるのを待っています...")
+    worker.close()
+    for thread in writers:
+        thread.join()
+    if len(review_queue):
+        review_in_terminal(review_queue)
+    print(f"📊 レビュー: {review_queue.stats()}")
+    journal_entry.print_session_stats()
+
+
+if __name__ == "__main__":
+    main()
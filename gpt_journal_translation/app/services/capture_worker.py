@@ -0,0 +1,149 @@
+# --- カメラ撮影のバックグラウンド処理とレビューキュー ---
+#
+# 's' キーで撮影したフレームを CaptureWorker のキューに積み、ワーカースレッドで
+# OCR → GPT を行う。カメラのプレビューは処理を待たずに更新を続ける。
+# できあがった仕訳の提案は ReviewQueue に溜まり、操作者がまとめて承認・却下する
+# （承認した取引だけを FastAPI に送り、スプレッドシートに記入する。却下した取引はどこにも保存しない）。
+
+import itertools
+import queue
+import threading
+import time
+
+
+class ReviewQueue:
+    """スプレッドシートに記入する前の仕訳提案（承認待ち）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = []
+        self.approved = 0
+        self.rejected = 0
+
+    def add(self, item: dict):
+        with self._lock:
+            self._items.append(item)
+
+    def pending(self) -> list:
+        with self._lock:
+            return list(self._items)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def _take(self, ids=None) -> list:
+        with self._lock:
+            taken = [item for item in self._items if ids is None or item["id"] in ids]
+            self._items = [item for item in self._items if ids is not None and item["id"] not in ids]
+            return taken
+
+    def approve(self, ids=None) -> list:
+        """ids（省略時はすべて）を承認し、承認した提案を返す"""
+        items = self._take(ids)
+        with self._lock:
+            self.approved += len(items)
+        return items
+
+    def reject(self, ids=None) -> list:
+        items = self._take(ids)
+        with self._lock:
+            self.rejected += len(items)
+        return items
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"pending": len(self._items), "approved": self.approved, "rejected": self.rejected}
+
+
+class CaptureWorker:
+    """
+    撮影フレームをワーカースレッドで処理する。
+
+    - process(frame) は提案（dict）のリストを返す関数（journal_entry.prepare_journal_proposals）
+      1枚に複数の取引があれば、撮影番号に枝番を付けて（例: 3-1, 3-2）取引ごとにレビュー待ちに追加する
+    - キューが max_pending 件で埋まっている時は submit() が 0 を返す（プレビューは止めない）
+    - 処理中・待ち件数は status() でプレビューに表示できる
+    """
+
+    def __init__(self, process, review_queue, workers=2, max_pending=8):
+        self.process = process
+        self.review_queue = review_queue
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._in_progress = 0
+        self.completed = 0
+        self.failed = 0
+        self._threads = [
+            threading.Thread(target=self._run, name=f"capture-worker-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, frame) -> int:
+        """フレームをキューに積み、撮影番号を返す（満杯なら 0）"""
+        with self._lock:
+            if self._queue.full():
+                return 0
+            capture_id = next(self._ids)
+        self._queue.put_nowait((capture_id, frame, time.time()))
+        return capture_id
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                self._queue.task_done()
+                return
+            capture_id, frame, captured_at = job
+            with self._lock:
+                self._in_progress += 1
+            try:
+                proposals = self.process(frame)
+                if not proposals:
+                    with self._lock:
+                        self.failed += 1
+                    print(f"⚠️ 撮影 #{capture_id} は仕訳にできませんでした。")
+                else:
+                    for n, proposal in enumerate(proposals, 1):
+                        item_id = capture_id if len(proposals) == 1 else f"{capture_id}-{n}"
+                        self.review_queue.add({"id": item_id, "captured_at": captured_at, **proposal})
+                    with self._lock:
+                        self.completed += 1
+                    print(f"📥 撮影 #{capture_id} の仕訳 {len(proposals)}件をレビュー待ちに追加しました（{len(self.review_queue)}件）。")
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                print(f"❌ 撮影 #{capture_id} の処理に失敗しました: {e}")
+            finally:
+                with self._lock:
+                    self._in_progress -= 1
+                self._queue.task_done()
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "processing": self._in_progress,
+                "completed": self.completed,
+                "failed": self.failed,
+                "review": len(self.review_queue),
+            }
+
+    def close(self, wait=True):
+        """待ち行列の撮影を処理し終えてからワーカーを止める"""
+        if wait:
+            self._queue.join()
+        else:
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._queue.task_done()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=5 if wait else 0)
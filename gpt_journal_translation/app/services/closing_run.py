@@ -0,0 +1,150 @@
+# --- 決算の減価償却一括計上（固定資産台帳から）---
+#
+# 固定資産台帳（journal_store の fixed_assets：asset_purchase の仕訳から登録）の全資産について、
+# 決算日 closing_date の事業年度の減価償却費を1回の走査で計算し、
+# 資産ごとの DepreciationRequest（貸方は「{asset_name}減価償却累計額」）を1回のコミットで保存する。
+#   - 初年度の決算日は closing_date と同じ月日で、取得日以後の最初の日
+#   - 償却方法・取得価額・耐用年数・初年度の月数が同じ資産は償却表を1回だけ計算して使い回す
+#   - 同じ決算日に計上済みの資産・償却済みの資産・土地は計上しない（何度実行しても二重計上しない）
+#     写真から保存した減価償却の仕訳も journal_store が台帳に計上済みとして記録するため、二重に計上しない
+#   - 償却方法・耐用年数が台帳にない資産は skipped_assets に理由を付けて返す
+# 写真を撮らず、Selenium も使わないため、数百件の資産でも数秒かからない。
+#
+# 使い方（プロジェクト直下で実行）:
+#   python -m app.services.closing_run 2025-03-31 --dry-run   # 計上せずに結果だけ確認する
+#   python -m app.services.closing_run 2025-03-31 --sheets    # 計上して仕訳帳（スプレッドシート）にも書き込む
+# JOURNAL_DISPATCH_MODE=http なら FastAPI の /journal/closing に、inprocess なら同じプロセスで実行する。
+
+import argparse
+import time
+from contextlib import nullcontext
+
+from app.schemas import ClosingResponse, DepreciationRequest
+from app.services.depreciation_engine import SUPPORTED_METHODS, _add_years, _parse_date, build_depreciation_schedule, first_year_months
+from app.services.journal_store import ACCUMULATED_DEPRECIATION, get_journal_store
+
+# 減価償却しない資産
+NON_DEPRECIABLE_ASSETS = ("土地", "建設仮勘定")
+
+
+def first_closing_date(acquisition_date, closing_date) -> str:
+    """closing_date と同じ月日で、取得日以後の最初の決算日（初年度の決算日）"""
+    acquired = _parse_date(acquisition_date)
+    closing = _parse_date(closing_date)
+    years = closing.year - acquired.year
+    if _add_years(closing, -years) < acquired:
+        years -= 1
+    return _add_years(closing, -years).isoformat()
+
+
+def build_closing_entries(assets: list, closing_date: str) -> tuple:
+    """
+    台帳の資産（list_fixed_assets の行）から closing_date の減価償却の仕訳を作る。
+    (計上する [(asset_id, DepreciationRequest)], 計上しない資産の数, 計上できない資産のリスト) を返す。
+    """
+    schedules = {}
+    entries, skipped = [], []
+    unchanged = 0
+    for asset in assets:
+        name = asset["asset_name"]
+        if asset["last_closing_date"] == closing_date or name in NON_DEPRECIABLE_ASSETS:
+            unchanged += 1
+            continue
+        method, life = asset["method"], asset["life"]
+        if method not in SUPPORTED_METHODS or method == "生産高比例法" or not life:
+            reason = "償却方法・耐用年数が台帳にありません" if not (method and life) else f"一括計上できない償却方法です: {method}"
+            skipped.append({"asset_id": asset["id"], "asset_name": name, "reason": reason})
+            continue
+
+        calc_closing_date = first_closing_date(asset["acquisition_date"], closing_date)
+        try:
+            key = (method, asset["amount"], life, first_year_months(asset["acquisition_date"], calc_closing_date))
+            if key not in schedules:
+                schedule = build_depreciation_schedule(asset["acquisition_date"], calc_closing_date, method, asset["amount"], life)
+                schedules[key] = [row["depreciation"] for row in schedule]
+        except ValueError as e:
+            skipped.append({"asset_id": asset["id"], "asset_name": name, "reason": str(e)})
+            continue
+
+        # 償却表の何年目か（初年度の決算日から closing_date までの年数）
+        year_index = _parse_date(closing_date).year - _parse_date(calc_closing_date).year
+        amounts = schedules[key]
+        if year_index >= len(amounts) or amounts[year_index] <= 0:
+            unchanged += 1  # 償却済み（備忘価額のみ）
+            continue
+
+        entries.append((asset["id"], DepreciationRequest(
+            type="depreciation",
+            date=closing_date,
+            summary=f"{name}の減価償却（{asset['summary']}）" if asset["summary"] else f"{name}の減価償却",
+            asset_name=name,
+            acquisition_date=asset["acquisition_date"],
+            closing_date=calc_closing_date,
+            calc_closing_date=calc_closing_date,
+            method=method,
+            amount=asset["amount"],
+            life=life,
+            target_year=closing_date,
+            entries=[{"debit": "減価償却費", "credit": ACCUMULATED_DEPRECIATION, "amount": amounts[year_index]}],
+        )))
+    return entries, unchanged, skipped
+
+
+def run_closing(closing_date: str, dry_run: bool = False, store=None) -> ClosingResponse:
+    """固定資産台帳の全資産について closing_date の減価償却を計上する（dry_run なら保存しない）"""
+    start = time.perf_counter()
+    store = store or get_journal_store()
+    # 台帳の読み取りから計上までを1つのトランザクションにし、途中で保存された減価償却と二重にしない
+    with store.batch() if not dry_run else nullcontext():
+        assets = store.list_fixed_assets(as_of=closing_date)
+        entries, unchanged, skipped = build_closing_entries(assets, closing_date)
+        if not dry_run:
+            for asset_id, data in entries:
+                store.record_depreciation(asset_id, closing_date, data)
+
+    return ClosingResponse(
+        status="partial" if skipped else "success",
+        closing_date=closing_date,
+        dry_run=dry_run,
+        depreciated=len(entries),
+        unchanged=unchanged,
+        skipped=len(skipped),
+        total_depreciation=sum(data.entries[0].amount for _, data in entries),
+        elapsed_sec=time.perf_counter() - start,
+        entries=[data for _, data in entries],
+        skipped_assets=skipped,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="固定資産台帳の全資産について決算の減価償却を一括計上する")
+    parser.add_argument("closing_date", help="決算日 (YYYY-MM-DD)")
+    parser.add_argument("--dry-run", action="store_true", help="計上せずに計算結果だけ表示する")
+    parser.add_argument("--sheets", action="store_true", help="計上した仕訳を仕訳帳（スプレッドシート）にも書き込む")
+    args = parser.parse_args(argv)
+
+    # .env の読み込みと送信クライアントは journal_entry のものを使う
+    from app.services import journal_entry
+
+    result = journal_entry.get_journal_client().close_period(args.closing_date, dry_run=args.dry_run)
+    if result.get("status") == "error":
+        print(f"❌ 決算の減価償却を計上できませんでした: {result.get('message') or result.get('skipped_assets')}")
+    for entry in result.get("entries", []):
+        print(f"🧾 {entry['summary']}（取得 {entry['acquisition_date']}・{entry['method']}・{entry['life']}年）:"
+              f" {entry['entries'][0]['amount']:,.0f}円")
+    for asset in result.get("skipped_assets", []):
+        print(f"⚠️ 台帳ID {asset['asset_id']} {asset['asset_name']}: {asset['reason']}")
+    mode = "（dry-run・未計上）" if args.dry_run else ""
+    print(f"📊 {args.closing_date} 決算: 計上 {result.get('depreciated', 0)}件 / 計上済み・償却済み {result.get('unchanged', 0)}件"
+          f" / 計上できない {result.get('skipped', 0)}件 / 減価償却費 合計 {result.get('total_depreciation', 0):,.0f}円"
+          f"（{result.get('elapsed_sec', 0):.2f}秒）{mode}")
+
+    if args.sheets and not args.dry_run and result.get("entries"):
+        for entry in result["entries"]:
+            journal_entry.append_multi_entry_transaction(journal_entry.convert_gpt_entries_to_transaction(entry))
+        journal_entry.get_sheets_writer().flush()
+        print(f"📊 仕訳帳に {len(result['entries'])}件を書き込みました")
+
+
+if __name__ == "__main__":
+    main()
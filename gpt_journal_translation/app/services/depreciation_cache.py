@@ -0,0 +1,144 @@
+# --- 減価償却表のキャッシュ（メモリLRU + SQLite）---
+#
+# 償却表は (取得日, 初年度決算日, 償却方法, 取得価額, 耐用年数, 当期生産量, 総生産量)
+# が同じであれば変わらないため、表全体を保存しておき、翌年以降の決算や
+# 同じ書類の再スキャンでは計算・スクレイピングを行わずに返す。
+# 鍵には計算方法のバージョンを含めるため、計算ルールを直すと古い表は使われなくなる。
+# 返す表は呼び出し元ごとのコピー（書き換えてもキャッシュには影響しない）。
+
+import os
+import copy
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_schedule_key(backend, version, starting_date, calc_closing_date, method, price, life, current_volume=None, total_volume=None) -> str:
+    """
+    計算方法（backend とそのバージョン）と資産パラメータからキャッシュキーを作る
+    （"200000" と 200000.0 は同じキーになる）
+    """
+    def norm(value):
+        if value in (None, ""):
+            return None
+        try:
+            number = float(value)
+            return int(number) if number.is_integer() else number
+        except (TypeError, ValueError):
+            return str(value).strip()
+
+    return json.dumps(
+        [backend, version, norm(starting_date), norm(calc_closing_date), norm(method), norm(price),
+         norm(life), norm(current_volume), norm(total_volume)],
+        ensure_ascii=False,
+    )
+
+
+class DepreciationScheduleCache:
+    """
+    メモリ上の LRU と SQLite の二段キャッシュ。
+
+    - メモリは memory_size 件を超えると最も古く使われたものから破棄
+    - ディスクは disk_size 件を超えると last_used の古い順に削除
+    - hits / disk_hits / misses / evictions を stats() で確認できる
+    """
+
+    def __init__(self, path=None, memory_size=256, disk_size=10000):
+        self.path = path
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS schedules ("
+                " key TEXT PRIMARY KEY,"
+                " schedule TEXT NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_schedules_last_used ON schedules(last_used)")
+            self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(self._memory[key])
+
+            if self._conn is not None:
+                row = self._conn.execute("SELECT schedule FROM schedules WHERE key = ?", (key,)).fetchone()
+                if row:
+                    schedule = json.loads(row[0])
+                    self._conn.execute("UPDATE schedules SET last_used = ? WHERE key = ?", (time.time(), key))
+                    self._conn.commit()
+                    self._remember(key, schedule)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return copy.deepcopy(schedule)
+
+            self.misses += 1
+            return None
+
+    def put(self, key, schedule):
+        with self._lock:
+            self._remember(key, schedule)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO schedules (key, schedule, last_used) VALUES (?, ?, ?)",
+                    (key, json.dumps(schedule, ensure_ascii=False), time.time()),
+                )
+                count = self._conn.execute("SELECT COUNT(*) FROM schedules").fetchone()[0]
+                if count > self.disk_size:
+                    overflow = count - self.disk_size
+                    self._conn.execute(
+                        "DELETE FROM schedules WHERE key IN ("
+                        " SELECT key FROM schedules ORDER BY last_used LIMIT ?)",
+                        (overflow,),
+                    )
+                    self.evictions += overflow
+                self._conn.commit()
+
+    def get_or_compute(self, key, compute):
+        schedule = self.get(key)
+        if schedule is None:
+            schedule = compute()
+            # 空の表（取得失敗）はキャッシュしない
+            if schedule:
+                self.put(key, schedule)
+        return schedule
+
+    def _remember(self, key, schedule):
+        self._memory[key] = copy.deepcopy(schedule)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM schedules")
+                self._conn.commit()
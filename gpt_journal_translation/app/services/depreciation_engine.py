@@ -0,0 +1,225 @@
+# --- 減価償却計算エンジン（dep.php 互換のネイティブ実装）---
+#
+# dep.php（https://stylefunc287.xsrv.jp/php/dep.php）と同じ入力
+# （取得日・初年度決算日・償却方法・取得価額・耐用年数・生産量）から
+# 耐用年数全体の償却表を一度に計算する。Selenium でブラウザを起動しないため、
+# 1件あたり数ミリ秒で済む。
+#
+# 計算ルール
+# - 円未満は切り捨て
+# - 初年度は取得月から決算月までの月割（1か月未満は1か月）
+# - 備忘価額として 1円 を残す
+
+import math
+from datetime import datetime, date
+
+# 計算ルールを変えたら ENGINE_VERSION を上げる（償却表キャッシュの鍵に含まれる）
+ENGINE_VERSION = "native-v1"
+SUPPORTED_METHODS = ("定額法", "200%定率法", "級数法", "生産高比例法")
+MEMO_VALUE = 1  # 備忘価額
+
+# 200%定率法の 償却率・改定償却率・保証率（耐用年数省令 別表第十）
+DECLINING_BALANCE_TABLE = {
+    2: (1.000, None, None),
+    3: (0.667, 1.000, 0.11089),
+    4: (0.500, 1.000, 0.12499),
+    5: (0.400, 0.500, 0.10800),
+    6: (0.333, 0.334, 0.09911),
+    7: (0.286, 0.334, 0.08680),
+    8: (0.250, 0.334, 0.07909),
+    9: (0.222, 0.250, 0.07126),
+    10: (0.200, 0.250, 0.06552),
+    11: (0.182, 0.200, 0.05992),
+    12: (0.167, 0.200, 0.05566),
+    13: (0.154, 0.167, 0.05180),
+    14: (0.143, 0.167, 0.04854),
+    15: (0.133, 0.143, 0.04565),
+    16: (0.125, 0.143, 0.04294),
+    17: (0.118, 0.125, 0.04038),
+    18: (0.111, 0.112, 0.03884),
+    19: (0.105, 0.112, 0.03693),
+    20: (0.100, 0.112, 0.03486),
+}
+
+
+def _parse_date(value) -> date:
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), "%Y-%m-%d").date()
+
+
+def _add_years(d: date, years: int) -> date:
+    # 2/29 決算など、存在しない日付は月末に丸める
+    year = d.year + years
+    for day in (d.day, 30, 29, 28):
+        try:
+            return date(year, d.month, day)
+        except ValueError:
+            continue
+    raise ValueError(f"日付を計算できません: {d}")
+
+
+def straight_line_rate(life: int) -> float:
+    """定額法の償却率（1/耐用年数 を小数点以下3桁に切り上げ）"""
+    return math.ceil(1000 / life) / 1000
+
+
+def first_year_months(starting_date, calc_closing_date) -> int:
+    """初年度の償却月数（取得月を含めて決算月まで、1〜12か月）"""
+    start = _parse_date(starting_date)
+    closing = _parse_date(calc_closing_date)
+    months = (closing.year - start.year) * 12 + (closing.month - start.month) + 1
+    if months < 1:
+        raise ValueError(f"取得日 {start} が初年度決算日 {closing} より後です")
+    return min(months, 12)
+
+
+def _straight_line(price: int, life: int, months: int) -> list:
+    annual = math.floor(price * straight_line_rate(life))
+    amounts = []
+    book = price
+    first = True
+    while book > MEMO_VALUE:
+        amount = math.floor(annual * months / 12) if first else annual
+        amount = min(amount, book - MEMO_VALUE)
+        amounts.append(amount)
+        book -= amount
+        first = False
+    return amounts
+
+
+def _declining_balance_rates(life: int):
+    if life in DECLINING_BALANCE_TABLE:
+        return DECLINING_BALANCE_TABLE[life]
+    # 表にない耐用年数は 2/耐用年数 を四捨五入し、切替判定は残存年数の定額法で行う
+    return round(2 / life, 3), None, None
+
+
+def _declining_balance(price: int, life: int, months: int) -> list:
+    rate, revised_rate, guarantee_rate = _declining_balance_rates(life)
+    guarantee = math.floor(price * guarantee_rate) if guarantee_rate else None
+    amounts = []
+    book = price
+    revised_base = None
+    year = 0
+    while book > MEMO_VALUE:
+        ratio = months / 12 if year == 0 else 1
+        if revised_base is None:
+            amount = math.floor(book * rate * ratio)
+            if year > 0:
+                if guarantee is not None:
+                    switch = amount < guarantee
+                    switch_rate = revised_rate
+                else:
+                    remaining = max(life - year, 1)
+                    switch = amount < math.floor(book / remaining)
+                    switch_rate = straight_line_rate(remaining)
+                if switch:
+                    revised_base = book
+                    revised_rate = switch_rate
+        if revised_base is not None:
+            amount = math.floor(revised_base * revised_rate)
+        amount = min(amount, book - MEMO_VALUE)
+        if amount <= 0:
+            amount = book - MEMO_VALUE
+        amounts.append(amount)
+        book -= amount
+        year += 1
+    return amounts
+
+
+def _sum_of_years_digits(price: int, life: int, months: int) -> list:
+    base = price - MEMO_VALUE
+    total = life * (life + 1) // 2
+    service_years = [base * (life - k) / total for k in range(life)]
+
+    # 償却年度と会計年度がずれる場合は月割で按分する
+    amounts = []
+    for fiscal_year in range(life + (1 if months < 12 else 0)):
+        amount = 0.0
+        if fiscal_year < life:
+            amount += service_years[fiscal_year] * months / 12
+        if fiscal_year > 0:
+            amount += service_years[fiscal_year - 1] * (12 - months) / 12
+        amounts.append(math.floor(amount))
+
+    # 切捨てによる端数は最終年度で調整する
+    amounts[-1] += base - sum(amounts)
+    return amounts
+
+
+def _units_of_production(price: int, current_volume, total_volume) -> list:
+    if not current_volume or not total_volume:
+        raise ValueError("生産高比例法には current_volume と total_volume が必要です")
+    base = price - MEMO_VALUE
+    annual = math.floor(base * float(current_volume) / float(total_volume))
+    if annual <= 0:
+        raise ValueError("当期の生産量が 0 です")
+    amounts = []
+    book = price
+    while book > MEMO_VALUE:
+        amount = min(annual, book - MEMO_VALUE)
+        amounts.append(amount)
+        book -= amount
+    return amounts
+
+
+def build_depreciation_schedule(starting_date, calc_closing_date, method, price, life,
+                                current_volume=None, total_volume=None) -> list:
+    """
+    耐用年数全体の償却表を返す（dep.php の結果テーブルと同じ並び）。
+
+    各行:
+    {
+        "year": "2025-03-31",          # 事業年度の決算日
+        "beginning_book_value": 200000,
+        "depreciation": 40000,
+        "accumulated": 40000,
+        "ending_book_value": 160000
+    }
+    """
+    if method not in SUPPORTED_METHODS:
+        raise ValueError(f"未対応の償却方法です: {method}")
+    price = int(float(price))
+    life = int(float(life)) if life not in (None, "") else 0
+    if price <= MEMO_VALUE:
+        raise ValueError(f"取得価額が不正です: {price}")
+    if method != "生産高比例法" and life < 1:
+        raise ValueError(f"耐用年数が不正です: {life}")
+
+    months = first_year_months(starting_date, calc_closing_date)
+    if method == "定額法":
+        amounts = _straight_line(price, life, months)
+    elif method == "200%定率法":
+        amounts = _declining_balance(price, life, months)
+    elif method == "級数法":
+        amounts = _sum_of_years_digits(price, life, months)
+    else:
+        amounts = _units_of_production(price, current_volume, total_volume)
+
+    closing = _parse_date(calc_closing_date)
+    schedule = []
+    book = price
+    accumulated = 0
+    for i, amount in enumerate(amounts):
+        accumulated += amount
+        schedule.append({
+            "year": _add_years(closing, i).strftime("%Y-%m-%d"),
+            "beginning_book_value": book,
+            "depreciation": amount,
+            "accumulated": accumulated,
+            "ending_book_value": book - amount,
+        })
+        book -= amount
+    return schedule
+
+
+def find_depreciation_for_year(schedule: list, target_year):
+    """償却表から target_year（決算日）の減価償却費を取り出す。該当なしは None"""
+    if not target_year:
+        return None
+    target = str(target_year).strip()
+    for row in schedule:
+        if row["year"] == target:
+            return float(row["depreciation"])
+    return None
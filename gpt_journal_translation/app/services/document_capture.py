@@ -0,0 +1,129 @@
+# --- 自動撮影（書類検出・ピント判定・静止判定・台形補正）---
+#
+# 白枠で固定の範囲を切り出す代わりに、プレビューの各フレームで次を判定し、
+# すべて満たした状態が stable_frames フレーム続いた時に1回だけ撮影する。
+#   1. 書類検出   : 輪郭から面積の大きい四角形を探す（画面に対する面積比 min_area_ratio 以上）
+#   2. ピント     : 書類範囲のラプラシアン分散が min_sharpness 以上
+#   3. 静止       : 四隅の移動量が対角線長の max_motion 以下
+# 判定は長辺 analysis_width px に縮小したグレースケール画像で行い、
+# 元解像度の台形補正（warpPerspective）は撮影する時だけ行う。
+# 撮影後は書類が画面から外れる（rearm_frames フレーム検出されない）まで次の撮影をしない。
+
+import time
+
+import cv2
+import numpy as np
+
+
+def order_corners(points) -> np.ndarray:
+    """四隅を 左上・右上・右下・左下 の順に並べる"""
+    points = np.asarray(points, dtype=np.float32).reshape(4, 2)
+    s = points.sum(axis=1)
+    d = np.diff(points, axis=1).ravel()
+    return np.array([
+        points[np.argmin(s)],
+        points[np.argmin(d)],
+        points[np.argmax(s)],
+        points[np.argmax(d)],
+    ], dtype=np.float32)
+
+
+def find_document_quad(gray, min_area_ratio=0.2):
+    """縮小済みグレースケール画像から書類の四隅を探す（見つからなければ None）"""
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    edges = cv2.Canny(blurred, 50, 150)
+    edges = cv2.dilate(edges, None, iterations=1)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    min_area = gray.shape[0] * gray.shape[1] * min_area_ratio
+    for contour in sorted(contours, key=cv2.contourArea, reverse=True)[:5]:
+        if cv2.contourArea(contour) < min_area:
+            break
+        approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+        if len(approx) == 4 and cv2.isContourConvex(approx):
+            return order_corners(approx)
+    return None
+
+
+def sharpness(gray, quad=None) -> float:
+    """ラプラシアン分散（大きいほどピントが合っている）。quad があればその外接矩形で測る"""
+    if quad is not None:
+        x, y, w, h = cv2.boundingRect(quad.astype(np.int32))
+        gray = gray[max(y, 0):y + h, max(x, 0):x + w]
+    if gray.size == 0:
+        return 0.0
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def warp_document(frame, quad) -> np.ndarray:
+    """四隅から台形補正した書類画像を返す（出力サイズは辺の長さから決める）"""
+    tl, tr, br, bl = quad
+    width = int(max(np.linalg.norm(br - bl), np.linalg.norm(tr - tl)))
+    height = int(max(np.linalg.norm(tr - br), np.linalg.norm(tl - bl)))
+    target = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
+    matrix = cv2.getPerspectiveTransform(quad, target)
+    return cv2.warpPerspective(frame, matrix, (width, height))
+
+
+class AutoCapture:
+    def __init__(self, min_sharpness=100.0, stable_frames=8, max_motion=0.01, min_area_ratio=0.2,
+                 analysis_width=480, rearm_frames=10):
+        self.min_sharpness = min_sharpness
+        self.stable_frames = stable_frames
+        self.max_motion = max_motion
+        self.min_area_ratio = min_area_ratio
+        self.analysis_width = analysis_width
+        self.rearm_frames = rearm_frames
+        self._previous = None
+        self._stable = 0
+        self._missing = 0
+        self._armed = True
+        self.analysis_ms = 0.0  # 1フレームあたりの判定時間（指数移動平均）
+        self.captures = 0
+
+    def update(self, frame):
+        """
+        フレームを判定し (状態, 撮影した書類画像 or None) を返す。
+        状態: {"quad": 元解像度の四隅 or None, "sharpness", "stable", "ready", "armed"}
+        """
+        start = time.perf_counter()
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.analysis_width / max(height, width))
+        small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else frame
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        quad = find_document_quad(gray, self.min_area_ratio)
+        score = sharpness(gray, quad) if quad is not None else 0.0
+        ready = False
+        if quad is None:
+            self._previous = None
+            self._stable = 0
+            self._missing += 1
+            if self._missing >= self.rearm_frames:
+                self._armed = True
+        else:
+            self._missing = 0
+            diagonal = float(np.hypot(*gray.shape[:2]))
+            moved = (
+                self._previous is None
+                or float(np.abs(quad - self._previous).max()) / diagonal > self.max_motion
+            )
+            self._previous = quad
+            if moved or score < self.min_sharpness:
+                self._stable = 0
+            else:
+                self._stable += 1
+            ready = self._stable >= self.stable_frames
+
+        full_quad = (quad / scale).astype(np.float32) if quad is not None else None
+        captured = None
+        if ready and self._armed:
+            captured = warp_document(frame, full_quad)
+            self._armed = False
+            self._stable = 0
+            self.captures += 1
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.analysis_ms = elapsed_ms if not self.analysis_ms else self.analysis_ms * 0.9 + elapsed_ms * 0.1
+        state = {"quad": full_quad, "sharpness": score, "stable": self._stable, "ready": ready, "armed": self._armed}
+        return state, captured
@@ -0,0 +1,101 @@
+# --- GPT応答キャッシュ（内容アドレス方式・SQLite）---
+#
+# 同じOCRテキストからは同じ仕訳が返るため、
+#   正規化したOCRテキスト + プロンプトのバージョン + モデル名
+# のハッシュを鍵に GPT の応答を保存する。下流の失敗でバッチを再実行しても
+# GPT-4 の課金と待ち時間が発生しない。
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+
+def normalize_ocr_text(text: str) -> str:
+    """全角/半角を NFKC で揃え、空白・改行の違いを無視する"""
+    text = unicodedata.normalize("NFKC", text or "")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def make_cache_key(ocr_text: str, prompt_version: str, model: str) -> str:
+    payload = "\x1f".join([prompt_version, model, normalize_ocr_text(ocr_text)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GptResponseCache:
+    """
+    - ttl: 保存から ttl 秒を過ぎた応答は使わない（0 で無期限）
+    - max_entries: 件数上限。超えたら最後に使われた時刻が古いものから削除
+    """
+
+    def __init__(self, path, ttl=30 * 24 * 3600, max_entries=5000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS gpt_responses ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " prompt_version TEXT NOT NULL,"
+            " response TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_gpt_responses_last_used ON gpt_responses(last_used)")
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT response, created_at FROM gpt_responses WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row and self.ttl and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM gpt_responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.evictions += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE gpt_responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, response, model, prompt_version):
+        with self._lock:
+            now = time.time()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO gpt_responses (key, model, prompt_version, response, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, prompt_version, response, now, now),
+            )
+            if self.ttl:
+                expired = self._conn.execute("DELETE FROM gpt_responses WHERE created_at < ?", (now - self.ttl,)).rowcount
+                self.evictions += expired
+            count = self._conn.execute("SELECT COUNT(*) FROM gpt_responses").fetchone()[0]
+            if count > self.max_entries:
+                overflow = count - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM gpt_responses WHERE key IN ("
+                    " SELECT key FROM gpt_responses ORDER BY last_used LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
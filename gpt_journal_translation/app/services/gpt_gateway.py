@@ -0,0 +1,154 @@
+# --- 非同期 GPT ゲートウェイ ---
+#
+# AsyncOpenAI クライアントを1つだけ作って接続を使い回し、
+# - セマフォで同時リクエスト数を制限
+# - 429 / 5xx / タイムアウト / 接続エラーは Retry-After を尊重したジッター付き指数バックオフで再試行
+# - リクエストごとのタイムアウト
+# を行う。クライアント・セマフォ・リクエストはすべてゲートウェイ専用スレッドのイベントループで動かす。
+# 同期コードからは chat_sync()、呼び出し元のイベントループからは await chat() で呼び出せ、
+# どちらから呼んでも同じクライアントと同時実行数の上限を共有する
+# （AsyncOpenAI とセマフォは作られたループに結び付くため、呼び出し元のループでは作らない）。
+# openai パッケージは最初のリクエストで読み込む。
+
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _retry_after_seconds(error):
+    """エラーレスポンスの retry-after-ms / retry-after ヘッダーを秒で返す"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def _is_retryable(error) -> bool:
+    import openai
+
+    if isinstance(error, (asyncio.TimeoutError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS
+    return False
+
+
+class GptGateway:
+    def __init__(self, api_key=None, project=None, model="gpt-4o", base_url=None,
+                 max_concurrency=4, timeout=60.0, max_retries=5, base_delay=1.0, max_delay=30.0, client=None):
+        self.api_key = api_key
+        self.project = project
+        self.model = model
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+        self._client = client
+        self._semaphore = None
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_client(self):
+        # ゲートウェイのループ上でだけ呼ばれる（クライアントとセマフォはこのループに結び付く）
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                project=self.project,
+                base_url=self.base_url,
+                timeout=self.timeout,
+                max_retries=0,  # 再試行はこのゲートウェイで行う
+            )
+
+    def _backoff(self, attempt, error) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        retry_after = _retry_after_seconds(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay) + random.uniform(0, self.base_delay))
+        return delay
+
+    async def chat(self, messages, json_mode=False, model=None):
+        """(応答テキスト, {"prompt_tokens", "completion_tokens"}) を返す（どのイベントループから await してもよい）"""
+        return await self._submit(self._chat(messages, json_mode=json_mode, model=model))
+
+    async def chat_many(self, message_list, json_mode=False):
+        """複数のリクエストを同時実行の上限内で並列に送る（入力順に結果を返す）"""
+        return await self._submit(self._chat_many(message_list, json_mode=json_mode))
+
+    async def _chat_many(self, message_list, json_mode=False):
+        return await asyncio.gather(*(self._chat(messages, json_mode=json_mode) for messages in message_list))
+
+    async def _chat(self, messages, json_mode=False, model=None):
+        self._ensure_client()
+        kwargs = {"response_format": {"type": "json_object"}} if json_mode else {}
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    completion = await asyncio.wait_for(
+                        self._client.chat.completions.create(
+                            model=model or self.model,
+                            messages=messages,
+                            **kwargs
+                        ),
+                        timeout=self.timeout,
+                    )
+                usage = completion.usage
+                tokens = {
+                    "prompt_tokens": usage.prompt_tokens if usage else 0,
+                    "completion_tokens": usage.completion_tokens if usage else 0,
+                }
+                return completion.choices[0].message.content, tokens
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                delay = self._backoff(attempt, e)
+                self.retries += 1
+                print(f"⚠️ GPT呼び出しを再試行します（{attempt + 1}/{self.max_retries}、{delay:.1f}秒後）: {e}")
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    # --- ゲートウェイのループで実行する ---
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="gpt-gateway", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    async def _submit(self, coro):
+        loop = self._ensure_loop()
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    def chat_sync(self, messages, json_mode=False, model=None):
+        """同期コード用（ゲートウェイのループで実行して結果を待つ）"""
+        future = asyncio.run_coroutine_threadsafe(self._chat(messages, json_mode=json_mode, model=model), self._ensure_loop())
+        return future.result()
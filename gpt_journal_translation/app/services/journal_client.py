@@ -0,0 +1,102 @@
+# --- FastAPI への仕訳送信クライアント ---
+#
+# JOURNAL_DISPATCH_MODE
+#   http      : requests.Session（Keep-Alive・コネクションプール）で送信。タイムアウトと再試行つき
+#   inprocess : 同じホストで動かす場合、app.schemas で検証してハンドラを直接呼ぶ（ソケットを使わない）
+#               FastAPI の lifespan を通らないため、ハンドラのログ出力はクライアントを作る時に設定する
+
+# POST は冪等ではない（冪等キーもない）ため、サーバーが処理していないと分かる応答だけ再試行する。
+# 502・504 はゲートウェイの先で処理済みのことがあり、再送すると仕訳が二重に保存されるので再試行しない。
+RETRY_STATUSES = (429, 503)
+
+
+class HttpJournalClient:
+    def __init__(self, base_url, connect_timeout=3.05, read_timeout=30.0, retries=3, backoff=0.5, pool_size=10):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        # 接続できなかった時と RETRY_STATUSES だけ再試行する（読み取り中のタイムアウトは再送しない）
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"POST"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def send(self, type_: str, data: dict):
+        """(成功したか, レスポンス本文 or エラー内容) を返す"""
+        url = f"{self.base_url}/journal/{type_}"
+        response = self.session.post(url, json=data, timeout=self.timeout)
+        if response.status_code == 200:
+            return True, response.json()
+        return False, f"{response.status_code} - {response.text}"
+
+    def send_batch(self, items: list):
+        response = self.session.post(f"{self.base_url}/journal/batch", json=items, timeout=self.timeout)
+        if response.status_code == 200:
+            return response.json()
+        return {"status": "error", "accepted": 0, "rejected": len(items), "message": f"{response.status_code} - {response.text}"}
+
+    def close_period(self, closing_date: str, dry_run: bool = False):
+        response = self.session.post(
+            f"{self.base_url}/journal/closing", json={"closing_date": closing_date, "dry_run": dry_run}, timeout=self.timeout
+        )
+        if response.status_code == 200:
+            return response.json()
+        return {"status": "error", "message": f"{response.status_code} - {response.text}"}
+
+    def close(self):
+        self.session.close()
+
+
+class InProcessJournalClient:
+    """HTTP を経由せず、ルーターのハンドラを同じプロセス内で直接呼ぶ"""
+
+    def __init__(self):
+        # FastAPI 側のモジュールはこのモードを選んだ時だけ読み込む
+        import atexit
+
+        from app.handlers import batch, closing
+        from app.logging_config import setup_logging, shutdown_logging
+        self._batch = batch
+        self._closing = closing
+        # uvicorn で起動した時と同じく INFO の構造化ログを出す（終了時に残りを書き出す）
+        setup_logging()
+        atexit.register(shutdown_logging)
+
+    def send(self, type_: str, data: dict):
+        result = self._batch.process_item(0, {**data, "type": type_}, route=f"/journal/{type_}")
+        if result.status == "success":
+            return True, {"status": "success", "message": result.message}
+        return False, result.errors or result.message
+
+    def send_batch(self, items: list):
+        return self._batch.handle_batch(items).model_dump()
+
+    def close_period(self, closing_date: str, dry_run: bool = False):
+        from app.schemas import ClosingRequest
+
+        return self._closing.handle_closing(ClosingRequest(closing_date=closing_date, dry_run=dry_run)).model_dump()
+
+    def close(self):
+        pass
+
+
+def create_journal_client(mode: str, base_url: str, **kwargs):
+    if mode == "inprocess":
+        return InProcessJournalClient()
+    if mode == "http":
+        return HttpJournalClient(base_url, **kwargs)
+    raise ValueError(f"未対応の JOURNAL_DISPATCH_MODE です: {mode}")
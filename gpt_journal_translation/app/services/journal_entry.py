@@ -1,27 +1,30 @@
 # --- 生産高比例法に対応---
 
 import os
-import cv2
 import io
-import time
 import json
 import re
-import requests
-import gspread
+import atexit
+import threading
 from dotenv import load_dotenv
-from google.cloud import vision
-from openai import OpenAI
-# Selenium を使用するための追加ライブラリ
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import Select
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import Select, WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from datetime import datetime, timedelta
-from googleapiclient.discovery import build
-from google.oauth2.service_account import Credentials
 from collections import defaultdict # スプレッドシート入力時の重複した科目について合算と相殺して表示
+from app.services.depreciation_engine import ENGINE_VERSION, build_depreciation_schedule, find_depreciation_for_year
+from app.services.depreciation_cache import DepreciationScheduleCache, make_schedule_key
+# Selenium（dep.php）は WebDriver プール経由で使用する
+from app.services.webdriver_pool import SCRAPER_VERSION, WebDriverPool, scrape_depreciation_schedule
+from app.services import vision_ocr
+from app.services.ocr_cache import OcrResultCache
+from app.services.ocr_backends import OcrRouter
+from app.services.gpt_cache import GptResponseCache, make_cache_key
+from app.services import prompts
+from app.services.gpt_gateway import GptGateway
+from app.services.journal_validation import normalize_date, repair_journal, validate_journal
+from app.services.rule_classifier import classify_by_rules
+from app.services.transaction_segmenter import split_transactions
+from app.services.sheets_writer import SheetsJournalWriter
+from app.services.journal_client import create_journal_client
+from app.services.profiler import PipelineProfiler
 # from googleapiclient.errors import HttpError 　 デバッグ用
 
 
@@ -38,10 +41,14 @@ CREDENTIALS_PATH = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
 FOLDER_ID = os.getenv("FOLDER_ID")
 SPREADSHEET_ID = os.getenv("SPREADSHEET_ID")  # スプレッドシートID（URLの中の文字列）
 SPREADSHEET_TITLE = "Journal"    # 任意のスプレッドシート名（タイトル）
-SHEET_NAME = os.getenv("SHEET_NAME", "シート1")  # 任意のシート名、なければ"Sheet1"
+SHEET_NAME = os.getenv("SHEET_NAME", "仕訳帳")  # 書き込み先のシート名
 # 認証スコープ
 SCOPES= ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
 
+# ステージ別の計測（PIPELINE_PROFILE_DIR を指定すると撮影ごとに cProfile / tracemalloc を保存）
+profiler = PipelineProfiler(dump_dir=os.getenv("PIPELINE_PROFILE_DIR") or None)
+PIPELINE_METRICS_PATH = os.getenv("PIPELINE_METRICS_PATH")
+
 
 
 # if not creds_path or not os.path.exists(creds_path):
@@ -55,15 +62,79 @@ SCOPES= ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/au
 # print(f"✅ 認証ファイルを確認済: {creds_path}")
 
 
+# OCR結果キャッシュ（同じ画像は Vision API を呼ばない。既定は画素の完全一致、pHash の近似一致は任意）
+# キャッシュやクライアントは import 時には作らず、最初に使う時に作る
+OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "1") != "0"
+_ocr_cache = None
+_ocr_cache_lock = threading.Lock()
+
+def get_ocr_cache() -> OcrResultCache:
+    global _ocr_cache
+    with _ocr_cache_lock:
+        if _ocr_cache is None:
+            _ocr_cache = OcrResultCache(
+                path=os.getenv("OCR_CACHE_PATH", ".cache/ocr_results.sqlite3") or None,
+                match=os.getenv("OCR_CACHE_MATCH", "exact"),
+                max_distance=int(os.getenv("OCR_CACHE_MAX_DISTANCE", "0")),
+                max_entries=int(os.getenv("OCR_CACHE_MAX_ENTRIES", "2000")),
+            )
+        return _ocr_cache
+
+# OCRバックエンド（vision / tesseract / cascade）
+_ocr_router = None
+_ocr_router_lock = threading.Lock()
+
+def get_ocr_router() -> OcrRouter:
+    global _ocr_router
+    with _ocr_router_lock:
+        if _ocr_router is None:
+            _ocr_router = OcrRouter(
+                mode=os.getenv("OCR_BACKEND", "vision"),
+                min_confidence=float(os.getenv("OCR_LOCAL_MIN_CONFIDENCE", "80")),
+            )
+        return _ocr_router
+
 # OCR関数（画像フレームを受け取り、テキスト抽出）
+# OCR_BACKEND に応じてローカルOCRまたは Vision で読み取る
 def extract_text_from_frame(frame):
-    _, buffer = cv2.imencode('.png', frame)
-    content = buffer.tobytes()
-    image = vision.Image(content=content)
-    client = vision.ImageAnnotatorClient()
-    response = client.text_detection(image=image)
-    texts = response.text_annotations
-    return texts[0].description.strip() if texts else "[OCR結果なし]"
+    with profiler.stage("ocr") as sample:
+        if OCR_CACHE_ENABLED:
+            phash, cached = get_ocr_cache().lookup(frame)
+            if cached is not None:
+                print("♻️ 同じ書類のOCR結果を再利用しました。")
+                sample["cache_hits"] = 1
+                return cached
+        sent_before = vision_ocr.timings.totals["upload_bytes"]
+        text = get_ocr_router().extract_text(frame)
+        sample["bytes_sent"] = vision_ocr.timings.totals["upload_bytes"] - sent_before
+        sample["bytes_received"] = len(text.encode("utf-8"))
+        if OCR_CACHE_ENABLED and text != vision_ocr.NO_TEXT:
+            get_ocr_cache().store(phash, text)
+        return text
+
+# 複数フレームを batch_annotate_images でまとめてOCRする（キャッシュにないものだけ送信）
+def extract_texts_from_frames(frames):
+    with profiler.stage("ocr_batch", frames=len(frames)) as sample:
+        results = [None] * len(frames)
+        missing = []
+        for i, frame in enumerate(frames):
+            phash, cached = get_ocr_cache().lookup(frame) if OCR_CACHE_ENABLED else (None, None)
+            if cached is not None:
+                results[i] = cached
+                sample["cache_hits"] = sample.get("cache_hits", 0) + 1
+            else:
+                missing.append((i, phash))
+
+        if missing:
+            sent_before = vision_ocr.timings.totals["upload_bytes"]
+            texts = get_ocr_router().extract_texts([frames[i] for i, _ in missing])
+            sample["bytes_sent"] = vision_ocr.timings.totals["upload_bytes"] - sent_before
+            for (i, phash), text in zip(missing, texts):
+                results[i] = text
+                sample["bytes_received"] = sample.get("bytes_received", 0) + len(text.encode("utf-8"))
+                if OCR_CACHE_ENABLED and text != vision_ocr.NO_TEXT:
+                    get_ocr_cache().store(phash, text)
+        return results
 
 # 数式を安全に評価する関数
 # プロンプトで対応したため現在は使用しない。
@@ -102,41 +173,90 @@ def derive_calc_closing_date(acquisition_date: str, fiscal_end_mmdd: str) -> str
         print(f"❌ calc_closing_date推定失敗: {e}")
         return None
 
+# 減価償却費の計算方法: native（Python内で計算）/ site（dep.php をスクレイピング）/ verify（両方を計算して差分を表示）
+DEPRECIATION_BACKEND = os.getenv("DEPRECIATION_BACKEND", "native")
+DEPRECIATION_TOLERANCE = float(os.getenv("DEPRECIATION_TOLERANCE", "1"))  # verify時に許容する差（円）
+DEP_CALCULATOR_URL = os.getenv("DEP_CALCULATOR_URL", "https://stylefunc287.xsrv.jp/php/dep.php")
+
+# dep.php 用の WebDriver プール（site / verify の時だけ初回利用時に起動）
+DEP_WEBDRIVER_POOL_SIZE = int(os.getenv("DEP_WEBDRIVER_POOL_SIZE", "2"))
+DEP_WEBDRIVER_MAX_USES = int(os.getenv("DEP_WEBDRIVER_MAX_USES", "50"))
+DEP_WEBDRIVER_HEADLESS = os.getenv("DEP_WEBDRIVER_HEADLESS", "1") != "0"  # 0 にすると開発時にGUIで確認できる
+DEP_WEBDRIVER_TIMEOUT = float(os.getenv("DEP_WEBDRIVER_TIMEOUT", "10"))
+_webdriver_pool = None
+_webdriver_pool_lock = threading.Lock()
+
+def get_webdriver_pool() -> WebDriverPool:
+    global _webdriver_pool
+    with _webdriver_pool_lock:
+        if _webdriver_pool is None:
+            _webdriver_pool = WebDriverPool(
+                size=DEP_WEBDRIVER_POOL_SIZE,
+                max_uses=DEP_WEBDRIVER_MAX_USES,
+                headless=DEP_WEBDRIVER_HEADLESS,
+            )
+            atexit.register(_webdriver_pool.close)
+        return _webdriver_pool
+
+# dep.php の結果テーブルを償却表として取得する
+def fetch_depreciation_schedule_from_site(starting_date, calc_closing_date, method, price, life, current_volume=None, total_volume=None):
+    with get_webdriver_pool().driver() as driver:
+        return scrape_depreciation_schedule(
+            driver, DEP_CALCULATOR_URL,
+            starting_date, calc_closing_date, method, price, life,
+            current_volume=current_volume, total_volume=total_volume,
+            timeout=DEP_WEBDRIVER_TIMEOUT,
+        )
+
+# 償却表キャッシュ（同じ資産は翌年以降の決算や再スキャンでも再計算しない）
+_depreciation_cache = None
+_depreciation_cache_lock = threading.Lock()
+
+def get_depreciation_cache() -> DepreciationScheduleCache:
+    global _depreciation_cache
+    with _depreciation_cache_lock:
+        if _depreciation_cache is None:
+            _depreciation_cache = DepreciationScheduleCache(
+                path=os.getenv("DEPRECIATION_CACHE_PATH", ".cache/depreciation_schedules.sqlite3") or None,
+                memory_size=int(os.getenv("DEPRECIATION_CACHE_MEMORY_SIZE", "256")),
+                disk_size=int(os.getenv("DEPRECIATION_CACHE_DISK_SIZE", "10000")),
+            )
+        return _depreciation_cache
+
+# 償却表全体を取得する（キャッシュ→計算またはスクレイピング）
+def get_depreciation_schedule(starting_date, calc_closing_date, method, price, life, current_volume=None, total_volume=None, backend=None):
+    backend = backend or ("site" if DEPRECIATION_BACKEND == "site" else "native")
+    params = (starting_date, calc_closing_date, method, price, life, current_volume, total_volume)
+    if backend == "site":
+        fetch, version = fetch_depreciation_schedule_from_site, SCRAPER_VERSION
+    else:
+        fetch, version = build_depreciation_schedule, ENGINE_VERSION
+    key = make_schedule_key(backend, version, *params)
+    return get_depreciation_cache().get_or_compute(key, lambda: fetch(*params))
+
 # 減価償却費を自動取得する関数（復元）
 def calculate_depreciation_by_year(starting_date, calc_closing_date, method, price, life, target_year, current_volume=None, total_volume=None):
+    params = (starting_date, calc_closing_date, method, price, life, current_volume, total_volume)
     try:
-        options = Options()
-        # options.add_argument("--headless") #コメントアウトすることで開発段階にGUI確認を可能にすることができる 
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        driver = webdriver.Chrome(options=options)
-        driver.get("https://stylefunc287.xsrv.jp/php/dep.php")
-
-        starting_input = driver.find_element(By.ID, "startingDate")
-        closing_input = driver.find_element(By.ID, "closingDate")
-        driver.execute_script("arguments[0].value = arguments[1]", starting_input, starting_date) # JavaScript を使って値を直接設定する。　フォーマット依存を避ける。　今回アクセスするwebページの日付入力欄のフォーマットは自動入力だと誤入力を起こしてしまう。
-        driver.execute_script("arguments[0].value = arguments[1]", closing_input, calc_closing_date)
-        Select(driver.find_element(By.ID, "cluculateMethod")).select_by_visible_text(method)
-        driver.find_element(By.ID, "purchasePrice").send_keys(str(price))
-        driver.find_element(By.ID, "usefulLife").send_keys(str(life))
-
-        if method == "生産高比例法":
-            driver.find_element(By.ID, "currentVolume").send_keys(str(current_volume or ""))
-            driver.find_element(By.ID, "totalVolume").send_keys(str(total_volume or ""))
-
-        driver.find_element(By.ID, "submit").click()
-        time.sleep(2)
-
-        rows = driver.find_elements(By.CSS_SELECTOR, "tbody.record tr")
-        for row in rows:
-            cols = row.find_elements(By.TAG_NAME, "td")
-            if len(cols) >= 3 and cols[0].text.strip() == target_year:
-                value = cols[2].text.replace(",", "")
-                driver.quit()
-                return float(value)
-
-        driver.quit()
-        return None
+        if DEPRECIATION_BACKEND == "site":
+            return find_depreciation_for_year(get_depreciation_schedule(*params, backend="site"), target_year)
+
+        native = find_depreciation_for_year(get_depreciation_schedule(*params, backend="native"), target_year)
+        if DEPRECIATION_BACKEND == "verify":
+            # dep.php に接続できない・表に該当年度がない時は比較せずに native の値を使う
+            try:
+                site = find_depreciation_for_year(get_depreciation_schedule(*params, backend="site"), target_year)
+            except Exception as e:
+                print(f"⚠️ dep.php から取得できないため native の値を使います: {e}")
+                return native
+            if site is None:
+                print(f"⚠️ dep.php の償却表に {target_year} がないため native の値を使います: {native}")
+                return native
+            if native is None or abs(native - site) > DEPRECIATION_TOLERANCE:
+                print(f"⚠️ 減価償却費が dep.php と一致しません: native={native}, site={site}")
+                return site
+            print(f"✅ 減価償却費が dep.php と一致しました: {native}")
+        return native
     except Exception as e:
         print(f"❌ 減価償却費取得エラー: {e}")
         return None
@@ -145,7 +265,7 @@ def calculate_depreciation_by_year(starting_date, calc_closing_date, method, pri
 def merge_fiscal_dates_into_gpt(gpt_data: dict, ocr_text: str):
     _, fiscal_end = extract_fiscal_mmdd_period(ocr_text)
     if gpt_data.get("type") == "depreciation":
-        acquisition_date = gpt_data.get("acquisition_date")
+        acquisition_date = normalize_date(gpt_data.get("acquisition_date"))
         if acquisition_date and fiscal_end:
             gpt_data["calc_closing_date"] = derive_calc_closing_date(acquisition_date, fiscal_end)
 
@@ -166,6 +286,12 @@ def merge_fiscal_dates_into_gpt(gpt_data: dict, ocr_text: str):
     return gpt_data
 
 # === GPTプロンプト生成関数 ===
+# two_stage: タイプ判定→タイプ別抽出の短いプロンプト（JSONモード） / single: 従来の一括プロンプト
+PROMPT_MODE = os.getenv("PROMPT_MODE", "two_stage")
+# プロンプトの内容を変えたら prompts.PROMPT_VERSIONS["single"] を上げる（GPT応答キャッシュの鍵に含まれる）
+# JSONモードに対応したモデルを既定にする（gpt-4 は response_format に非対応）
+GPT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
+
 def build_prompt(ocr_text: str) -> str:
     return f"""
 あなたは会計仕訳AIです。
@@ -313,33 +439,138 @@ OCR結果：
 
 # GPT API 呼び出し
 def ask_gpt(prompt: str) -> str:
-    client = OpenAI(api_key=openai_api_key, project=openai_project_id)
-    chat_completion = client.chat.completions.create(
-        model="gpt-4",
-        messages=[
-            {"role": "system", "content": "あなたは簿記と財務会計に詳しい会計仕訳AIです。"},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    return chat_completion.choices[0].message.content
+    content, _ = ask_gpt_messages([
+        {"role": "system", "content": "あなたは簿記と財務会計に詳しい会計仕訳AIです。"},
+        {"role": "user", "content": prompt}
+    ])
+    return content
+
+# GPTゲートウェイ（クライアント共有・同時実行数制限・再試行・タイムアウト）
+gpt_gateway = GptGateway(
+    api_key=openai_api_key,
+    project=openai_project_id,
+    model=GPT_MODEL,
+    base_url=os.getenv("OPENAI_BASE_URL") or None,
+    max_concurrency=int(os.getenv("GPT_MAX_CONCURRENCY", "4")),
+    timeout=float(os.getenv("GPT_TIMEOUT", "60")),
+    max_retries=int(os.getenv("GPT_MAX_RETRIES", "5")),
+)
+
+# メッセージを渡して GPT を呼び出し、(応答テキスト, トークン数) を返す
+def ask_gpt_messages(messages: list, json_mode: bool = False):
+    return gpt_gateway.chat_sync(messages, json_mode=json_mode)
+
+# ステージごとのトークン使用量（セッション累計）
+token_usage = defaultdict(lambda: {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+_token_lock = threading.Lock()
+_thread_tokens = threading.local()  # ワーカースレッドごとの累計（ステージ計測用）
+
+def _record_tokens(stage: str, tokens: dict):
+    with _token_lock:
+        usage = token_usage[stage]
+        usage["calls"] += 1
+        usage["prompt_tokens"] += tokens["prompt_tokens"]
+        usage["completion_tokens"] += tokens["completion_tokens"]
+    prompt, completion = _total_tokens()
+    _thread_tokens.totals = (prompt + tokens["prompt_tokens"], completion + tokens["completion_tokens"])
+    print(f"🔢 {stage}: prompt={tokens['prompt_tokens']} completion={tokens['completion_tokens']} tokens")
+
+# このスレッドで使った (prompt_tokens, completion_tokens) の累計
+def _total_tokens():
+    return getattr(_thread_tokens, "totals", (0, 0))
+
+# 2段階で仕訳JSONを作る（タイプ判定 → タイプ別抽出）
+# JSONオブジェクト（dict）として読めない応答は None
+def _json_object(content: str):
+    try:
+        data = json.loads(content)
+    except (TypeError, json.JSONDecodeError):
+        return None
+    return data if isinstance(data, dict) else None
+
+def ask_gpt_two_stage(ocr_text: str) -> str:
+    content, tokens = ask_gpt_messages(prompts.build_classifier_messages(ocr_text), json_mode=True)
+    _record_tokens("classify", tokens)
+    classified = _json_object(content)
+    type_ = classified.get("type", "unknown") if classified is not None else "unknown"
+    if type_ not in prompts.REQUEST_MODELS:
+        return json.dumps({"type": "unknown"}, ensure_ascii=False)
+
+    content, tokens = ask_gpt_messages(prompts.build_extraction_messages(type_, ocr_text), json_mode=True)
+    _record_tokens(f"extract:{type_}", tokens)
+    data = _json_object(content)
+    if data is None:
+        # そのまま返し、_journal_from_gpt_result で送信を中止する
+        return content
+    data["type"] = type_
+    return json.dumps(data, ensure_ascii=False)
+
+# FastAPI送信クライアント（http: プール済みセッション / inprocess: ハンドラを直接呼ぶ）
+JOURNAL_DISPATCH_MODE = os.getenv("JOURNAL_DISPATCH_MODE", "http")
+_journal_client = None
+_journal_client_lock = threading.Lock()
+
+def get_journal_client():
+    global _journal_client
+    with _journal_client_lock:
+        if _journal_client is None:
+            http_options = {
+                "connect_timeout": float(os.getenv("FASTAPI_CONNECT_TIMEOUT", "3.05")),
+                "read_timeout": float(os.getenv("FASTAPI_READ_TIMEOUT", "30")),
+                "retries": int(os.getenv("FASTAPI_MAX_RETRIES", "3")),
+            } if JOURNAL_DISPATCH_MODE == "http" else {}
+            _journal_client = create_journal_client(JOURNAL_DISPATCH_MODE, fastapi_base_url, **http_options)
+        return _journal_client
 
 # FastAPI送信関数
 def send_to_fastapi(type_: str, data: dict):
     try:
-        url = f"{fastapi_base_url}/journal/{type_}"
-        response = requests.post(url, json=data)
-        if response.status_code == 200:
-            print(f"✅ FastAPIへ送信成功: {url}")
-            print(f"📨 レスポンス: {response.json()}")
+        with profiler.stage("fastapi") as sample:
+            sample["bytes_sent"] = len(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+            ok, body = get_journal_client().send(type_, data)
+        if ok:
+            print(f"✅ FastAPIへ送信成功: /journal/{type_}（{JOURNAL_DISPATCH_MODE}）")
+            print(f"📨 レスポンス: {body}")
+            return True
         else:
-            print(f"❌ FastAPIエラー: {response.status_code} - {response.text}")
+            print(f"❌ FastAPIエラー: {body}")
     except Exception as e:
         print(f"❌ FastAPI送信失敗: {e}")
+    return False
+
+# 複数の仕訳を /journal/batch でまとめて送信する（明細ごとの結果を返す）
+def send_batch_to_fastapi(items: list):
+    try:
+        result = get_journal_client().send_batch(items)
+        print(f"✅ FastAPIへ一括送信: 受理 {result.get('accepted')}件 / エラー {result.get('rejected')}件")
+        return result
+    except Exception as e:
+        print(f"❌ FastAPI一括送信失敗: {e}")
+        return {"status": "error", "accepted": 0, "rejected": len(items), "message": str(e)}
 
 
 # ==========通過したデータをスプレッドシートへ転記する ==========
 
-def append_multi_entry_transaction(entry: dict):
+# 仕訳帳ライター（認証・サービス・sheetId を使い回し、まとめて追記する。シートは SHEET_NAME）
+_sheets_writer = None
+_sheets_writer_lock = threading.Lock()
+
+def get_sheets_writer() -> SheetsJournalWriter:
+    global _sheets_writer
+    with _sheets_writer_lock:
+        if _sheets_writer is None:
+            _sheets_writer = SheetsJournalWriter(
+                CREDENTIALS_PATH,
+                SPREADSHEET_ID,
+                sheet_name=SHEET_NAME,
+                max_batch=int(os.getenv("SHEETS_MAX_BATCH", "20")),
+                flush_interval=float(os.getenv("SHEETS_FLUSH_INTERVAL", "5")),
+                profiler=profiler,
+            )
+            atexit.register(_sheets_writer.close)
+        return _sheets_writer
+
+def append_multi_entry_transaction(entry: dict, flush: bool = False):
     """
     ==============================
     📘 スプレッドシート表示ルール（仕訳出力方針）
@@ -350,6 +581,8 @@ def append_multi_entry_transaction(entry: dict):
     - 空白行は作らない
     - 日付と摘要（summary）は1行目にのみ表示
     - 出力された取引範囲には罫線（上下左右＆内部線）を付与
+    - 取引はキューに溜め、SHEETS_MAX_BATCH 件または SHEETS_FLUSH_INTERVAL 秒ごとにまとめて書き込む
+      （flush=True ですぐに書き込む）
 
     entry の構造:
     {
@@ -359,98 +592,11 @@ def append_multi_entry_transaction(entry: dict):
         "summary": "通信費の支払い"
     }
     """
-
-    try:
-        # 認証スコープ
-        SCOPES= ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        try:
-            # 🔑 新しい Credentials を使った認証処理
-            credentials = Credentials.from_service_account_file(CREDENTIALS_PATH, scopes=SCOPES)
-            client = gspread.authorize(credentials)
-            
-            # デバッグ用
-            try:
-                spreadsheet = client.open(SPREADSHEET_TITLE)  # ここは「ファイル名」
-                print(f"✅ スプレッドシート『{spreadsheet.title}』を開きました")
-
-                worksheets = spreadsheet.worksheets()
-                print("📄 含まれているワークシート名一覧:")
-                for ws in worksheets:
-                    print(" -", ws.title)
-
-            except Exception as e:
-                print("❌ スプレッドシートのタイトル名が一致していないか、認証に失敗しています")
-                print("📄 エラー内容:", e)
-
-            
-            # シート取得 書き込み操作用
-            gsheet = client.open(SPREADSHEET_TITLE).worksheet("仕訳帳")
-
-        except Exception as e:
-            print(f"❌ gsheet の初期化に失敗しました（シート名誤りまたは認証エラー）: {e}")
-            return
-        
-        # Google Sheets API クライアント（罫線など高機能操作用）
-        service = build("sheets", "v4", credentials=credentials)
-        spreadsheet_info = service.spreadsheets().get(spreadsheetId=SPREADSHEET_ID).execute()
-        spreadsheet_id = SPREADSHEET_ID
-        sheet_id = spreadsheet_info["sheets"][0]["properties"]["sheetId"]  # "sheetId" は変数ではなく、Google APIが付与しているID
-
-
-        print("✅ 仕訳データをスプレッドシートに追加しました。")
-    
-    except Exception as e:
-        print(f"❌ スプレッドシートの追加に失敗しました: {e}")
-
-
-    # 複数明細を行データに変換 　出力行数 = 最大明細数（借方 or 貸方）
-    num_rows = max(len(entry["debit_entries"]), len(entry["credit_entries"]))
-    values = []
-
-    for i in range(num_rows):
-        debit = entry["debit_entries"][i] if i < len(entry["debit_entries"]) else {"account": "", "amount": ""}
-        credit = entry["credit_entries"][i] if i < len(entry["credit_entries"]) else {"account": "", "amount": ""}
-
-        row = [
-            entry["date"] if i == 0 else "",
-            debit["account"],
-            debit["amount"],
-            credit["account"],
-            credit["amount"],
-            entry["summary"] if i == 0 else ""
-        ]
-        values.append(row)
-
-    # 現在の最終行取得（1-indexed）
-    start_row = len(gsheet.get_all_values()) + 1
-    gsheet.append_rows(values, value_input_option="USER_ENTERED")
-
-    # 罫線リクエスト設定
-    border_request = {
-        "updateBorders": {
-            "range": {
-                "sheetId": sheet_id,
-                "startRowIndex": start_row - 1,
-                "endRowIndex": start_row - 1 + num_rows,
-                "startColumnIndex": 0,
-                "endColumnIndex": 6
-            },
-            "top":    {"style": "SOLID", "width": 1, "color": {"red": 0, "green": 0, "blue": 0}},
-            "bottom": {"style": "SOLID", "width": 1, "color": {"red": 0, "green": 0, "blue": 0}},
-            "left":   {"style": "SOLID", "width": 1, "color": {"red": 0, "green": 0, "blue": 0}},
-            "right":  {"style": "SOLID", "width": 1, "color": {"red": 0, "green": 0, "blue": 0}},
-            "innerHorizontal": {"style": "SOLID", "width": 1, "color": {"red": 0, "green": 0, "blue": 0}},
-            "innerVertical":   {"style": "SOLID", "width": 1, "color": {"red": 0, "green": 0, "blue": 0}},
-        }
-    }
-
-    # Sheets APIで罫線を生成
-    service.spreadsheets().batchUpdate(
-        spreadsheetId=spreadsheet_id,
-        body={"requests": [border_request]}
-    ).execute()
-
-    print(f"✅ {num_rows}行の複合仕訳を追加し、罫線を設定しました。")
+    writer = get_sheets_writer()
+    with profiler.stage("sheets_enqueue"):
+        writer.enqueue(entry)
+    if flush:
+        writer.flush()
     
 
 # 減価償却累計額を資産ごとに管理
@@ -533,37 +679,239 @@ def convert_gpt_entries_to_transaction(entry_data: dict) -> dict:
 # GPTプロンプト生成関数
 # GPTの出力に fiscal dates を補完する関数
 # OCR→GPT→日付補完→送信まで一括実行する関数
-def process_ocr_and_send(frame):
-    ocr_text = extract_text_from_frame(frame)
-    print("====================================")
-    print("📄 OCR出力:")
-    print(ocr_text)
-    print("====================================")
+# GPT応答キャッシュ（同じOCRテキスト・プロンプト・モデルなら GPT を呼ばない）
+GPT_CACHE_PATH = os.getenv("GPT_CACHE_PATH", ".cache/gpt_responses.sqlite3")
+GPT_CACHE_BYPASS = os.getenv("GPT_CACHE_BYPASS", "0") == "1"
+_gpt_cache = None
+_gpt_cache_lock = threading.Lock()
+
+def get_gpt_cache():
+    """GPT_CACHE_PATH が空ならキャッシュを使わない（None を返す）"""
+    global _gpt_cache
+    with _gpt_cache_lock:
+        if _gpt_cache is None and GPT_CACHE_PATH:
+            _gpt_cache = GptResponseCache(
+                GPT_CACHE_PATH,
+                ttl=int(os.getenv("GPT_CACHE_TTL", str(30 * 24 * 3600))),
+                max_entries=int(os.getenv("GPT_CACHE_MAX_ENTRIES", "5000")),
+            )
+        return _gpt_cache
+
+# GPT出力の検証に失敗した項目を聞き直す回数（0 なら聞き直さずに送信を中止する）
+GPT_REPAIR_MAX_ATTEMPTS = int(os.getenv("GPT_REPAIR_MAX_ATTEMPTS", "1"))
+validation_stats = defaultdict(int)
+_validation_lock = threading.Lock()
+
+def _count_validation(result: str):
+    with _validation_lock:
+        validation_stats[result] += 1
+
+def validate_and_repair(gpt_data: dict, ocr_text: str):
+    """
+    GPTの出力を app/schemas.py のモデルでローカルに検証する。
+    決まった規則で直せるものは直し、直せなかった項目だけを GPT に聞き直す。
+    送信できない場合は None を返す（FastAPI・減価償却の計算より前に止める）。
+    """
+    with profiler.stage("validate"):
+        repairs = repair_journal(gpt_data, ocr_text)
+        errors = validate_journal(gpt_data)
+    reasked = False
+    for _ in range(GPT_REPAIR_MAX_ATTEMPTS):
+        if not errors or "type" in errors:
+            break
+        type_ = gpt_data["type"]
+        print(f"🔁 不正な項目だけをGPTに聞き直します: {errors}")
+        reasked = True
+        with profiler.stage("gpt_repair") as sample:
+            content, tokens = ask_gpt_messages(prompts.build_repair_messages(type_, ocr_text, errors), json_mode=True)
+            _record_tokens(f"repair:{type_}", tokens)
+            sample["prompt_tokens"] = tokens["prompt_tokens"]
+            sample["completion_tokens"] = tokens["completion_tokens"]
+        try:
+            answer = json.loads(content)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(answer, dict):
+            gpt_data.update({name: value for name, value in answer.items() if name in errors})
+        gpt_data = merge_fiscal_dates_into_gpt(gpt_data, ocr_text)
+        repairs += repair_journal(gpt_data, ocr_text)
+        errors = validate_journal(gpt_data)
+
+    if repairs:
+        print("🩹 GPT出力を自動修復しました: " + " / ".join(repairs))
+    if errors:
+        _count_validation("rejected")
+        print(f"❌ 仕訳の検証に失敗したため送信を中止します: {errors}")
+        return None
+    _count_validation("reasked" if reasked else "repaired" if repairs else "passed")
+    return gpt_data
 
-    prompt = build_prompt(ocr_text)
-    gpt_result = ask_gpt(prompt)
-    print("🧠 GPTによる取引分類:")
+# 定型文はルールで仕訳して GPT を呼ばない（信頼度が RULES_MIN_CONFIDENCE 未満なら GPT に回す）
+RULES_ENABLED = os.getenv("RULES_ENABLED", "1") != "0"
+RULES_MIN_CONFIDENCE = float(os.getenv("RULES_MIN_CONFIDENCE", "0.9"))
+rule_stats = defaultdict(int)
+
+def journal_from_rules(ocr_text: str):
+    """ルールで仕訳できて検証も通れば仕訳データを返す（できなければ None）"""
+    with profiler.stage("rules"):
+        data, confidence, reasons = classify_by_rules(ocr_text)
+        if data is not None and confidence >= RULES_MIN_CONFIDENCE:
+            data = merge_fiscal_dates_into_gpt(data, ocr_text)
+            errors = validate_journal(data)
+            if errors:
+                reasons = reasons + [f"検証エラー: {errors}"]
+                data = None
+        else:
+            data = None
+    with _validation_lock:
+        rule_stats["hit" if data is not None else "fallback"] += 1
+    if data is None:
+        print(f"🤖 ルールでは判定できないため GPT を使います（信頼度 {confidence:.2f}: {' / '.join(reasons) or '該当なし'}）")
+    return data
+
+# OCRテキスト → （ルール or GPT）→ 日付補完 → 検証・修復 → 減価償却費計算 までを行い、FastAPIへ送る仕訳データを返す
+def build_journal_proposal(ocr_text: str, use_cache: bool = True):
+    gpt_data = journal_from_rules(ocr_text) if RULES_ENABLED else None
+    if gpt_data is not None:
+        print("⚡ ルールで仕訳しました（GPT 呼び出しなし）:")
+        print(json.dumps(gpt_data, ensure_ascii=False))
+    else:
+        gpt_data = build_journal_from_gpt(ocr_text, use_cache)
+    if gpt_data is None:
+        return None
+    return add_depreciation_amount(gpt_data)
+
+# GPT応答キャッシュの鍵と、キャッシュ済みの応答（なければ None）を返す
+def _lookup_gpt_cache(ocr_text: str, prompt_version: str, use_cache: bool = True):
+    gpt_cache = get_gpt_cache()
+    cache_key = make_cache_key(ocr_text, prompt_version, GPT_MODEL)
+    use_cache = use_cache and gpt_cache is not None and not GPT_CACHE_BYPASS
+    return cache_key, (gpt_cache.get(cache_key) if use_cache else None)
+
+# GPTの応答を読み、日付補完・検証・修復をして、検証を通った仕訳だけをキャッシュに保存する
+def _journal_from_gpt_result(gpt_result: str, ocr_text: str, cache_key: str, prompt_version: str, cached: bool):
+    print("🧠 GPTによる取引分類:" + ("（キャッシュ）" if cached else ""))
     print(gpt_result)
 
     try:
         gpt_data = json.loads(gpt_result)
     except json.JSONDecodeError as e:
         print("❌ GPTの出力がJSON形式ではありません。送信を中止します。")
-        return
+        return None
+
+    if not isinstance(gpt_data, dict):
+        print("❌ GPTの出力がJSONオブジェクトではありません。送信を中止します。")
+        return None
 
     gpt_data = merge_fiscal_dates_into_gpt(gpt_data, ocr_text)
+    gpt_data = validate_and_repair(gpt_data, ocr_text)
+    if gpt_data is None:
+        return None
 
+    # 検証を通った応答（修復後）だけを保存する（キャッシュを使わない指定でも結果は保存する）
+    gpt_cache = get_gpt_cache()
+    if not cached and gpt_cache is not None:
+        gpt_cache.put(cache_key, json.dumps(gpt_data, ensure_ascii=False), GPT_MODEL, prompt_version)
+    return gpt_data
+
+# GPT で仕訳データを作る（キャッシュ → GPT → 日付補完 → 検証・修復）
+def build_journal_from_gpt(ocr_text: str, use_cache: bool = True):
+    two_stage = PROMPT_MODE == "two_stage"
+    prompt_version = prompts.PROMPT_VERSIONS["two_stage" if two_stage else "single"]
+    cache_key, gpt_result = _lookup_gpt_cache(ocr_text, prompt_version, use_cache)
+    cached = gpt_result is not None
+    if not cached:
+        with profiler.stage("gpt") as sample:
+            tokens_before = _total_tokens()
+            if two_stage:
+                gpt_result = ask_gpt_two_stage(ocr_text)
+            else:
+                prompt = build_prompt(ocr_text)
+                gpt_result = ask_gpt(prompt)
+            tokens_after = _total_tokens()
+            sample["prompt_tokens"] = tokens_after[0] - tokens_before[0]
+            sample["completion_tokens"] = tokens_after[1] - tokens_before[1]
+            sample["bytes_received"] = len(gpt_result.encode("utf-8"))
+    return _journal_from_gpt_result(gpt_result, ocr_text, cache_key, prompt_version, cached)
+
+# 1枚の撮影に複数の取引がある時（仕訳問題のページ・明細）は取引ごとに分けてまとめて処理する
+MULTI_TRANSACTION_ENABLED = os.getenv("MULTI_TRANSACTION_ENABLED", "0") == "1"
+MULTI_TRANSACTION_MAX_PER_CALL = int(os.getenv("MULTI_TRANSACTION_MAX_PER_CALL", "10"))
+
+def split_ocr_text(ocr_text: str) -> list:
+    return split_transactions(ocr_text) if MULTI_TRANSACTION_ENABLED else [ocr_text]
+
+# 複数の取引文を1回の GPT 呼び出しで抽出する（取引文と同じ順番、抽出できなかった取引は None）
+def ask_gpt_multi(ocr_texts: list) -> list:
+    content, tokens = ask_gpt_messages(prompts.build_multi_extraction_messages(ocr_texts), json_mode=True)
+    _record_tokens("extract:multi", tokens)
+    results = [None] * len(ocr_texts)
+    data = _json_object(content)
+    items = data.get("transactions") if data is not None else None
+    if not isinstance(items, list):
+        print("❌ GPTの出力に transactions の配列がありません。")
+        return results
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        try:
+            index = int(item.pop("index", position + 1)) - 1
+        except (TypeError, ValueError):
+            index = position
+        if 0 <= index < len(results) and results[index] is None:
+            results[index] = item
+    return results
+
+def build_journal_proposals(ocr_texts: list, use_cache: bool = True) -> list:
+    """
+    複数の取引文を仕訳データにする（取引文と同じ順番のリスト、仕訳にできなかった取引は None）。
+    ルール → GPT応答キャッシュ の順に試し、残った取引だけを
+    MULTI_TRANSACTION_MAX_PER_CALL 件ずつ1回の GPT 呼び出しでまとめて抽出する。
+    """
+    prompt_version = prompts.PROMPT_VERSIONS["multi"]
+    journals = [None] * len(ocr_texts)
+    pending = []
+    for i, text in enumerate(ocr_texts):
+        journals[i] = journal_from_rules(text) if RULES_ENABLED else None
+        if journals[i] is not None:
+            continue
+        cache_key, cached_result = _lookup_gpt_cache(text, prompt_version, use_cache)
+        if cached_result is not None:
+            journals[i] = _journal_from_gpt_result(cached_result, text, cache_key, prompt_version, cached=True)
+        else:
+            pending.append((i, cache_key))
+
+    for start in range(0, len(pending), max(1, MULTI_TRANSACTION_MAX_PER_CALL)):
+        chunk = pending[start:start + max(1, MULTI_TRANSACTION_MAX_PER_CALL)]
+        with profiler.stage("gpt", transactions=len(chunk)) as sample:
+            tokens_before = _total_tokens()
+            results = ask_gpt_multi([ocr_texts[i] for i, _ in chunk])
+            tokens_after = _total_tokens()
+            sample["prompt_tokens"] = tokens_after[0] - tokens_before[0]
+            sample["completion_tokens"] = tokens_after[1] - tokens_before[1]
+        for (i, cache_key), result in zip(chunk, results):
+            if result is None:
+                print(f"⚠️ 取引 {i + 1} の仕訳が GPT の出力にありません。")
+                continue
+            gpt_result = json.dumps(result, ensure_ascii=False)
+            journals[i] = _journal_from_gpt_result(gpt_result, ocr_texts[i], cache_key, prompt_version, cached=False)
+
+    return [add_depreciation_amount(journal) if journal is not None else None for journal in journals]
+
+# 減価償却の仕訳なら償却表から当期の減価償却費を求めて明細に入れる
+def add_depreciation_amount(gpt_data: dict):
     if gpt_data.get("type") == "depreciation":
-        dep = calculate_depreciation_by_year(
-            starting_date=gpt_data.get("acquisition_date"),
-            calc_closing_date=gpt_data.get("calc_closing_date"),
-            method=gpt_data.get("method"),
-            price=gpt_data.get("amount"),
-            life=gpt_data.get("life"),
-            target_year=gpt_data.get("target_year"),
-            current_volume=gpt_data.get("current_volume"),
-            total_volume=gpt_data.get("total_volume")
-        )
+        with profiler.stage("depreciation"):
+            dep = calculate_depreciation_by_year(
+                starting_date=gpt_data.get("acquisition_date"),
+                calc_closing_date=gpt_data.get("calc_closing_date"),
+                method=gpt_data.get("method"),
+                price=gpt_data.get("amount"),
+                life=gpt_data.get("life"),
+                target_year=gpt_data.get("target_year"),
+                current_volume=gpt_data.get("current_volume"),
+                total_volume=gpt_data.get("total_volume")
+            )
         if dep:
             gpt_data["closing_date"] = gpt_data.get("calc_closing_date")  # FastAPIに送るために closing_date を追加
             print(f"✅ 減価償却費を上書き: {dep}")
@@ -578,7 +926,52 @@ def process_ocr_and_send(frame):
         else:
             print("❌ 減価償却費が取得できませんでした。")
 
-    send_to_fastapi(gpt_data.get("type"), gpt_data)
+    return gpt_data
+
+def prepare_journal_proposals(frame) -> list:
+    """
+    撮影1回分の OCR → GPT（減価償却費の計算を含む）までを行い、承認前の提案のリストを返す
+    （1枚に複数の取引があれば取引ごとに1件）。
+    FastAPI への送信とスプレッドシートへの記入は承認後に record_approved_proposals() で行う。
+    確認（Y/N）は行わないため、ワーカースレッドからも呼び出せる。
+    """
+    with profiler.capture():
+        proposals = _prepare_journal_proposals(frame)
+    print("⏱ ステージ別処理時間（p50）: " + ", ".join(
+        f"{name}={stats['p50_sec']:.2f}s" for name, stats in profiler.summary().items()
+    ))
+    return proposals
+
+def _prepare_journal_proposals(frame):
+    ocr_text = extract_text_from_frame(frame)
+    print("====================================")
+    print("📄 OCR出力:")
+    print(ocr_text)
+    print("====================================")
+    return proposals_from_text(ocr_text)
+
+# 複数の取引は1回の GPT 呼び出しで抽出する
+def _multi_transaction_proposals(segments: list, use_cache: bool = True) -> list:
+    print(f"🧾 {len(segments)}件の取引に分けて処理します。")
+    journals = build_journal_proposals(segments, use_cache)
+    ready = [(text, journal) for text, journal in zip(segments, journals) if journal is not None]
+    if len(ready) < len(segments):
+        print(f"⚠️ {len(segments) - len(ready)}件の取引は仕訳にできませんでした。")
+    return [
+        {"ocr_text": text, "journal": journal, "transaction": convert_gpt_entries_to_transaction(journal)}
+        for text, journal in ready
+    ]
+
+def proposals_from_text(ocr_text: str, use_cache: bool = True) -> list:
+    """OCRテキストを取引ごとの提案のリストにする（仕訳にできた取引だけ）"""
+    segments = split_ocr_text(ocr_text)
+    if len(segments) > 1:
+        return _multi_transaction_proposals(segments, use_cache)
+
+    gpt_data = build_journal_proposal(ocr_text, use_cache)
+    if gpt_data is None:
+        return []
+
 
 # ====================================================
     # スプレッドシートへの記録
@@ -652,62 +1045,97 @@ def process_ocr_and_send(frame):
         
     # 仕訳構造を変換    
     transaction = convert_gpt_entries_to_transaction(gpt_data)
-    
-    # JSONプレビューを表示（任意）
-    import pprint
-    print("\n📄 スプレッドシートに記入予定の仕訳:")
-    pprint.pprint(transaction)
+    return [{"ocr_text": ocr_text, "journal": gpt_data, "transaction": transaction}]
 
-    # ✅ ユーザーに確認を取る
-    user_input = input("📌 この内容をスプレッドシートに記入しますか？ [Y/N]: ").strip().lower()
-
-    if user_input == "y":
-        try:
-            append_multi_entry_transaction(transaction)
-        except Exception as e:
-            print(f"⚠️ スプレッドシートへの書き込みに失敗しました: {e}")
+def record_approved_proposals(proposals: list) -> list:
+    """
+    承認された提案だけを FastAPI に送り（仕訳の保存・残高の更新）、受理された取引をスプレッドシートに記入する。
+    複数件は /journal/batch でまとめて送る。受理された提案のリストを返す。
+    """
+    if not proposals:
+        return []
+    if len(proposals) == 1:
+        journal = proposals[0]["journal"]
+        accepted = proposals if send_to_fastapi(journal.get("type"), journal) else []
     else:
-        print("🛑 スプレッドシートへの記入はキャンセルされました。")
-
-# ====================================================
+        items = [proposal["journal"] for proposal in proposals]
+        with profiler.stage("fastapi", transactions=len(items)) as sample:
+            sample["bytes_sent"] = len(json.dumps(items, ensure_ascii=False).encode("utf-8"))
+            result = send_batch_to_fastapi(items)
+        ok = {r.get("index") for r in result.get("results") or [] if r.get("status") == "success"}
+        for r in result.get("results") or []:
+            if r.get("status") != "success":
+                print(f"❌ 取引 {r.get('index', 0) + 1} のFastAPI送信エラー: {r.get('errors') or r.get('message')}")
+        accepted = [proposal for i, proposal in enumerate(proposals) if i in ok]
+    if len(accepted) < len(proposals):
+        print(f"⚠️ {len(proposals) - len(accepted)}件の取引はFastAPIに受理されなかったため、スプレッドシートに記入しません。")
+    if not accepted:
+        return []
 
+    try:
+        for proposal in accepted:
+            append_multi_entry_transaction(proposal["transaction"])
+        get_sheets_writer().flush()
+    except Exception as e:
+        print(f"⚠️ スプレッドシートへの書き込みに失敗しました: {e}")
+    return accepted
 
-# === メインループ ===
-# カメラ起動・白枠描画・キー操作ループを統合
-print("📷 カメラを起動中... (ESCキーで終了、's'キーで処理実行)")
+# 撮影1回分を処理し、端末で確認してから FastAPI に送ってスプレッドシートに記入する（確認の間は処理が止まる）
+def process_ocr_and_send(frame):
+    import pprint
 
-cap = cv2.VideoCapture(0)
+    approved = []
+    for proposal in prepare_journal_proposals(frame):
+        transaction = proposal["transaction"]
 
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        print("❌ カメラからフレームを取得できませんでした。")
-        break
+        # JSONプレビューを表示（任意）
+        print("\n📄 スプレッドシートに記入予定の仕訳:")
+        pprint.pprint(transaction)
 
-    height, width, _ = frame.shape
-    # 中央90%の範囲を計算
-    box_width = int(width * 0.8)  # ←ここを変更することで撮影する範囲を設定できる
-    box_height = int(height * 0.8)
-    start_x = (width - box_width) // 2
-    start_y = (height - box_height) // 2
-    end_x = start_x + box_width
-    end_y = start_y + box_height
+        # ✅ ユーザーに確認を取る
+        user_input = input("📌 この内容をスプレッドシートに記入しますか？ [Y/N]: ").strip().lower()
 
-    # 白枠の描画
-    cv2.rectangle(frame, (start_x, start_y), (end_x, end_y), (255, 255, 255), 2)
-    # フレームを表示
-    cv2.imshow("Camera", frame)
+        if user_input == "y":
+            approved.append(proposal)
+        else:
+            print("🛑 この取引はFastAPIに送らず、スプレッドシートへの記入もキャンセルされました。")
 
-    # キー操作を取得
-    key = cv2.waitKey(1)
-    # 's'キーでOCR→GPT処理
-    if key == ord('s'):
-        cropped_frame = frame[start_y:end_y, start_x:end_x]
-        process_ocr_and_send(cropped_frame)
+    # 承認した取引だけをまとめて送信・記入する
+    record_approved_proposals(approved)
 
-    if key == 27:
-        break
+# ====================================================
 
-cap.release()
-cv2.destroyAllWindows()
 
+# セッション中に使ったサービスの統計を表示し、ステージ別計測を保存する
+def print_session_stats():
+    if _depreciation_cache is not None:
+        print(f"📊 償却表キャッシュ: {_depreciation_cache.stats()}")
+    print(f"📊 OCR計測: {vision_ocr.timings.summary()}")
+    if _ocr_cache is not None:
+        print(f"📊 OCRキャッシュ: {_ocr_cache.stats()}")
+    if _ocr_router is not None:
+        print(f"📊 OCRバックエンド: {_ocr_router.stats()}")
+    if _gpt_cache is not None:
+        print(f"📊 GPTキャッシュ: {_gpt_cache.stats()}")
+    print(f"📊 GPTトークン使用量: {dict(token_usage)}")
+    print(f"📊 GPT出力の検証: {dict(validation_stats)}")
+    print(f"📊 ルールによる仕訳: {dict(rule_stats)}")
+    if _sheets_writer is not None:
+        _sheets_writer.close()
+        print(f"📊 スプレッドシート書き込み: {_sheets_writer.stats()}")
+    print("📊 ステージ別計測:")
+    print(profiler.to_json(PIPELINE_METRICS_PATH))
+    if PIPELINE_METRICS_PATH:
+        with open(os.path.splitext(PIPELINE_METRICS_PATH)[0] + ".prom", "w", encoding="utf-8") as f:
+            f.write(profiler.to_prometheus())
+
+
+# カメラの操作画面は app.services.camera_app にある（python -m app.services.camera_app）
+def main():
+    from app.services import camera_app
+    camera_app.main()
+
+
+# バッチ処理など他のモジュールから import した時はカメラを起動しない
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,427 @@
+# --- 仕訳の永続化（SQLite WAL・追記専用）---
+#
+# journal       : 1取引1行（タイプ・日付・摘要・取引先・元のリクエストJSON）
+# journal_lines : 借方・貸方の明細を1勘定1行で保存（勘定科目・日付で検索するため）
+# 日付・勘定科目・タイプに索引を張り、(date, id) のキーセットでページングするため
+# 何百万行あってもページ取得の速さは変わらない。
+# store.batch() の中では複数取引を1回のコミットで書き込む。
+# account_balances には勘定科目・月ごとの借方/貸方合計を保存と同じトランザクションで加算し、
+# 試算表は仕訳を走査せずにこの表だけから作る。
+# fixed_assets（固定資産台帳）には asset_purchase の仕訳を保存と同じトランザクションで登録し、
+# asset_depreciation に決算日ごとの減価償却の計上を記録する（同じ決算日を二重に計上しないため）。
+# 写真から作った depreciation の仕訳も、台帳の資産（資産名・取得日・取得価額が同じ）に当たれば
+# target_year の決算日に計上済みとして同じトランザクションで記録する。
+
+import base64
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL,
+    date TEXT NOT NULL,
+    summary TEXT,
+    counterparty TEXT,
+    amount REAL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS journal_lines (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    journal_id INTEGER NOT NULL REFERENCES journal(id),
+    date TEXT NOT NULL,
+    account TEXT NOT NULL,
+    side TEXT NOT NULL CHECK (side IN ('debit', 'credit')),
+    amount REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_journal_date ON journal(date, id);
+CREATE INDEX IF NOT EXISTS idx_journal_type ON journal(type, date, id);
+CREATE INDEX IF NOT EXISTS idx_lines_journal ON journal_lines(journal_id);
+CREATE INDEX IF NOT EXISTS idx_lines_account ON journal_lines(account, date, id);
+CREATE INDEX IF NOT EXISTS idx_lines_date ON journal_lines(date, id);
+CREATE TABLE IF NOT EXISTS account_balances (
+    account TEXT NOT NULL,
+    period TEXT NOT NULL,
+    debit_total REAL NOT NULL DEFAULT 0,
+    credit_total REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (account, period)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_balances_period ON account_balances(period, account);
+CREATE TABLE IF NOT EXISTS fixed_assets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    journal_id INTEGER NOT NULL UNIQUE REFERENCES journal(id),
+    asset_name TEXT NOT NULL,
+    summary TEXT,
+    acquisition_date TEXT NOT NULL,
+    amount REAL NOT NULL,
+    method TEXT,
+    life INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_assets_acquisition ON fixed_assets(acquisition_date, id);
+CREATE TABLE IF NOT EXISTS asset_depreciation (
+    asset_id INTEGER NOT NULL REFERENCES fixed_assets(id),
+    closing_date TEXT NOT NULL,
+    journal_id INTEGER NOT NULL REFERENCES journal(id),
+    amount REAL NOT NULL,
+    PRIMARY KEY (asset_id, closing_date)
+) WITHOUT ROWID;
+"""
+
+ACCUMULATED_DEPRECIATION = "減価償却累計額"
+
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(date: str, id_: int) -> str:
+    return base64.urlsafe_b64encode(f"{date}|{id_}".encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    try:
+        date, id_ = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").rsplit("|", 1)
+        return date, int(id_)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"cursor が不正です: {cursor}") from e
+
+
+def resolve_account(data, account: str) -> str:
+    """減価償却の「減価償却累計額」は資産ごとの「{asset_name}減価償却累計額」にする"""
+    if data.type == "depreciation" and account == ACCUMULATED_DEPRECIATION and getattr(data, "asset_name", ""):
+        return f"{data.asset_name.strip()}{ACCUMULATED_DEPRECIATION}"
+    return account
+
+
+def journal_lines(data) -> list:
+    """リクエストの entries を (勘定科目, 貸借, 金額) の明細に展開する"""
+    lines = []
+    for entry in data.entries:
+        lines.append((resolve_account(data, entry.debit), "debit", entry.amount))
+        lines.append((resolve_account(data, entry.credit), "credit", entry.amount))
+    return lines
+
+
+def period_of(date: str) -> str:
+    """"2025-04-15" → "2025-04"（残高を集計する月）"""
+    return date[:7]
+
+
+class JournalStore:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._write_lock = threading.RLock()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        # 残高表を追加する前に保存された仕訳があれば作り直す
+        has_lines = conn.execute("SELECT 1 FROM journal_lines LIMIT 1").fetchone()
+        has_balances = conn.execute("SELECT 1 FROM account_balances LIMIT 1").fetchone()
+        if has_lines and not has_balances:
+            self.rebuild_balances()
+        # 固定資産台帳を追加する前に保存された固定資産の購入があれば登録する
+        has_assets = conn.execute("SELECT 1 FROM journal WHERE type = 'asset_purchase' LIMIT 1").fetchone()
+        has_register = conn.execute("SELECT 1 FROM fixed_assets LIMIT 1").fetchone()
+        if has_assets and not has_register:
+            self.rebuild_fixed_assets()
+            self.link_depreciation_journals()
+
+    def _conn(self) -> sqlite3.Connection:
+        # 接続はスレッドごとに持つ（FastAPI の同期ハンドラはスレッドプールで動く）
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # トランザクションは batch() で明示的に開始・コミットする（sqlite3 の暗黙の BEGIN は使わない）
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.batch_depth = 0
+        return conn
+
+    @contextmanager
+    def batch(self):
+        """この中の record() は最後に1回だけコミットする"""
+        conn = self._conn()
+        with self._write_lock:
+            depth = self._local.batch_depth + 1
+            self._local.batch_depth = depth
+            # 一番外側で BEGIN し、入れ子の場合は SAVEPOINT にして失敗した1件だけを取り消す
+            savepoint = f"batch_{depth}"
+            if depth == 1:
+                conn.execute("BEGIN IMMEDIATE")
+            else:
+                conn.execute(f"SAVEPOINT {savepoint}")
+            try:
+                yield self
+                if depth == 1:
+                    conn.execute("COMMIT")
+                else:
+                    conn.execute(f"RELEASE {savepoint}")
+            except BaseException:
+                if depth == 1:
+                    conn.execute("ROLLBACK")
+                else:
+                    conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+                raise
+            finally:
+                self._local.batch_depth = depth - 1
+
+    def record(self, data, lines=None, link_asset=True) -> int:
+        """
+        仕訳リクエストを保存して journal.id を返す（lines で明細の勘定科目を差し替えられる）。
+        link_asset=False なら depreciation の仕訳を台帳の資産に結び付けない（record_depreciation 用）。
+        """
+        with self.batch():
+            conn = self._conn()
+            counterparty = getattr(data, "customer", None) or getattr(data, "supplier", None) or getattr(data, "asset_name", None)
+            cur = conn.execute(
+                "INSERT INTO journal (type, date, summary, counterparty, amount, payload, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (data.type, data.date, data.summary, counterparty, data.amount, data.model_dump_json(), time.time()),
+            )
+            journal_id = cur.lastrowid
+            lines = lines or journal_lines(data)
+            conn.executemany(
+                "INSERT INTO journal_lines (journal_id, date, account, side, amount) VALUES (?, ?, ?, ?, ?)",
+                [(journal_id, data.date, account, side, amount) for account, side, amount in lines],
+            )
+            period = period_of(data.date)
+            conn.executemany(
+                "INSERT INTO account_balances (account, period, debit_total, credit_total) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (account, period) DO UPDATE SET"
+                " debit_total = debit_total + excluded.debit_total,"
+                " credit_total = credit_total + excluded.credit_total",
+                [
+                    (account, period, amount if side == "debit" else 0, amount if side == "credit" else 0)
+                    for account, side, amount in lines
+                ],
+            )
+            if data.type == "asset_purchase":
+                self._register_asset(conn, journal_id, data)
+            elif data.type == "depreciation" and link_asset:
+                self._link_depreciation(conn, journal_id, data)
+            return journal_id
+
+    @staticmethod
+    def _register_asset(conn, journal_id, data):
+        conn.execute(
+            "INSERT INTO fixed_assets (journal_id, asset_name, summary, acquisition_date, amount, method, life)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (journal_id, data.asset_name.strip(), data.summary, data.date, data.amount,
+             getattr(data, "method", None), getattr(data, "life", None)),
+        )
+
+    @staticmethod
+    def _link_depreciation(conn, journal_id, data):
+        """
+        depreciation の仕訳に当たる台帳の資産（資産名・取得日・取得価額が同じで、その決算日が未計上）があれば
+        計上済みとして記録する。当たらなければ何もしない（台帳にない資産の減価償却）。
+        """
+        closing_date = data.target_year or data.date
+        row = conn.execute(
+            "SELECT a.id FROM fixed_assets a"
+            " WHERE a.asset_name = ? AND a.acquisition_date = ? AND a.amount = ?"
+            " AND NOT EXISTS (SELECT 1 FROM asset_depreciation d WHERE d.asset_id = a.id AND d.closing_date = ?)"
+            " ORDER BY a.id LIMIT 1",
+            (data.asset_name.strip(), data.acquisition_date, data.amount, closing_date),
+        ).fetchone()
+        if row:
+            conn.execute(
+                "INSERT INTO asset_depreciation (asset_id, closing_date, journal_id, amount) VALUES (?, ?, ?, ?)",
+                (row["id"], closing_date, journal_id, sum(entry.amount for entry in data.entries)),
+            )
+
+    def record_depreciation(self, asset_id: int, closing_date: str, data) -> int:
+        """決算の減価償却を保存し、固定資産台帳に計上済みとして記録する"""
+        with self.batch():
+            journal_id = self.record(data, link_asset=False)
+            self._conn().execute(
+                "INSERT INTO asset_depreciation (asset_id, closing_date, journal_id, amount) VALUES (?, ?, ?, ?)",
+                (asset_id, closing_date, journal_id, sum(entry.amount for entry in data.entries)),
+            )
+            return journal_id
+
+    def rebuild_balances(self):
+        """journal_lines から勘定科目・月ごとの残高を集計し直す"""
+        with self.batch():
+            conn = self._conn()
+            conn.execute("DELETE FROM account_balances")
+            conn.execute(
+                "INSERT INTO account_balances (account, period, debit_total, credit_total)"
+                " SELECT account, substr(date, 1, 7),"
+                " SUM(CASE WHEN side = 'debit' THEN amount ELSE 0 END),"
+                " SUM(CASE WHEN side = 'credit' THEN amount ELSE 0 END)"
+                " FROM journal_lines GROUP BY account, substr(date, 1, 7)"
+            )
+
+    def rebuild_fixed_assets(self):
+        """保存済みの asset_purchase の仕訳のうち、台帳にないものを登録する"""
+        from app.schemas import AssetPurchaseRequest
+
+        with self.batch():
+            conn = self._conn()
+            rows = conn.execute(
+                "SELECT id, payload FROM journal WHERE type = 'asset_purchase'"
+                " AND id NOT IN (SELECT journal_id FROM fixed_assets) ORDER BY id"
+            ).fetchall()
+            for row in rows:
+                self._register_asset(conn, row["id"], AssetPurchaseRequest.model_validate_json(row["payload"]))
+
+    def link_depreciation_journals(self):
+        """保存済みの depreciation の仕訳のうち、台帳の資産に結び付いていないものを結び付ける"""
+        from app.schemas import DepreciationRequest
+
+        with self.batch():
+            conn = self._conn()
+            rows = conn.execute(
+                "SELECT id, payload FROM journal WHERE type = 'depreciation'"
+                " AND id NOT IN (SELECT journal_id FROM asset_depreciation) ORDER BY id"
+            ).fetchall()
+            for row in rows:
+                self._link_depreciation(conn, row["id"], DepreciationRequest.model_validate_json(row["payload"]))
+
+    def list_fixed_assets(self, as_of=None) -> list:
+        """
+        固定資産台帳を取得日・ID順で返す。as_of（YYYY-MM-DD）を渡すとその日までに取得した資産だけにし、
+        減価償却累計額・最後に計上した決算日もその日までの計上から集計する。
+        """
+        where, params = "", []
+        if as_of:
+            where = " WHERE a.acquisition_date <= ?"
+            params = [as_of, as_of]
+        rows = self._conn().execute(
+            "SELECT a.id, a.journal_id, a.asset_name, a.summary, a.acquisition_date, a.amount, a.method, a.life,"
+            " COALESCE(SUM(d.amount), 0) AS accumulated, MAX(d.closing_date) AS last_closing_date"
+            " FROM fixed_assets a LEFT JOIN asset_depreciation d ON d.asset_id = a.id"
+            + (" AND d.closing_date <= ?" if as_of else "")
+            + where
+            + " GROUP BY a.id ORDER BY a.acquisition_date, a.id",
+            params,
+        ).fetchall()
+        assets = [dict(row) for row in rows]
+        for asset in assets:
+            asset["book_value"] = asset["amount"] - asset["accumulated"]
+        return assets
+
+    def trial_balance(self, period_from=None, period_to=None) -> dict:
+        """
+        試算表（合計残高試算表）を返す。期間は "YYYY-MM"。
+        account_balances の（勘定科目数 × 月数）行だけを集計するため、仕訳の件数に依存しない。
+        """
+        where, params = [], []
+        if period_from:
+            where.append("period >= ?")
+            params.append(period_from)
+        if period_to:
+            where.append("period <= ?")
+            params.append(period_to)
+        sql = "SELECT account, SUM(debit_total) AS debit, SUM(credit_total) AS credit FROM account_balances"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " GROUP BY account ORDER BY account"
+        rows = self._conn().execute(sql, params).fetchall()
+
+        accounts = []
+        for row in rows:
+            balance = row["debit"] - row["credit"]
+            accounts.append({
+                "account": row["account"],
+                "debit_total": row["debit"],
+                "credit_total": row["credit"],
+                "debit_balance": balance if balance > 0 else 0,
+                "credit_balance": -balance if balance < 0 else 0,
+            })
+        debit_total = sum(a["debit_total"] for a in accounts)
+        credit_total = sum(a["credit_total"] for a in accounts)
+        return {
+            "period_from": period_from,
+            "period_to": period_to,
+            "accounts": accounts,
+            "debit_total": debit_total,
+            "credit_total": credit_total,
+            "balanced": abs(debit_total - credit_total) < 0.005,
+        }
+
+    def list_entries(self, start=None, end=None, type_=None, cursor=None, limit=100) -> dict:
+        """日付範囲・タイプで仕訳を取得する（日付・ID順、cursor で続きを取得）"""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        where, params = [], []
+        if type_:
+            where.append("type = ?")
+            params.append(type_)
+        if start:
+            where.append("date >= ?")
+            params.append(start)
+        if end:
+            where.append("date <= ?")
+            params.append(end)
+        if cursor:
+            where.append("(date, id) > (?, ?)")
+            params.extend(decode_cursor(cursor))
+        sql = "SELECT id, type, date, summary, counterparty, amount FROM journal"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY date, id LIMIT ?"
+        rows = self._conn().execute(sql, (*params, limit + 1)).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        entries = [dict(row) for row in rows]
+        if entries:
+            ids = [entry["id"] for entry in entries]
+            lines = self._conn().execute(
+                f"SELECT journal_id, account, side, amount FROM journal_lines"
+                f" WHERE journal_id IN ({','.join('?' * len(ids))}) ORDER BY id",
+                ids,
+            ).fetchall()
+            by_journal = {}
+            for line in lines:
+                by_journal.setdefault(line["journal_id"], []).append(
+                    {"account": line["account"], "side": line["side"], "amount": line["amount"]}
+                )
+            for entry in entries:
+                entry["lines"] = by_journal.get(entry["id"], [])
+        next_cursor = encode_cursor(rows[-1]["date"], rows[-1]["id"]) if has_more else None
+        return {"items": entries, "next_cursor": next_cursor}
+
+    def list_account_lines(self, account, start=None, end=None, cursor=None, limit=100) -> dict:
+        """勘定科目ごとの明細を取得する（idx_lines_account を使う）"""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        where, params = ["l.account = ?"], [account]
+        if start:
+            where.append("l.date >= ?")
+            params.append(start)
+        if end:
+            where.append("l.date <= ?")
+            params.append(end)
+        if cursor:
+            where.append("(l.date, l.id) > (?, ?)")
+            params.extend(decode_cursor(cursor))
+        rows = self._conn().execute(
+            "SELECT l.id, l.journal_id, l.date, l.side, l.amount, j.type, j.summary"
+            " FROM journal_lines l JOIN journal j ON j.id = l.journal_id"
+            f" WHERE {' AND '.join(where)} ORDER BY l.date, l.id LIMIT ?",
+            (*params, limit + 1),
+        ).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["date"], rows[-1]["id"]) if has_more else None
+        return {"account": account, "items": [dict(row) for row in rows], "next_cursor": next_cursor}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_journal_store() -> JournalStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = JournalStore(os.getenv("JOURNAL_DB_PATH", "data/journal.sqlite3"))
+        return _store
@@ -0,0 +1,196 @@
+# --- GPT出力のローカル検証と自動修復 ---
+#
+# GPT の出力を FastAPI に送る前（減価償却の計算や Selenium より前）に app/schemas.py のモデルで検証する。
+#   1. repair_journal()  : 決まった規則で直せるものを直す
+#        - 数値の正規化（"150,000円" → 150000、"5年" → 5、全角数字、"未計算" → 0）
+#        - 償却方法の表記ゆれ（"定率法" → "200%定率法"）
+#        - 日付の正規化（"2025年5月22日" / "2025/5/22" / "令和7年5月22日" → "2025-05-22"）
+#        - 必須項目を OCR テキストから補完（日付・顧客名・仕入先・摘要・資産名など）
+#        - 明細が1行だけで金額が合わない時は取引金額に合わせる
+#   2. validate_journal(): モデルの検証と貸借・日付形式の確認をして、失敗した項目 → 理由 を返す
+# 直せなかった項目だけを GPT に聞き直す（prompts.build_repair_messages）。
+
+import re
+import unicodedata
+from datetime import date, datetime
+
+from pydantic import ValidationError
+
+from app.services.prompts import REQUEST_MODELS
+
+DATE_FIELDS = ("date", "acquisition_date", "closing_date", "calc_closing_date", "target_year")
+FLOAT_FIELDS = ("amount", "current_volume", "total_volume")
+INT_FIELDS = ("life",)
+
+# 償却方法の表記ゆれ（固定資産台帳・減価償却エンジンは正式名で扱う）
+METHOD_ALIASES = {"定率法": "200%定率法", "200％定率法": "200%定率法", "級数法償却": "級数法"}
+
+# 和暦の元年（西暦 = 元年 + 年 - 1）
+ERAS = {"令和": 2019, "平成": 1989, "昭和": 1926}
+
+DATE_PATTERN = re.compile(
+    r"(?:(令和|平成|昭和)(\d{1,2}|元)|(\d{4}))\s*[年/\-.]\s*(\d{1,2})\s*[月/\-.]\s*(\d{1,2})\s*日?"
+)
+CUSTOMER_PATTERN = re.compile(r"([^\s、。,]+?)(?:様)?(?:に|へ)(?:[^、。]*?)(?:販売|売り上げ|売上|売却|納品)")
+SUPPLIER_PATTERN = re.compile(r"([^\s、。,]+?)(?:様)?から(?:[^、。]*?)(?:仕入|購入|買)")
+SUPPLIER_SHOP_PATTERN = re.compile(r"([^\s、。,]+?)で(?:[^、。]*?)(?:購入|買)")
+
+
+def normalize_text(value: str) -> str:
+    """全角数字・記号を半角にする"""
+    return unicodedata.normalize("NFKC", value).strip()
+
+
+def parse_number(value):
+    """金額・数量の文字列を数値にする（読めなければ元の値を返す）"""
+    if isinstance(value, bool) or not isinstance(value, str):
+        return value
+    text = normalize_text(value)
+    if text == "未計算":
+        return 0
+    text = re.sub(r"[,\s円¥￥]|年|個|台|km|時間", "", text)
+    if re.fullmatch(r"-?\d+", text):
+        return int(text)
+    if re.fullmatch(r"-?\d+\.\d+", text):
+        return float(text)
+    return value
+
+
+def normalize_date(value):
+    """日付を YYYY-MM-DD にする（読めなければ元の値を返す）"""
+    if not isinstance(value, str):
+        return value
+    match = DATE_PATTERN.search(normalize_text(value))
+    if not match:
+        return value
+    era, era_year, year, month, day = match.groups()
+    if era:
+        year = ERAS[era] + (1 if era_year == "元" else int(era_year)) - 1
+    try:
+        return date(int(year), int(month), int(day)).isoformat()
+    except ValueError:
+        return value
+
+
+def is_iso_date(value) -> bool:
+    try:
+        datetime.strptime(value, "%Y-%m-%d")
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def _missing(data: dict, field: str) -> bool:
+    return data.get(field) in (None, "")
+
+
+def _first_date(ocr_text: str):
+    match = DATE_PATTERN.search(normalize_text(ocr_text))
+    return normalize_date(match.group(0)) if match else None
+
+
+def _fill(data: dict, field: str, value, repairs: list, reason: str):
+    if value not in (None, "") and _missing(data, field):
+        data[field] = value
+        repairs.append(f"{field}: {reason}")
+
+
+def repair_journal(data: dict, ocr_text: str = "") -> list:
+    """data をその場で修復し、行った修復の説明を返す"""
+    repairs = []
+    type_ = data.get("type")
+
+    for field in FLOAT_FIELDS + INT_FIELDS:
+        value = data.get(field)
+        fixed = parse_number(value)
+        if field in INT_FIELDS and isinstance(fixed, float) and fixed.is_integer():
+            fixed = int(fixed)
+        if fixed is not value:
+            data[field] = fixed
+            if fixed != value:
+                repairs.append(f"{field}: {value!r} → {fixed!r}")
+
+    for field in DATE_FIELDS:
+        value = data.get(field)
+        fixed = normalize_date(value)
+        if fixed != value:
+            data[field] = fixed
+            repairs.append(f"{field}: {value!r} → {fixed!r}")
+
+    method = data.get("method")
+    if method in METHOD_ALIASES:
+        data["method"] = METHOD_ALIASES[method]
+        repairs.append(f"method: {method!r} → {data['method']!r}")
+
+    entries = data.get("entries")
+    if isinstance(entries, list):
+        for entry in entries:
+            if isinstance(entry, dict) and "amount" in entry:
+                value = entry["amount"]
+                entry["amount"] = parse_number(value)
+                if entry["amount"] != value:
+                    repairs.append(f"entries.amount: {value!r} → {entry['amount']!r}")
+
+    # 必須項目を OCR テキストや他の項目から補完する
+    text = normalize_text(ocr_text)
+    if type_ == "depreciation":
+        _fill(data, "closing_date", data.get("calc_closing_date"), repairs, "calc_closing_date から補完")
+        _fill(data, "date", data.get("target_year"), repairs, "target_year から補完")
+        match = re.match(r"(.+?)の?減価償却", data.get("summary") or "")
+        _fill(data, "asset_name", match.group(1) if match else None, repairs, "摘要から補完")
+        if data.get("asset_name"):
+            _fill(data, "summary", f"{data['asset_name']}の減価償却", repairs, "資産名から補完")
+        if not entries:
+            data["entries"] = [{"debit": "減価償却費", "credit": "減価償却累計額", "amount": 0}]
+            repairs.append("entries: 減価償却の既定の明細を補完")
+    else:
+        _fill(data, "date", _first_date(ocr_text), repairs, "OCRテキストから補完")
+    if type_ == "sales":
+        match = CUSTOMER_PATTERN.search(text)
+        _fill(data, "customer", match.group(1) if match else None, repairs, "OCRテキストから補完")
+    if type_ in ("purchase", "supplies_purchase"):
+        match = SUPPLIER_PATTERN.search(text) or SUPPLIER_SHOP_PATTERN.search(text)
+        _fill(data, "supplier", match.group(1) if match else None, repairs, "OCRテキストから補完")
+        if type_ == "supplies_purchase" and data.get("supplier") is None:
+            data["supplier"] = ""  # 任意項目（不明なら空文字）
+    if _missing(data, "summary") and text:
+        _fill(data, "summary", text.splitlines()[0][:40], repairs, "OCRテキストの先頭から補完")
+
+    # 明細が1行だけなら取引金額に合わせる（減価償却は後で計算するので除く）
+    entries = data.get("entries")
+    amount = data.get("amount")
+    if (type_ != "depreciation" and isinstance(entries, list) and len(entries) == 1
+            and isinstance(entries[0], dict) and isinstance(amount, (int, float))
+            and entries[0].get("amount") != amount):
+        repairs.append(f"entries.amount: {entries[0].get('amount')!r} → {amount!r}（取引金額に合わせる）")
+        entries[0]["amount"] = amount
+    return repairs
+
+
+def validate_journal(data: dict) -> dict:
+    """失敗した項目名 → 理由 を返す（空なら FastAPI に送れる）"""
+    type_ = data.get("type")
+    if type_ not in REQUEST_MODELS:
+        return {"type": f"未対応の取引タイプです: {type_!r}"}
+
+    errors = {}
+    try:
+        REQUEST_MODELS[type_].model_validate(data)
+    except ValidationError as e:
+        for error in e.errors(include_url=False):
+            field = str(error["loc"][0]) if error["loc"] else "type"
+            errors.setdefault(field, error["msg"])
+
+    for field in DATE_FIELDS:
+        value = data.get(field)
+        if field not in errors and value is not None and not is_iso_date(value):
+            errors[field] = f"YYYY-MM-DD 形式の日付ではありません: {value!r}"
+
+    # 明細の合計が取引金額と一致するか（減価償却は後で計算するので除く）
+    if type_ != "depreciation" and "entries" not in errors and "amount" not in errors:
+        total = sum(float(entry["amount"]) for entry in data["entries"])
+        if not data["entries"]:
+            errors["entries"] = "明細がありません"
+        elif abs(total - float(data["amount"])) > 0.5:
+            errors["entries"] = f"明細の合計 {total:g} が取引金額 {float(data['amount']):g} と一致しません"
+    return errors
@@ -0,0 +1,152 @@
+# --- OCRバックエンドの切り替え（ローカル Tesseract → Google Vision へのフォールバック）---
+#
+# OCR_BACKEND
+#   vision    : すべて Google Vision（従来どおり）
+#   tesseract : すべてローカルの Tesseract（jpn）
+#   cascade   : まず Tesseract で読み、信頼度が OCR_LOCAL_MIN_CONFIDENCE 未満なら Vision で読み直す
+#               （Tesseract 本体や jpn の言語データがないなど、Tesseract が失敗した時も Vision で読む）
+# どのバックエンドが何フレーム処理したか、それぞれの処理時間・失敗数を stats() で確認できる。
+# cv2 / pytesseract は使う時に読み込む（vision モードでは pytesseract を読み込まない）。
+
+import os
+import threading
+import time
+
+from app.services import vision_ocr
+
+NO_TEXT = vision_ocr.NO_TEXT
+
+
+def preprocess_for_tesseract(frame):
+    """グレースケール化・拡大・ノイズ除去・大津の二値化で印字を読みやすくする"""
+    import cv2
+
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    height = gray.shape[0]
+    if height < 1000:
+        scale = 1000 / height
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    gray = cv2.medianBlur(gray, 3)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+
+class TesseractBackend:
+    name = "tesseract"
+
+    def __init__(self, lang="jpn", config="--psm 6"):
+        self.lang = lang
+        self.config = config
+
+    def recognize(self, frame):
+        """(テキスト, 信頼度0〜100) を返す"""
+        import pytesseract
+
+        data = pytesseract.image_to_data(
+            preprocess_for_tesseract(frame),
+            lang=self.lang,
+            config=self.config,
+            output_type=pytesseract.Output.DICT,
+        )
+        lines = {}
+        confidences = []
+        for i, word in enumerate(data["text"]):
+            conf = float(data["conf"][i])
+            if conf < 0 or not word.strip():
+                continue
+            key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            lines.setdefault(key, []).append(word.strip())
+            confidences.append(conf)
+        if not confidences:
+            return NO_TEXT, 0.0
+        # 日本語は単語間に空白を入れない
+        text = "\n".join("".join(words) for _, words in sorted(lines.items()))
+        return text, sum(confidences) / len(confidences)
+
+
+class VisionBackend:
+    name = "vision"
+
+    def recognize(self, frame):
+        text = vision_ocr.extract_text(frame)
+        return text, (100.0 if text != NO_TEXT else 0.0)
+
+    def recognize_many(self, frames):
+        return [(text, 100.0 if text != NO_TEXT else 0.0) for text in vision_ocr.extract_texts_from_frames(frames)]
+
+
+class OcrRouter:
+    def __init__(self, mode="vision", min_confidence=80.0, local=None, remote=None):
+        if mode not in ("vision", "tesseract", "cascade"):
+            raise ValueError(f"未対応の OCR_BACKEND です: {mode}")
+        self.mode = mode
+        self.min_confidence = min_confidence
+        self.local = local or TesseractBackend(lang=os.getenv("OCR_TESSERACT_LANG", "jpn"))
+        self.remote = remote or VisionBackend()
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _record(self, backend, frames, elapsed, escalated=0, errors=0):
+        with self._lock:
+            stat = self._stats.setdefault(backend, {"frames": 0, "calls": 0, "total_sec": 0.0, "escalated": 0, "errors": 0})
+            stat["frames"] += frames
+            stat["calls"] += 1
+            stat["total_sec"] += elapsed
+            stat["escalated"] += escalated
+            stat["errors"] += errors
+
+    def _run_local(self, frame):
+        start = time.perf_counter()
+        try:
+            text, confidence = self.local.recognize(frame)
+        except Exception as e:
+            # tesseract モードではそのまま失敗させ、cascade モードでは Vision で読み直す
+            self._record(self.local.name, 0, time.perf_counter() - start, escalated=0 if self.mode == "tesseract" else 1, errors=1)
+            if self.mode == "tesseract":
+                raise
+            print(f"⚠️ ローカルOCR（{self.local.name}）に失敗したため Vision で読み直します: {e}")
+            return None, 0.0, False
+        elapsed = time.perf_counter() - start
+        accepted = self.mode == "tesseract" or (text != NO_TEXT and confidence >= self.min_confidence)
+        self._record(self.local.name, 1 if accepted else 0, elapsed, escalated=0 if accepted else 1)
+        return text, confidence, accepted
+
+    def extract_text(self, frame) -> str:
+        if self.mode != "vision":
+            text, confidence, accepted = self._run_local(frame)
+            if accepted:
+                return text
+            if text is not None:
+                print(f"↪️ ローカルOCRの信頼度が低いため Vision で読み直します（{confidence:.0f}）")
+
+        start = time.perf_counter()
+        text, _ = self.remote.recognize(frame)
+        self._record(self.remote.name, 1, time.perf_counter() - start)
+        return text
+
+    def extract_texts(self, frames) -> list:
+        results = [None] * len(frames)
+        pending = list(range(len(frames)))
+        if self.mode != "vision":
+            pending = []
+            for i, frame in enumerate(frames):
+                text, _, accepted = self._run_local(frame)
+                if accepted:
+                    results[i] = text
+                else:
+                    pending.append(i)
+
+        if pending:
+            start = time.perf_counter()
+            remote = self.remote.recognize_many([frames[i] for i in pending])
+            self._record(self.remote.name, len(pending), time.perf_counter() - start)
+            for i, (text, _) in zip(pending, remote):
+                results[i] = text
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: {**stat, "avg_sec_per_call": stat["total_sec"] / stat["calls"] if stat["calls"] else 0.0}
+                for name, stat in self._stats.items()
+            }
@@ -0,0 +1,144 @@
+# --- OCR結果キャッシュ ---
+#
+# 同じ伝票を 's' で何度も撮影したり、同じ画像を取り込み直したりすると、そのたびに Vision API を呼んでいた。
+# フレームの鍵にOCR結果を保存し、同じ鍵のフレームは前回のOCRテキストを再利用する。
+#   exact      : 画素の SHA-256（既定）。画素が完全に同じフレーム（同じ画像ファイルの取り込み直しなど）だけ再利用する
+#   perceptual : 知覚ハッシュ（DCTベースの pHash）のハミング距離が max_distance 以内なら再利用する
+# pHash は 64×64 に縮小して計算するため、同じ様式で金額だけ違う伝票（3,000円 と 8,000円 など）は
+# 距離が 2〜6 程度にしかならず、撮り直しの手ぶれ・ノイズと区別できない。perceptual は金額の違う伝票を
+# 続けて撮影しない時だけ使う（max_distance=0 でも別の伝票と一致することがある）。
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+def perceptual_hash(frame, hash_size=16) -> int:
+    """
+    フレームの pHash を整数で返す（hash_size=16 なら 256bit）。
+    明るさやわずかな手ぶれでは変わらず、書かれている内容が変わると大きく変わる。
+    """
+    import cv2
+    import numpy as np
+
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    size = hash_size * 4
+    small = cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:hash_size, :hash_size].flatten()
+    bits = low > np.median(low[1:])  # 直流成分は除いて中央値を取る
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def content_hash(frame) -> int:
+    """画素の SHA-256 を整数で返す（1画素でも違えば別の鍵になる）"""
+    digest = hashlib.sha256()
+    digest.update(f"{frame.shape}|{frame.dtype}".encode("ascii"))
+    digest.update(frame.tobytes())
+    return int.from_bytes(digest.digest(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class OcrResultCache:
+    """
+    フレームの鍵 → OCRテキスト のキャッシュ（SQLiteに永続化）。
+
+    - match: "exact"（画素の SHA-256 が同じ時だけ）または "perceptual"（pHash の距離で判定）
+    - max_distance: perceptual の時、このハミング距離以内なら同じ書類とみなす（0 で pHash の完全一致のみ）
+    - max_entries: 件数上限。超えたら最後に使われた時刻が古いものから削除
+    """
+
+    def __init__(self, path=None, match="exact", max_distance=0, max_entries=2000, hash_size=16):
+        if match not in ("exact", "perceptual"):
+            raise ValueError(f"未対応の OCR_CACHE_MATCH です: {match}")
+        self.match = match
+        self.max_distance = max_distance if match == "perceptual" else 0
+        self.max_entries = max_entries
+        # 保存する行の hash_size。0 は画素の SHA-256（exact）の行
+        self.hash_size = hash_size if match == "perceptual" else 0
+        self._lock = threading.Lock()
+        self._entries = {}  # hash -> [text, last_used]
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_results ("
+                " phash TEXT PRIMARY KEY,"
+                " hash_size INTEGER NOT NULL,"
+                " text TEXT NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            self._conn.commit()
+            rows = self._conn.execute(
+                "SELECT phash, text, last_used FROM ocr_results WHERE hash_size = ?", (self.hash_size,)
+            ).fetchall()
+            for phash, text, last_used in rows:
+                self._entries[int(phash, 16)] = [text, last_used]
+
+    def key(self, frame) -> int:
+        if self.match == "exact":
+            return content_hash(frame)
+        return perceptual_hash(frame, self.hash_size)
+
+    def lookup(self, frame):
+        """(鍵, キャッシュ済みテキスト or None) を返す"""
+        phash = self.key(frame)
+        with self._lock:
+            best, best_distance = None, self.max_distance + 1
+            if phash in self._entries:
+                best = phash
+            elif self.max_distance > 0:
+                for cached, entry in self._entries.items():
+                    distance = hamming_distance(phash, cached)
+                    if distance < best_distance:
+                        best, best_distance = cached, distance
+            if best is None:
+                self.misses += 1
+                return phash, None
+
+            self.hits += 1
+            entry = self._entries[best]
+            entry[1] = time.time()
+            if self._conn is not None:
+                self._conn.execute("UPDATE ocr_results SET last_used = ? WHERE phash = ?", (entry[1], f"{best:x}"))
+                self._conn.commit()
+            return phash, entry[0]
+
+    def store(self, phash: int, text: str):
+        with self._lock:
+            now = time.time()
+            self._entries[phash] = [text, now]
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO ocr_results (phash, hash_size, text, last_used) VALUES (?, ?, ?, ?)",
+                    (f"{phash:x}", self.hash_size, text, now),
+                )
+            overflow = len(self._entries) - self.max_entries
+            if overflow > 0:
+                oldest = sorted(self._entries.items(), key=lambda item: item[1][1])[:overflow]
+                for key, _ in oldest:
+                    del self._entries[key]
+                    if self._conn is not None:
+                        self._conn.execute("DELETE FROM ocr_results WHERE phash = ?", (f"{key:x}",))
+                self.evictions += overflow
+            if self._conn is not None:
+                self._conn.commit()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+        }
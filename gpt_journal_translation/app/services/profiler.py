@@ -0,0 +1,156 @@
+# --- パイプラインのステージ別計測 ---
+#
+# process_ocr_and_send の各ステージ（ocr / gpt / depreciation / fastapi / sheets）について
+# 処理時間・送受信バイト数・トークン数を記録し、セッション全体のパーセンタイルを集計する。
+# JSON と Prometheus テキスト形式で出力でき、PIPELINE_PROFILE_DIR を指定すると
+# 撮影1回ごとに cProfile（.prof）と tracemalloc の上位（.txt）を保存する。
+# cProfile と tracemalloc はプロセスに1つしか動かせないため、保存する撮影は1件ずつ処理する
+# （CAPTURE_WORKERS が複数でも、プロファイル中は他のワーカーが待つ）。
+
+import cProfile
+import json
+import math
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(sorted_values, p):
+    """最近傍順位法のパーセンタイル"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class PipelineProfiler:
+    def __init__(self, max_samples=10000, dump_dir=None):
+        self.max_samples = max_samples
+        self.dump_dir = dump_dir
+        self._lock = threading.Lock()
+        self._durations = {}  # stage -> [秒, ...]
+        self._counters = {}   # stage -> {"bytes_sent": n, ...}
+        self._errors = {}
+        self._captures = 0
+        self._profile_lock = threading.Lock()  # cProfile / tracemalloc を使う撮影を1件ずつにする
+
+    @contextmanager
+    def stage(self, name, **counters):
+        """
+        with profiler.stage("gpt") as sample:
+            ...
+            sample["prompt_tokens"] = 120
+        sample に入れた数値はステージごとに合計される。
+        """
+        sample = dict(counters)
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield sample
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start, failed=failed, **sample)
+
+    def record(self, name, seconds, failed=False, **counters):
+        with self._lock:
+            durations = self._durations.setdefault(name, [])
+            durations.append(seconds)
+            if len(durations) > self.max_samples:
+                del durations[: len(durations) - self.max_samples]
+            totals = self._counters.setdefault(name, {})
+            for key, value in counters.items():
+                if isinstance(value, (int, float)):
+                    totals[key] = totals.get(key, 0) + value
+            if failed:
+                self._errors[name] = self._errors.get(name, 0) + 1
+
+    @contextmanager
+    def capture(self, label="capture"):
+        """撮影1回分（end_to_end）を計測する。dump_dir があれば cProfile / tracemalloc も保存"""
+        with self._profile_lock if self.dump_dir else nullcontext():
+            with self._capture(label):
+                yield
+
+    @contextmanager
+    def _capture(self, label):
+        profile = None
+        started_tracemalloc = False
+        if self.dump_dir:
+            os.makedirs(self.dump_dir, exist_ok=True)
+            profile = cProfile.Profile()
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracemalloc = True
+            profile.enable()
+        try:
+            with self.stage("end_to_end"):
+                yield
+        finally:
+            with self._lock:
+                self._captures += 1
+                number = self._captures
+            if profile is not None:
+                profile.disable()
+                base = os.path.join(self.dump_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{number:04d}-{label}")
+                profile.dump_stats(base + ".prof")
+                snapshot = tracemalloc.take_snapshot()
+                with open(base + ".tracemalloc.txt", "w", encoding="utf-8") as f:
+                    for stat in snapshot.statistics("lineno")[:30]:
+                        f.write(f"{stat}\n")
+                if started_tracemalloc:
+                    tracemalloc.stop()
+                print(f"🔬 プロファイルを保存しました: {base}.prof")
+
+    def summary(self) -> dict:
+        with self._lock:
+            result = {}
+            for name, durations in self._durations.items():
+                ordered = sorted(durations)
+                stats = {
+                    "count": len(ordered),
+                    "errors": self._errors.get(name, 0),
+                    "mean_sec": sum(ordered) / len(ordered),
+                    "max_sec": ordered[-1],
+                }
+                for p in PERCENTILES:
+                    stats[f"p{p}_sec"] = percentile(ordered, p)
+                stats.update(self._counters.get(name, {}))
+                result[name] = stats
+            return result
+
+    def to_json(self, path=None) -> str:
+        text = json.dumps(self.summary(), ensure_ascii=False, indent=2)
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        return text
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# HELP pipeline_stage_seconds ステージ別の処理時間（秒）",
+            "# TYPE pipeline_stage_seconds summary",
+        ]
+        summary = self.summary()
+        with self._lock:
+            counters = {name: dict(values) for name, values in self._counters.items()}
+        for name, stats in sorted(summary.items()):
+            for p in PERCENTILES:
+                lines.append(f'pipeline_stage_seconds{{stage="{name}",quantile="{p / 100}"}} {stats[f"p{p}_sec"]}')
+            lines.append(f'pipeline_stage_seconds_sum{{stage="{name}"}} {stats["mean_sec"] * stats["count"]}')
+            lines.append(f'pipeline_stage_seconds_count{{stage="{name}"}} {stats["count"]}')
+        lines.append("# HELP pipeline_stage_errors_total ステージ別の失敗数")
+        lines.append("# TYPE pipeline_stage_errors_total counter")
+        for name, stats in sorted(summary.items()):
+            lines.append(f'pipeline_stage_errors_total{{stage="{name}"}} {stats["errors"]}')
+        lines.append("# HELP pipeline_stage_units_total ステージ別の送受信バイト数・トークン数")
+        lines.append("# TYPE pipeline_stage_units_total counter")
+        for name, stats in sorted(summary.items()):
+            for key, value in sorted(counters.get(name, {}).items()):
+                lines.append(f'pipeline_stage_units_total{{stage="{name}",unit="{key}"}} {value}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,196 @@
+# --- 2段階プロンプト（取引タイプ判定 → タイプ別の項目抽出）---
+#
+# 1回目: 短い判定プロンプトで取引タイプだけを決める
+# 2回目: app/schemas.py の該当モデルの項目だけを抽出する
+# どちらも JSON モード（response_format=json_object）で呼び出すため、出力は必ずJSONになる。
+
+import json
+
+from app.schemas import (
+    SalesRequest,
+    PurchaseRequest,
+    SuppliesPurchaseRequest,
+    AssetPurchaseRequest,
+    DepreciationRequest,
+)
+
+# プロンプトの内容を変えたら、そのプロンプトのバージョンを上げる（GPT応答キャッシュの鍵に含まれる）
+# プロンプトごとに別のバージョンにし、出力の形が違う応答が同じ鍵にならないようにする
+PROMPT_VERSIONS = {
+    "single": "2025-06-single-v1",        # journal_entry.build_prompt（PROMPT_MODE=single）
+    "two_stage": "2025-07-two-stage-v2",  # build_classifier_messages → build_extraction_messages
+    "multi": "2025-07-multi-v1",          # build_multi_extraction_messages（1枚に複数の取引）
+}
+
+SYSTEM_PROMPT = "あなたは簿記と財務会計に詳しい会計仕訳AIです。出力はJSONのみで返してください。"
+
+REQUEST_MODELS = {
+    "sales": SalesRequest,
+    "purchase": PurchaseRequest,
+    "supplies_purchase": SuppliesPurchaseRequest,
+    "asset_purchase": AssetPurchaseRequest,
+    "depreciation": DepreciationRequest,
+}
+
+FIELD_DESCRIPTIONS = {
+    "date": "取引日 (YYYY-MM-DD)",
+    "summary": "取引内容の簡潔な説明",
+    "customer": "顧客名",
+    "supplier": "仕入先・購入先の名称（不明なら空文字）",
+    "asset_name": "資産名（例：備品、機械、車両運搬具）",
+    "amount": "金額（半角数値、カンマなし）",
+    "acquisition_date": "資産の取得日 (YYYY-MM-DD)",
+    "closing_date": "calc_closing_date と同じ値 (YYYY-MM-DD)",
+    "calc_closing_date": "資産を取得した初年度の決算日 (YYYY-MM-DD)",
+    "method": "償却方法（定額法 / 200%定率法 / 級数法 / 生産高比例法）",
+    "life": "耐用年数（整数）",
+    "target_year": "減価償却費を求める事業年度の決算日 (YYYY-MM-DD)",
+    "current_volume": "当期の生産量・使用量（数値）",
+    "total_volume": "総生産可能量（数値）",
+}
+
+# 文字列ではなく構造で示す項目
+FIELD_SHAPES = {
+    "entries": '[{"debit": "借方科目", "credit": "貸方科目", "amount": 0}]',
+}
+
+CLASSIFIER_PROMPT = """次の取引文の取引タイプを判定し、{{"type": "..."}} のJSONだけを返してください。
+- "purchase"：商品の仕入（「〇〇を仕入れた」）
+- "sales"：売上
+- "depreciation"：期末の減価償却
+- "supplies_purchase"：消耗品の購入（即時費用処理）
+- "asset_purchase"：備品などの固定資産の購入
+- 該当なし："unknown"
+
+取引文：
+「{ocr_text}」"""
+
+# 支払・受取に関する共通ルール
+PAYMENT_RULES = {
+    "purchase": [
+        "debit は「仕入」にしてください。",
+        "「翌月支払」「未払い」「掛け」などの記述があれば credit は「買掛金」、支払い方法の記述がなければ「現金預金」にしてください。",
+    ],
+    "supplies_purchase": [
+        "「翌月支払」「未払い」「掛け」などの記述があれば credit は「未払金」、支払い方法の記述がなければ「現金預金」にしてください。",
+    ],
+    "asset_purchase": [
+        "debit は資産名の勘定科目にしてください。",
+        "method（償却方法）と life（耐用年数）は取引文に書かれている場合だけ抽出し、書かれていなければ null にしてください。",
+        "「翌月支払」「未払い」「掛け」などの記述があれば credit は「未払金」、支払い方法の記述がなければ「現金預金」にしてください。",
+    ],
+    "sales": [
+        "credit は「売上」にしてください。受け取り方法の記述がなければ debit は「現金預金」にしてください。",
+    ],
+    "depreciation": [
+        "entries は [{\"debit\": \"減価償却費\", \"credit\": \"減価償却累計額\", \"amount\": 0}] としてください（金額は後でシステムが計算します）。",
+        "date は target_year と同じ日付にしてください。",
+        "償却方法が「定率法」とあれば「200%定率法」にしてください。",
+        "取得日の年が不明で「前年」「昨年」などの表現がある場合は target_year を基準に補完してください。",
+    ],
+}
+
+# 生産高比例法の項目は、該当しそうな文のときだけプロンプトに含める
+VOLUME_KEYWORDS = ("生産高", "生産量", "使用量", "稼働", "走行", "採掘")
+
+
+def request_fields(type_: str, ocr_text: str = "") -> list:
+    """タイプ別に GPT に抽出させる項目名（type は判定済みなので除く）"""
+    fields = [name for name in REQUEST_MODELS[type_].model_fields if name != "type"]
+    if type_ == "depreciation" and not any(k in ocr_text for k in VOLUME_KEYWORDS):
+        fields = [f for f in fields if f not in ("current_volume", "total_volume")]
+    return fields
+
+
+def build_classifier_messages(ocr_text: str) -> list:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": CLASSIFIER_PROMPT.format(ocr_text=ocr_text)},
+    ]
+
+
+def build_extraction_messages(type_: str, ocr_text: str) -> list:
+    fields = request_fields(type_, ocr_text)
+    shape = ",\n".join(
+        f'  "{name}": {FIELD_SHAPES.get(name) or json.dumps(FIELD_DESCRIPTIONS.get(name, ""), ensure_ascii=False)}'
+        for name in fields
+    )
+    rules = "\n".join(f"- {rule}" for rule in PAYMENT_RULES.get(type_, []))
+    content = f"""次の取引文（取引タイプ: {type_}）から以下の項目を抽出し、JSONで返してください。
+数式は計算済みの数値にし、金額は半角数値（カンマなし）にしてください。
+{rules}
+
+{{
+{shape}
+}}
+
+取引文：
+「{ocr_text}」"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": content},
+    ]
+
+
+def build_repair_messages(type_: str, ocr_text: str, errors: dict) -> list:
+    """検証に失敗した項目だけを聞き直す短いプロンプト（errors: 項目名 → 理由）"""
+    shape = ",\n".join(
+        f'  "{name}": {FIELD_SHAPES.get(name) or json.dumps(FIELD_DESCRIPTIONS.get(name, ""), ensure_ascii=False)}'
+        for name in errors
+    )
+    reasons = "\n".join(f"- {name}: {reason}" for name, reason in errors.items())
+    rules = "\n".join(f"- {rule}" for rule in PAYMENT_RULES.get(type_, [])) if "entries" in errors else ""
+    content = f"""次の取引文（取引タイプ: {type_}）の仕訳で、以下の項目が不正でした。
+{reasons}
+{rules}
+この項目だけを取引文から抽出し直し、JSONで返してください。
+
+{{
+{shape}
+}}
+
+取引文：
+「{ocr_text}」"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": content},
+    ]
+
+
+def build_multi_extraction_messages(ocr_texts: list) -> list:
+    """
+    複数の取引文を1回の呼び出しでまとめて判定・抽出するプロンプト。
+    {"transactions": [{"index": 1, "type": ..., ...}, ...]} の形で返させる（JSON モードは配列を直接返せないため）。
+    """
+    joined = "".join(ocr_texts)
+    type_fields = "\n".join(
+        f"- {type_}: " + ", ".join(request_fields(type_, joined)) for type_ in REQUEST_MODELS
+    )
+    names = {name for type_ in REQUEST_MODELS for name in request_fields(type_, joined)}
+    descriptions = "\n".join(
+        f"- {name}: {FIELD_SHAPES.get(name) or FIELD_DESCRIPTIONS.get(name, '')}"
+        for name in list(FIELD_DESCRIPTIONS) + list(FIELD_SHAPES) if name in names
+    )
+    rules = "\n".join(f"- {type_}: {rule}" for type_, type_rules in PAYMENT_RULES.items() for rule in type_rules)
+    texts = "\n".join(f"{i}. 「{text}」" for i, text in enumerate(ocr_texts, 1))
+    content = f"""次の{len(ocr_texts)}件の取引文をそれぞれ仕訳し、{{"transactions": [...]}} のJSONで返してください。
+transactions は取引文と同じ件数・同じ順番にし、各要素には "index"（取引文の番号）と "type" を含めてください。
+type は "purchase"（商品の仕入）/ "sales"（売上）/ "depreciation"（期末の減価償却）/
+"supplies_purchase"（消耗品の購入）/ "asset_purchase"（固定資産の購入）/ "unknown"（該当なし）のいずれかです。
+数式は計算済みの数値にし、金額は半角数値（カンマなし）にしてください。
+
+タイプ別の項目:
+{type_fields}
+
+項目の説明:
+{descriptions}
+
+ルール:
+{rules}
+
+取引文：
+{texts}"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": content},
+    ]
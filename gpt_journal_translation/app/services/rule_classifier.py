@@ -0,0 +1,272 @@
+# --- ルールによる仕訳（GPT を呼ばない高速経路）---
+#
+# よくある定型文（「〇〇から商品△円を仕入れた」「〇〇に商品を販売し…」「〇〇で消耗品を購入」
+# 「備品を購入し代金は翌月支払」「取得原価・耐用年数・償却方法が書かれた減価償却」）は
+# プロンプトの規則（prompts.PAYMENT_RULES と同じ内容）をそのまま当てはめれば GPT と同じ仕訳になる。
+# classify_by_rules() は GPT と同じ形の JSON と信頼度（0〜1）を返し、
+# 信頼度が低い文（金額が複数・未対応の支払方法・単価計算・キーワードの競合など）は GPT に回す。
+# パターンは import 時に1回だけコンパイルする。
+
+import re
+from datetime import date
+
+from app.services.journal_validation import DATE_PATTERN, is_iso_date, normalize_date, normalize_text, parse_number
+
+PURCHASE_PATTERN = re.compile(r"仕入")
+SALES_PATTERN = re.compile(r"販売|売り上げ|売上げ|売上|売り渡")
+BUY_PATTERN = re.compile(r"購入|買い入れ|買入|買った|買い求め")
+DEPRECIATION_PATTERN = re.compile(r"減価償却")
+
+# 「翌月支払」「未払い」「掛け」「来月受け取る」→ 買掛金 / 未払金 / 売掛金
+CREDIT_TERMS_PATTERN = re.compile(r"掛け|掛で|掛にて|翌月|翌々月|来月|(?<!\d)月末|未払|後日|後払|後で|後ほど")
+# 「現金で」「普通預金に振り込まれた」→ 現金預金（明記されていない時は現金預金にせず GPT に回す）
+CASH_TERMS_PATTERN = re.compile(r"現金|預金|振り込|振込|口座")
+# ルールで扱わない取引条件（GPT に回す）
+UNSUPPORTED_PATTERN = re.compile(
+    r"小切手|手形|クレジット|カード|当座|一部|残額|残り|内金|手付|前払|前受|値引|返品|送料|運賃|引取費|"
+    r"消費税|税込|税抜|売却|借入|貸付|利息|給料|家賃|電子記録"
+)
+# 単価×数量など、計算が必要な金額
+ARITHMETIC_PATTERN = re.compile(r"@|単価|×|✕|\*|毎月|月額|ずつ")
+AMOUNT_PATTERN = re.compile(r"(\d+(?:\.\d+)?)万(?:(\d[\d,]*))?円|(\d[\d,]*)円")
+LIFE_PATTERN = re.compile(r"耐用年数\s*(\d+)\s*年")
+COST_PATTERN = re.compile(r"取得(?:原価|価額|価格)\s*(?:は)?\s*(\d[\d,]*)円")
+
+# 日付の直後の「に」「、」も取り除いてから取引先を探す
+DATE_PREFIX_PATTERN = re.compile(DATE_PATTERN.pattern + r"\s*(?:に|、)?")
+COUNTERPARTY = r"([^\s、。,を0-9()（）]+?)(?:様)?"
+CUSTOMER_PATTERNS = (
+    re.compile(COUNTERPARTY + r"(?:に|へ)(?:[^、。]*?)(?:販売|売り上げ|売上|売り渡|納品)"),
+)
+SUPPLIER_PATTERNS = (
+    re.compile(COUNTERPARTY + r"から(?:[^、。]*?)(?:仕入|購入|買)"),
+    re.compile(COUNTERPARTY + r"で(?:[^、。]*?)(?:購入|買)"),
+)
+# 取引先ではない語（「現金で購入」など）
+NOT_COUNTERPARTY = {"現金", "現金預金", "普通預金", "預金", "掛け", "掛", "振込", "振り込み", "口座", "店頭", "ネット", "通販"}
+
+SUPPLY_KEYWORDS = (
+    "消耗品", "文房具", "文具", "事務用品", "コピー用紙", "用紙", "トナー", "インク", "電池", "封筒",
+    "ボールペン", "ノート", "洗剤", "ティッシュ", "蛍光灯", "電球",
+)
+ASSET_ACCOUNTS = {
+    "備品": ("備品", "パソコン", "PC", "複合機", "コピー機", "プリンター", "机", "椅子", "キャビネット",
+             "応接セット", "陳列棚", "サーバー", "エアコン"),
+    "車両運搬具": ("車両運搬具", "車両", "自動車", "トラック", "営業車", "社用車", "バイク"),
+    "機械": ("機械", "工作機", "製造装置"),
+    "建物": ("建物", "店舗", "倉庫"),
+    "土地": ("土地",),
+}
+# 償却方法は前置き（「200%」「250%」「旧」）も含めて完全に一致したものだけ扱う
+METHOD_PATTERN = re.compile(r"(旧|\d+(?:\.\d+)?%)?(定率法|定額法|級数法|生産高比例法)")
+DEPRECIATION_METHODS = {
+    ("", "定額法"): "定額法",
+    ("", "定率法"): "200%定率法",
+    ("200%", "定率法"): "200%定率法",
+    ("", "級数法"): "級数法",
+    ("", "生産高比例法"): None,  # 生産量の抽出は GPT に任せる
+}
+
+# 信頼度の減点（掛け合わせる）
+PENALTIES = {
+    "unsupported_terms": 0.3,
+    "arithmetic": 0.4,
+    "multiple_amounts": 0.5,
+    "competing_types": 0.3,
+    "multiple_sentences": 0.6,
+    "unknown_payment": 0.5,
+    "unsupported_method": 0.3,
+}
+
+
+def _amounts(text: str) -> list:
+    """本文に出てくる円の金額（重複なし、出現順）"""
+    values = []
+    for man, rest, plain in AMOUNT_PATTERN.findall(text):
+        if man:
+            value = round(float(man) * 10000) + (parse_number(rest) if rest else 0)
+        else:
+            value = parse_number(plain)
+        if isinstance(value, (int, float)) and value not in values:
+            values.append(value)
+    return values
+
+
+def _dates(text: str) -> list:
+    """本文の日付を (YYYY-MM-DD, 終了位置) の出現順で返す"""
+    found = []
+    for match in DATE_PATTERN.finditer(text):
+        value = normalize_date(match.group(0))
+        if is_iso_date(value):
+            found.append((value, match.end()))
+    return found
+
+
+def _counterparty(text: str, patterns) -> str:
+    text = DATE_PREFIX_PATTERN.sub("、", text)
+    for pattern in patterns:
+        for match in pattern.finditer(text):
+            name = match.group(1)
+            if name not in NOT_COUNTERPARTY:
+                return name
+    return None
+
+
+def _keyword_account(text: str):
+    """固定資産の勘定科目（見つからなければ None）"""
+    for account, keywords in ASSET_ACCOUNTS.items():
+        if any(keyword in text for keyword in keywords):
+            return account
+    return None
+
+
+def _detect_type(text: str) -> list:
+    types = []
+    if DEPRECIATION_PATTERN.search(text):
+        types.append("depreciation")
+    if PURCHASE_PATTERN.search(text):
+        types.append("purchase")
+    if SALES_PATTERN.search(text):
+        types.append("sales")
+    if BUY_PATTERN.search(text) and not types:
+        supplies = any(keyword in text for keyword in SUPPLY_KEYWORDS)
+        asset = _keyword_account(text) is not None
+        if supplies:
+            types.append("supplies_purchase")
+        if asset:
+            types.append("asset_purchase")
+    return types
+
+
+def _method(text: str):
+    """本文の償却方法。(正式名 or None, 書かれていたか) を返す（未対応・複数の方法は None）"""
+    found = {(prefix or "", base) for prefix, base in METHOD_PATTERN.findall(text)}
+    if len(found) != 1:
+        return None, bool(found)
+    return DEPRECIATION_METHODS.get(found.pop()), True
+
+
+def _depreciation(text: str, reasons: list):
+    method, _ = _method(text)
+    life = LIFE_PATTERN.search(text)
+    cost = COST_PATTERN.search(text)
+    dates = _dates(text)
+    acquisition = next((value for value, end in dates if re.match(r"\s*(?:に|、)?\s*(?:取得|購入)", text[end:])), None)
+    asset_name = _keyword_account(text)
+    if method is None:
+        reasons.append("償却方法が不明・未対応（250%定率法・旧定率法・生産高比例法など）")
+        return None
+    if not (life and cost and acquisition and asset_name and len(dates) >= 2):
+        reasons.append("取得日・取得原価・耐用年数・資産名・対象年度のいずれかが不明")
+        return None
+
+    target_year = dates[-1][0]
+    if target_year <= acquisition:
+        reasons.append("対象年度が取得日より前")
+        return None
+    # 初年度の決算日（対象年度と同じ月日で、取得日以後の最初の日）
+    acquired = date.fromisoformat(acquisition)
+    fiscal_end = date.fromisoformat(target_year)
+    closing = date(acquired.year, fiscal_end.month, fiscal_end.day)
+    if closing < acquired:
+        closing = date(acquired.year + 1, fiscal_end.month, fiscal_end.day)
+
+    return {
+        "type": "depreciation",
+        "date": target_year,
+        "summary": f"{asset_name}の減価償却",
+        "asset_name": asset_name,
+        "acquisition_date": acquisition,
+        "closing_date": closing.isoformat(),
+        "calc_closing_date": closing.isoformat(),
+        "method": method,
+        "amount": parse_number(cost.group(1)),
+        "life": int(life.group(1)),
+        "target_year": target_year,
+        "entries": [{"debit": "減価償却費", "credit": "減価償却累計額", "amount": 0}],
+    }
+
+
+def classify_by_rules(ocr_text: str):
+    """
+    定型文を GPT と同じ形の仕訳 JSON にする。
+    (仕訳 dict または None, 信頼度, 判定の理由のリスト) を返す。
+    """
+    text = normalize_text(ocr_text or "")
+    reasons = []
+    types = _detect_type(text)
+    if not types:
+        return None, 0.0, ["取引タイプのキーワードがない"]
+
+    confidence = 1.0
+    if len(types) > 1:
+        confidence *= PENALTIES["competing_types"]
+        reasons.append(f"取引タイプの候補が複数: {types}")
+    type_ = types[0]
+
+    if type_ == "depreciation":
+        data = _depreciation(text, reasons)
+        return data, (confidence if data else 0.0), reasons
+
+    if UNSUPPORTED_PATTERN.search(text):
+        confidence *= PENALTIES["unsupported_terms"]
+        reasons.append(f"ルールで扱わない取引条件: {UNSUPPORTED_PATTERN.search(text).group(0)}")
+    if ARITHMETIC_PATTERN.search(text):
+        confidence *= PENALTIES["arithmetic"]
+        reasons.append("金額の計算が必要")
+    if len([s for s in re.split(r"[。\n]", text) if AMOUNT_PATTERN.search(s)]) > 1:
+        confidence *= PENALTIES["multiple_sentences"]
+        reasons.append("金額を含む文が複数")
+
+    amounts = _amounts(text)
+    dates = _dates(text)
+    if not amounts or not dates:
+        return None, 0.0, reasons + ["金額または日付が見つからない"]
+    if len(amounts) > 1:
+        confidence *= PENALTIES["multiple_amounts"]
+        reasons.append(f"金額の候補が複数: {amounts}")
+    amount = amounts[0]
+    on_credit = CREDIT_TERMS_PATTERN.search(text) is not None
+    in_cash = CASH_TERMS_PATTERN.search(text) is not None
+    if on_credit == in_cash:
+        # 支払・受取の方法が書かれていない、読み取れない、または掛けと現金の両方がある
+        confidence *= PENALTIES["unknown_payment"]
+        reasons.append("支払・受取の方法を判定できない")
+
+    data = {"type": type_, "date": dates[0][0]}
+    if type_ == "sales":
+        customer = _counterparty(text, CUSTOMER_PATTERNS)
+        if customer is None:
+            return None, 0.0, reasons + ["顧客名が見つからない"]
+        debit = "売掛金" if on_credit else "現金預金"
+        data.update(summary=f"{customer}への商品売上", customer=customer,
+                    entries=[{"debit": debit, "credit": "売上", "amount": amount}])
+    elif type_ == "purchase":
+        supplier = _counterparty(text, SUPPLIER_PATTERNS)
+        if supplier is None:
+            return None, 0.0, reasons + ["仕入先が見つからない"]
+        credit = "買掛金" if on_credit else "現金預金"
+        data.update(summary=f"{supplier}からの商品仕入", supplier=supplier,
+                    entries=[{"debit": "仕入", "credit": credit, "amount": amount}])
+    elif type_ == "supplies_purchase":
+        supplier = _counterparty(text, SUPPLIER_PATTERNS) or ""
+        credit = "未払金" if on_credit else "現金預金"
+        data.update(summary="消耗品の購入", supplier=supplier,
+                    entries=[{"debit": "消耗品費", "credit": credit, "amount": amount}])
+    else:
+        asset_name = _keyword_account(text)
+        credit = "未払金" if on_credit else "現金預金"
+        data.update(summary=f"{asset_name}の購入", asset_name=asset_name,
+                    entries=[{"debit": asset_name, "credit": credit, "amount": amount}])
+        # 固定資産台帳用（書かれている場合だけ）
+        method, mentioned = _method(text)
+        life = LIFE_PATTERN.search(text)
+        if method:
+            data["method"] = method
+        elif mentioned:
+            confidence *= PENALTIES["unsupported_method"]
+            reasons.append("ルールで扱わない償却方法")
+        if life:
+            data["life"] = int(life.group(1))
+    data["amount"] = amount
+    return data, confidence, reasons
@@ -0,0 +1,183 @@
+# --- スプレッドシート書き込み（ライトビハインド・バッチ）---
+#
+# 取引ごとに認証し直し、仕訳帳全体を get_all_values() でダウンロードして最終行を探していた処理を、
+# 長寿命のライターに置き換える。
+# - 認証情報・Sheets v4 サービス・sheetId は初回だけ取得して使い回す
+# - 取引はキューに溜め、件数（max_batch）または時間（flush_interval 秒）で
+#   1回の values.append と、罫線をまとめた1回の batchUpdate で書き込む
+# - 追記先の行は Sheets 側が決める（人や他のプロセスが行を追加していても上書きしない）。
+#   罫線は応答の updates.updatedRange（実際に書き込まれた範囲）に付ける
+# Google API クライアントは最初の書き込みで読み込む。
+
+import re
+import threading
+import time
+
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+BLACK_SOLID = {"style": "SOLID", "width": 1, "color": {"red": 0, "green": 0, "blue": 0}}
+# "'仕訳帳'!A15:F22" の開始行
+UPDATED_RANGE_START_PATTERN = re.compile(r"![A-Z]+(\d+)")
+
+
+def transaction_to_rows(entry: dict) -> list:
+    """
+    複数明細を行データに変換する（出力行数 = 借方・貸方の多い方の明細数）。
+    日付と摘要は1行目にのみ表示し、空白行は作らない。
+    """
+    num_rows = max(len(entry["debit_entries"]), len(entry["credit_entries"]))
+    rows = []
+    for i in range(num_rows):
+        debit = entry["debit_entries"][i] if i < len(entry["debit_entries"]) else {"account": "", "amount": ""}
+        credit = entry["credit_entries"][i] if i < len(entry["credit_entries"]) else {"account": "", "amount": ""}
+        rows.append([
+            entry["date"] if i == 0 else "",
+            debit["account"],
+            debit["amount"],
+            credit["account"],
+            credit["amount"],
+            entry["summary"] if i == 0 else ""
+        ])
+    return rows
+
+
+def updated_range_start_row(updated_range: str) -> int:
+    """values.append の updatedRange から書き込まれた最初の行（1-indexed）を返す"""
+    match = UPDATED_RANGE_START_PATTERN.search(updated_range or "")
+    if not match:
+        raise ValueError(f"書き込み範囲を読み取れません: {updated_range!r}")
+    return int(match.group(1))
+
+
+def border_request(sheet_id: int, start_row_index: int, num_rows: int) -> dict:
+    """取引範囲に罫線（上下左右＆内部線）を付ける updateBorders リクエスト"""
+    return {
+        "updateBorders": {
+            "range": {
+                "sheetId": sheet_id,
+                "startRowIndex": start_row_index,
+                "endRowIndex": start_row_index + num_rows,
+                "startColumnIndex": 0,
+                "endColumnIndex": 6
+            },
+            "top": BLACK_SOLID,
+            "bottom": BLACK_SOLID,
+            "left": BLACK_SOLID,
+            "right": BLACK_SOLID,
+            "innerHorizontal": BLACK_SOLID,
+            "innerVertical": BLACK_SOLID,
+        }
+    }
+
+
+class SheetsJournalWriter:
+    def __init__(self, credentials_path, spreadsheet_id, sheet_name="仕訳帳", max_batch=20, flush_interval=5.0, service=None, profiler=None):
+        self.credentials_path = credentials_path
+        self.spreadsheet_id = spreadsheet_id
+        self.sheet_name = sheet_name
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._service = service
+        self.profiler = profiler
+        self._sheet_id = None
+        self._queue = []
+        self._lock = threading.RLock()
+        self._timer = None
+        self.flushes = 0
+        self.rows_written = 0
+
+    def _ensure_service(self):
+        if self._service is None:
+            from googleapiclient.discovery import build
+            from google.oauth2.service_account import Credentials
+            credentials = Credentials.from_service_account_file(self.credentials_path, scopes=SCOPES)
+            self._service = build("sheets", "v4", credentials=credentials, cache_discovery=False)
+        if self._sheet_id is None:
+            info = self._service.spreadsheets().get(
+                spreadsheetId=self.spreadsheet_id, fields="sheets.properties(sheetId,title)"
+            ).execute()
+            for sheet in info["sheets"]:
+                if sheet["properties"]["title"] == self.sheet_name:
+                    self._sheet_id = sheet["properties"]["sheetId"]
+                    break
+            else:
+                raise ValueError(f"シート『{self.sheet_name}』が見つかりません")
+        return self._service
+
+    def enqueue(self, transaction: dict):
+        """取引をキューに追加する（件数か時間の条件で書き込まれる）"""
+        with self._lock:
+            self._queue.append(transaction)
+            if len(self._queue) >= self.max_batch:
+                self.flush()
+            elif self._timer is None and self.flush_interval > 0:
+                self._timer = threading.Timer(self.flush_interval, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"⚠️ スプレッドシートへの書き込みに失敗しました: {e}")
+
+    def flush(self):
+        """キューの取引をまとめて書き込む"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._queue:
+                return 0
+            pending, self._queue = self._queue, []
+            started = time.perf_counter()
+
+            try:
+                service = self._ensure_service()
+                values, sizes = [], []
+                for transaction in pending:
+                    rows = transaction_to_rows(transaction)
+                    values.extend(rows)
+                    sizes.append(len(rows))
+
+                result = service.spreadsheets().values().append(
+                    spreadsheetId=self.spreadsheet_id,
+                    range=f"'{self.sheet_name}'!A:F",
+                    valueInputOption="USER_ENTERED",
+                    insertDataOption="INSERT_ROWS",
+                    body={"values": values},
+                ).execute()
+            except Exception:
+                # 書き込めなかった取引は戻して次回送り直す
+                self._queue = pending + self._queue
+                raise
+
+            try:
+                row = updated_range_start_row(result["updates"]["updatedRange"])
+                borders = []
+                for size in sizes:
+                    borders.append(border_request(self._sheet_id, row - 1, size))
+                    row += size
+                service.spreadsheets().batchUpdate(
+                    spreadsheetId=self.spreadsheet_id,
+                    body={"requests": borders},
+                ).execute()
+            except Exception as e:
+                # 値は書き込み済みなので再送はしない
+                print(f"⚠️ 罫線の設定に失敗しました: {e}")
+
+            self.flushes += 1
+            self.rows_written += len(values)
+            if self.profiler is not None:
+                self.profiler.record("sheets_flush", time.perf_counter() - started, transactions=len(pending), rows=len(values))
+            print(f"✅ {len(pending)}件（{len(values)}行）の仕訳をスプレッドシートに追加し、罫線を設定しました。")
+            return len(pending)
+
+    def close(self):
+        """残りを書き込む（atexit から呼ばれるため例外は出さない）"""
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"⚠️ 終了時にスプレッドシートへ書き込めなかった取引が {len(self._queue)}件あります: {e}")
+
+    def stats(self) -> dict:
+        return {"queued": len(self._queue), "flushes": self.flushes, "rows_written": self.rows_written}
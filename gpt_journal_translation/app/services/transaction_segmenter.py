@@ -0,0 +1,80 @@
+# --- 1枚の撮影に含まれる複数の取引の分割 ---
+#
+# 仕訳問題のページ（「(1) …」「問2 …」「③ …」）や、1行1取引の明細（各行が日付で始まる）を
+# 取引ごとの文に分ける。Vision の OCR テキストはブロック・行ごとに改行されるため、行単位で判定する。
+#   1. 行頭に問題番号がある → 番号ごとに分割（番号より前の行は共通の前提として各取引の先頭に付ける）
+#   2. それ自体が取引（金額と取引の動詞を含む）で日付で始まる行が2行以上ある → その行ごとに分割
+#   3. どちらでもなければ1件の取引として扱う
+# 分けたすべての部分がそれだけで取引（金額と取引の動詞を含む）の時だけ分割する。
+# 「1. 償却方法は定額法」のような条件の箇条書きや「4/30までにお支払いください」のような期日の行は
+# 取引ではないため、1件の取引のまま GPT に渡す。
+# 前提の行（「会計期間は4月1日から3月31日」など金額を含まない行）は各取引の先頭に付ける。
+
+import re
+
+from app.services.journal_validation import normalize_text
+
+# 問題番号は NFKC で「①」が「1」になるため、正規化前の行で判定する
+ITEM_MARKER_PATTERN = re.compile(
+    r"^\s*(?:[(（][0-9０-９]{1,2}[)）]|[0-9０-９]{1,2}[.．)）](?=[^0-9０-９])|[①-⑳]|問\s*[0-9０-９]{1,2}|第\s*[0-9０-９]{1,2}\s*問)\s*"
+)
+# 行頭の日付（年なしの「5/10」「5月10日」も含む）
+LINE_DATE_PATTERN = re.compile(
+    r"^\s*(?:(?:令和|平成)\s*(?:\d{1,2}|元)\s*年|\d{4}\s*[年/\-.])?\s*\d{1,2}\s*[月/\-.]\s*\d{1,2}\s*日?"
+)
+AMOUNT_PATTERN = re.compile(r"\d[\d,]*\s*円|\d{1,3}(?:,\d{3})+")
+# 取引の動詞（金額と合わせて、それだけで1件の取引かを判定する）
+TRANSACTION_VERB_PATTERN = re.compile(
+    r"仕入|販売|売り上げ|売上げ|売り渡|購入|買い入れ|買入|買っ|支払|受け取|受取|振り込|振込|"
+    r"取得|減価償却|売却|借り入|借入|貸し付|貸付|預け入|引き出|納品|返品|値引"
+)
+# 明細の合計行は取引ではない
+TOTAL_LINE_PATTERN = re.compile(r"^\s*(?:合計|小計|総計|総額|計\s)")
+
+
+def _group(lines, starts) -> tuple:
+    """starts[i] が真の行から新しい取引を始める。(前提の行, 取引ごとの行のリスト) を返す"""
+    header, groups = [], []
+    for line, start in zip(lines, starts):
+        if start:
+            groups.append([line])
+        elif groups:
+            groups[-1].append(line)
+        else:
+            header.append(line)
+    return header, groups
+
+
+def is_complete_transaction(text: str) -> bool:
+    """金額と取引の動詞を含む（それだけで1件の取引として仕訳できる）か"""
+    text = normalize_text(text)
+    return bool(AMOUNT_PATTERN.search(text) and TRANSACTION_VERB_PATTERN.search(text))
+
+
+def split_transactions(ocr_text: str) -> list:
+    """OCRテキストを取引ごとの文に分ける（1件なら [ocr_text]）"""
+    lines = [line.strip() for line in (ocr_text or "").splitlines()
+             if line.strip() and not TOTAL_LINE_PATTERN.match(normalize_text(line))]
+    normalized = [normalize_text(line) for line in lines]
+
+    markers = [bool(ITEM_MARKER_PATTERN.match(line)) for line in lines]
+    # 発行日・支払期日などの日付だけの行は区切りにしない
+    dated = [bool(LINE_DATE_PATTERN.match(line)) and is_complete_transaction(line) for line in normalized]
+    if sum(markers) >= 2:
+        header, groups = _group(lines, markers)
+        groups = [[ITEM_MARKER_PATTERN.sub("", group[0], count=1)] + group[1:] for group in groups]
+    elif sum(dated) >= 2:
+        header, groups = _group(lines, dated)
+    else:
+        return [ocr_text]
+
+    # 金額を含む前提の行は、それ自体が取引なので先頭の1件にする
+    context = [line for line in header if not AMOUNT_PATTERN.search(normalize_text(line))]
+    if len(context) < len(header):
+        groups.insert(0, [line for line in header if AMOUNT_PATTERN.search(normalize_text(line))])
+
+    # 1つでも取引として完結しない部分があれば分割しない（条件の箇条書きなど）
+    bodies = ["".join(group) for group in groups]
+    if len(bodies) < 2 or not all(is_complete_transaction(body) for body in bodies):
+        return [ocr_text]
+    return ["\n".join(context + [body]) if context else body for body in bodies]
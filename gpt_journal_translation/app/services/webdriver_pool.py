@@ -0,0 +1,190 @@
+# --- dep.php 用 ヘッドレス WebDriver プール ---
+#
+# calculate_depreciation_by_year のたびに Chrome を起動・終了せず、
+# 起動済みのドライバを使い回す。time.sleep の代わりに WebDriverWait で
+# 結果テーブルの表示を待つため、1件あたりの待ち時間はフォームの往復分で済む。
+# selenium は DEPRECIATION_BACKEND が site / verify で実際にドライバを使う時だけ読み込む。
+
+import queue
+import threading
+from contextlib import contextmanager
+
+RESULT_ROWS_SELECTOR = "tbody.record tr"
+# 結果テーブルの読み取り方を変えたら SCRAPER_VERSION を上げる（償却表キャッシュの鍵に含まれる）
+SCRAPER_VERSION = "dep-php-v1"
+
+
+def create_chrome_driver(headless=True):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    return webdriver.Chrome(options=options)
+
+
+class WebDriverPool:
+    """
+    Chrome ドライバのプール。
+
+    - size: 同時に使えるドライバ数（スレッドから同時に呼び出し可能）
+    - max_uses: この回数使ったドライバは終了して作り直す（メモリ肥大化対策）
+    - 貸し出し時に生存確認を行い、応答しないドライバは作り直す
+    - 例外が起きたドライバはプールに戻さず終了する
+    """
+
+    def __init__(self, size=2, max_uses=50, headless=True, driver_factory=None):
+        self.size = size
+        self.max_uses = max_uses
+        self.headless = headless
+        self._factory = driver_factory or (lambda: create_chrome_driver(headless=self.headless))
+        self._idle = queue.LifoQueue()
+        self._uses = {}
+        self._created = 0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+
+    def warm_up(self, count=None):
+        """起動コストを先に払っておく"""
+        drivers = [self._new_driver() for _ in range(min(count or self.size, self.size))]
+        for driver in drivers:
+            self._idle.put(driver)
+
+    def _new_driver(self):
+        driver = self._factory()
+        with self._lock:
+            self._uses[id(driver)] = 0
+            self._created += 1
+        return driver
+
+    def _discard(self, driver):
+        with self._lock:
+            self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @staticmethod
+    def is_healthy(driver) -> bool:
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _acquire(self):
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                return self._new_driver()
+            if self.is_healthy(driver):
+                return driver
+            print("⚠️ 応答しない WebDriver を破棄して作り直します。")
+            self._discard(driver)
+
+    def _release(self, driver, broken=False):
+        with self._lock:
+            uses = self._uses.get(id(driver), 0) + 1
+            self._uses[id(driver)] = uses
+        if broken or self._closed or uses >= self.max_uses:
+            self._discard(driver)
+        else:
+            self._idle.put(driver)
+
+    @contextmanager
+    def driver(self):
+        if self._closed:
+            raise RuntimeError("WebDriverPool は終了済みです")
+        self._slots.acquire()
+        driver = None
+        try:
+            driver = self._acquire()
+            yield driver
+        except Exception:
+            if driver is not None:
+                self._release(driver, broken=True)
+                driver = None
+            raise
+        finally:
+            if driver is not None:
+                self._release(driver)
+            self._slots.release()
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+    def stats(self) -> dict:
+        return {"size": self.size, "idle": self._idle.qsize(), "created": self._created}
+
+
+def result_rows_updated(previous_rows):
+    """
+    送信前の行（previous_rows）と異なる結果行が表示されたら、その行を返す WebDriverWait 用の条件。
+    ページ遷移でも同じページ内の書き換えでも、要素か表示内容が変われば更新とみなす。
+    """
+    from selenium.webdriver.common.by import By
+
+    previous_texts = [row.text for row in previous_rows]
+
+    def condition(driver):
+        rows = driver.find_elements(By.CSS_SELECTOR, RESULT_ROWS_SELECTOR)
+        if not rows:
+            return False
+        if not previous_rows or rows[0] != previous_rows[0] or [row.text for row in rows] != previous_texts:
+            return rows
+        return False
+
+    return condition
+
+
+def scrape_depreciation_schedule(driver, url, starting_date, calc_closing_date, method, price, life,
+                                 current_volume=None, total_volume=None, timeout=10):
+    """dep.php のフォームを送信し、結果テーブルを償却表として返す"""
+    from selenium.common.exceptions import StaleElementReferenceException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import Select, WebDriverWait
+
+    driver.get(url)
+    # 行の読み取り中にテーブルが書き換わった時は読み直す
+    wait = WebDriverWait(driver, timeout, ignored_exceptions=(StaleElementReferenceException,))
+
+    starting_input = wait.until(EC.presence_of_element_located((By.ID, "startingDate")))
+    closing_input = driver.find_element(By.ID, "closingDate")
+    # 日付欄は自動入力だと誤入力を起こすため JavaScript で値を直接設定する
+    driver.execute_script("arguments[0].value = arguments[1]", starting_input, starting_date)
+    driver.execute_script("arguments[0].value = arguments[1]", closing_input, calc_closing_date)
+    Select(driver.find_element(By.ID, "cluculateMethod")).select_by_visible_text(method)
+    driver.find_element(By.ID, "purchasePrice").send_keys(str(price))
+    driver.find_element(By.ID, "usefulLife").send_keys(str(life))
+
+    if method == "生産高比例法":
+        driver.find_element(By.ID, "currentVolume").send_keys(str(current_volume or ""))
+        driver.find_element(By.ID, "totalVolume").send_keys(str(total_volume or ""))
+
+    previous_rows = driver.find_elements(By.CSS_SELECTOR, RESULT_ROWS_SELECTOR)
+    driver.find_element(By.ID, "submit").click()
+    # ページ遷移の有無に依存せず、送信前と異なる結果行が出るまで待つ
+    rows = wait.until(result_rows_updated(previous_rows))
+
+    schedule = []
+    for row in rows:
+        cols = row.find_elements(By.TAG_NAME, "td")
+        if len(cols) >= 3:
+            schedule.append({
+                "year": cols[0].text.strip(),
+                "depreciation": float(cols[2].text.replace(",", "")),
+            })
+    return schedule
@@ -0,0 +1,86 @@
+# --- 決算の減価償却一括計上のベンチマーク ---
+#
+# 使い方（プロジェクト直下で実行）:
+#   python -m benchmarks.closing_run
+#   python -m benchmarks.closing_run --assets 2000 --out .benchmarks/closing.json
+#
+# 一時ディレクトリの JournalStore に固定資産の購入を --assets 件登録し、
+# closing_run.run_closing() で決算日ごとの減価償却を一括計上する時間を測る。
+# 2回目の実行（計上済みのため何も計上しない）の時間と、試算表の貸借一致も確認する。
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from app.schemas import AssetPurchaseRequest
+from app.services.closing_run import run_closing
+from app.services.journal_store import JournalStore
+from benchmarks.common import result_meta, write_result
+
+ASSET_NAMES = ("備品", "車両運搬具", "機械", "建物")
+METHODS = ("定額法", "200%定率法", "級数法")
+
+
+def register_assets(store: JournalStore, count: int, first_date: date, seed: int):
+    rng = random.Random(seed)
+    with store.batch():
+        for i in range(count):
+            name = rng.choice(ASSET_NAMES)
+            amount = rng.randrange(100, 50000) * 100
+            acquired = first_date + timedelta(days=rng.randrange(0, 365 * 3))
+            store.record(AssetPurchaseRequest(
+                type="asset_purchase",
+                date=acquired.isoformat(),
+                summary=f"{name}の購入（{i + 1}）",
+                asset_name=name,
+                amount=amount,
+                method=rng.choice(METHODS),
+                life=rng.randrange(2, 21),
+                entries=[{"debit": name, "credit": "現金預金", "amount": amount}],
+            ))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="決算の減価償却一括計上の速さを測る")
+    parser.add_argument("--assets", type=int, default=500, help="登録する固定資産の件数")
+    parser.add_argument("--closing-dates", nargs="+", default=["2024-03-31", "2025-03-31", "2026-03-31"],
+                        help="順に計上する決算日")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="結果 JSON の出力先")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = JournalStore(f"{tmp}/journal.sqlite3")
+        start = time.perf_counter()
+        register_assets(store, args.assets, date(2022, 4, 1), args.seed)
+        print(f"🏷️ 固定資産 {args.assets}件を登録（{time.perf_counter() - start:.2f}秒）")
+
+        runs = []
+        for closing_date in args.closing_dates:
+            first = run_closing(closing_date, store=store)
+            rerun = run_closing(closing_date, store=store)
+            runs.append({
+                "closing_date": closing_date,
+                "depreciated": first.depreciated,
+                "total_depreciation": first.total_depreciation,
+                "elapsed_sec": first.elapsed_sec,
+                "rerun_depreciated": rerun.depreciated,
+                "rerun_elapsed_sec": rerun.elapsed_sec,
+            })
+            print(f"📊 {closing_date}: {first.depreciated}件を計上 {first.elapsed_sec:.3f}秒"
+                  f"（再実行 {rerun.depreciated}件 {rerun.elapsed_sec:.3f}秒）")
+        balanced = store.trial_balance()["balanced"]
+        print(f"{'✅' if balanced else '❌'} 試算表の貸借一致: {balanced}")
+
+    if args.out:
+        write_result({
+            "meta": result_meta({"assets": args.assets, "closing_dates": args.closing_dates, "seed": args.seed}),
+            "runs": runs,
+            "balanced": balanced,
+        }, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# --- ベンチマーク共通の補助関数 ---
+
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_meta(config: dict) -> dict:
+    """コミット間で比較するための実行環境の情報"""
+    return {
+        "commit": git_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+    }
+
+
+def write_result(result: dict, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"📝 結果を保存しました: {path}")
@@ -0,0 +1,128 @@
+# --- ルールによる仕訳の評価（GPT との一致率）---
+#
+# 使い方（プロジェクト直下で実行）:
+#   python -m benchmarks.eval_rules
+#   python -m benchmarks.eval_rules --min-confidence 0.8 --out .benchmarks/rules.json
+#   python -m benchmarks.eval_rules --live      # 録画済みの応答ではなく GPT に実際に聞いて比べる
+#
+# ラベル付きコーパス（benchmarks/rules_corpus.json と cases.json：OCRテキストと GPT の仕訳）を
+# rule_classifier.classify_by_rules() にかけ、
+#   hit_rate : ルールで仕訳した（GPT を呼ばずに済んだ）割合
+#   accuracy : ルールで仕訳したもののうち、比較する項目がすべて GPT と一致した割合
+# と、項目ごとの不一致件数・1件あたりの判定時間を出力する。摘要（summary）は言い回しが違うだけなので比べない。
+
+import argparse
+import json
+import os
+import time
+
+from app.services.rule_classifier import classify_by_rules
+from benchmarks.common import result_meta, write_result
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CORPORA = [os.path.join(BENCHMARK_DIR, "rules_corpus.json"), os.path.join(BENCHMARK_DIR, "cases.json")]
+
+COMPARED_FIELDS = (
+    "type", "date", "amount", "customer", "supplier", "asset_name",
+    "acquisition_date", "calc_closing_date", "method", "life", "target_year", "entries",
+)
+
+
+def _entries_key(entries):
+    return sorted((e.get("debit"), e.get("credit"), float(e.get("amount") or 0)) for e in entries or [])
+
+
+def compare(rule: dict, label: dict) -> list:
+    """一致しなかった項目名のリスト"""
+    mismatched = []
+    for field in COMPARED_FIELDS:
+        if field not in label and field not in rule:
+            continue
+        if field == "entries":
+            same = _entries_key(rule.get(field)) == _entries_key(label.get(field))
+        elif field in ("amount", "life"):
+            same = rule.get(field) is not None and label.get(field) is not None and float(rule[field]) == float(label[field])
+        else:
+            same = (rule.get(field) or None) == (label.get(field) or None)
+        if not same:
+            mismatched.append(field)
+    return mismatched
+
+
+def load_corpus(paths) -> list:
+    corpus = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            corpus.extend(json.load(f))
+    return corpus
+
+
+def ask_gpt_label(ocr_text: str) -> dict:
+    """--live: GPT に実際に聞いてラベルにする（ルールは使わない）"""
+    from app.services import journal_entry
+
+    return json.loads(journal_entry.ask_gpt_two_stage(ocr_text))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ルールによる仕訳を GPT の仕訳と比べる")
+    parser.add_argument("--corpus", action="append", help="ラベル付きコーパス（複数指定可）")
+    parser.add_argument("--min-confidence", type=float,
+                        default=float(os.getenv("RULES_MIN_CONFIDENCE", "0.9")), help="ルールを採用する信頼度の下限")
+    parser.add_argument("--live", action="store_true", help="録画済みの応答ではなく GPT に聞いた結果と比べる")
+    parser.add_argument("--out", help="結果 JSON の出力先")
+    parser.add_argument("--verbose", action="store_true", help="1件ごとの判定を表示する")
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.corpus or DEFAULT_CORPORA)
+    items = []
+    field_errors = {}
+    durations = []
+    for case in corpus:
+        start = time.perf_counter()
+        data, confidence, reasons = classify_by_rules(case["ocr_text"])
+        durations.append(time.perf_counter() - start)
+
+        label = ask_gpt_label(case["ocr_text"]) if args.live else case["gpt"]
+        hit = data is not None and confidence >= args.min_confidence
+        mismatched = compare(data, label) if hit else []
+        for field in mismatched:
+            field_errors[field] = field_errors.get(field, 0) + 1
+        items.append({
+            "name": case.get("name"),
+            "hit": hit,
+            "correct": hit and not mismatched,
+            "confidence": round(confidence, 3),
+            "mismatched": mismatched,
+            "reasons": reasons,
+        })
+        if args.verbose or mismatched:
+            mark = "✅" if hit and not mismatched else "❌" if hit else "🤖"
+            detail = f"不一致: {mismatched}" if mismatched else " / ".join(reasons)
+            print(f"{mark} {case.get('name', '')[:28]:<28} 信頼度 {confidence:.2f} {detail}")
+
+    hits = [item for item in items if item["hit"]]
+    correct = [item for item in hits if item["correct"]]
+    summary = {
+        "cases": len(items),
+        "hits": len(hits),
+        "hit_rate": len(hits) / len(items) if items else 0.0,
+        "accuracy": len(correct) / len(hits) if hits else None,
+        "field_errors": field_errors,
+        "mean_classify_ms": sum(durations) / len(durations) * 1000 if durations else 0.0,
+    }
+    accuracy = f"{summary['accuracy']:.1%}" if summary["accuracy"] is not None else "-"
+    print(f"📊 {summary['cases']}件中 {summary['hits']}件をルールで仕訳（hit rate {summary['hit_rate']:.1%}、"
+          f"GPT との一致率 {accuracy}、判定 {summary['mean_classify_ms']:.3f}ms/件）")
+
+    if args.out:
+        write_result({
+            "meta": result_meta({"min_confidence": args.min_confidence, "live": args.live,
+                                 "corpus": args.corpus or DEFAULT_CORPORA}),
+            "summary": summary,
+            "items": items,
+        }, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+# --- ベンチマーク用の外部サービスの代役 ---
+#
+# 認証情報やネットワークなしでパイプライン全体を動かすため、次の代役を用意する。
+#   FakeVisionClient   : ImageAnnotatorClient の代わり（送られた画像に対応する録画済みOCRテキストを返す）
+#   OpenAI 互換サーバー : /v1/chat/completions を返すローカル HTTP サーバー（OPENAI_BASE_URL で向ける）
+#   dep.php サーバー    : フォームと結果テーブルを返す静的ページ（DEP_CALCULATOR_URL で向ける）
+#   FakeSheetsService  : Sheets v4 サービスの代わり（SheetsJournalWriter の service= に渡す）
+# どれも Latency で応答遅延（平均・ゆらぎ）を指定できる。
+
+import hashlib
+import html
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs
+
+from app.services import prompts
+from app.services.depreciation_engine import SUPPORTED_METHODS, build_depreciation_schedule
+
+
+class Latency:
+    """平均 mean_ms・ゆらぎ ±jitter_ms の遅延（seed を固定すると毎回同じ系列になる）"""
+
+    def __init__(self, mean_ms=0.0, jitter_ms=0.0, seed=0):
+        self.mean_ms = mean_ms
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sleep(self):
+        with self._lock:
+            delay = self.mean_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+
+def start_server(handler_class, **attributes):
+    """ハンドラに属性を持たせてローカルの空きポートで起動し、(server, base_url) を返す"""
+    handler = type(handler_class.__name__, (handler_class,), attributes)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name=handler_class.__name__, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body: bytes, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+
+# --- Google Vision ---
+
+def content_key(content: bytes) -> str:
+    return hashlib.sha1(content).hexdigest()
+
+
+class FakeVisionClient:
+    """
+    texts: {content_key(送信する画像バイト列): OCRテキスト}
+    vision_ocr.encode_frame は決定的なので、事前にエンコードしたキーで引ける。
+    リクエストは vision_ocr が組み立てる dict のまま受け取る（google.cloud.vision は不要）。
+    """
+
+    def __init__(self, texts, latency=None, per_image_ms=0.0):
+        self.texts = texts
+        self.latency = latency or Latency()
+        self.per_image_ms = per_image_ms
+        self.calls = 0
+        self.images = 0
+        self._lock = threading.Lock()
+
+    def _annotate(self, content):
+        text = self.texts.get(content_key(content))
+        annotations = [SimpleNamespace(description=text)] if text else []
+        return SimpleNamespace(error=SimpleNamespace(message=""), text_annotations=annotations)
+
+    def _wait(self, images):
+        with self._lock:
+            self.calls += 1
+            self.images += images
+        self.latency.sleep()
+        if self.per_image_ms:
+            time.sleep(self.per_image_ms * images / 1000)
+
+    def text_detection(self, image):
+        self._wait(1)
+        return self._annotate(image["content"])
+
+    def batch_annotate_images(self, requests):
+        self._wait(len(requests))
+        return SimpleNamespace(responses=[self._annotate(request["image"]["content"]) for request in requests])
+
+
+# --- OpenAI chat completions ---
+
+class FakeOpenAIHandler(_QuietHandler):
+    """
+    録画済みの GPT 応答（cases の "gpt"）を返す。
+    two_stage の判定プロンプトには {"type": ...}、抽出プロンプトと single プロンプトには仕訳JSONを、
+    複数取引のプロンプトには {"transactions": [...]}（プロンプトに出てくる順）を返す。
+    error_rate の割合で 429（Retry-After つき）を返し、再試行の経路も計測できる。
+    """
+
+    cases = ()
+    latency = None
+    error_rate = 0.0
+    _random = random.Random(0)
+    _lock = threading.Lock()
+
+    def _find_case(self, content):
+        for case in self.cases:
+            if case["ocr_text"] in content:
+                return case
+        return None
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send(404, b'{"error": {"message": "not found"}}', "application/json")
+            return
+        request = json.loads(self._read_body())
+        self.latency.sleep()
+        with self._lock:
+            rejected = self._random.random() < self.error_rate
+        if rejected:
+            body = json.dumps({"error": {"message": "Rate limit reached (benchmark)", "type": "rate_limit_exceeded"}})
+            self._send(429, body.encode("utf-8"), "application/json", {"Retry-After": "0"})
+            return
+
+        prompt = request["messages"][-1]["content"]
+        case = self._find_case(prompt)
+        if '{"transactions": [...]}' in prompt:
+            found = sorted((c for c in self.cases if c["ocr_text"] in prompt), key=lambda c: prompt.index(c["ocr_text"]))
+            answer = {"transactions": [{"index": i, **c["gpt"]} for i, c in enumerate(found, 1)]}
+        elif case is None:
+            answer = {"type": "unknown"}
+        elif prompt.startswith(prompts.CLASSIFIER_PROMPT.split("{", 1)[0]):
+            answer = {"type": case["gpt"]["type"]}
+        else:
+            answer = case["gpt"]
+        content = json.dumps(answer, ensure_ascii=False)
+
+        # 文字数から大まかなトークン数を見積もる
+        prompt_tokens = sum(len(m["content"]) for m in request["messages"])
+        completion_tokens = len(content)
+        body = {
+            "id": "chatcmpl-benchmark",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "benchmark"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+        self._send(200, json.dumps(body, ensure_ascii=False).encode("utf-8"), "application/json")
+
+
+# --- dep.php ---
+
+DEP_FORM = """<!DOCTYPE html>
+<html lang="ja"><head><meta charset="utf-8"><title>減価償却計算</title></head>
+<body>
+<form method="post" action="">
+  <input type="date" id="startingDate" name="startingDate">
+  <input type="date" id="closingDate" name="closingDate">
+  <select id="cluculateMethod" name="cluculateMethod">{options}</select>
+  <input type="text" id="purchasePrice" name="purchasePrice">
+  <input type="text" id="usefulLife" name="usefulLife">
+  <input type="text" id="currentVolume" name="currentVolume">
+  <input type="text" id="totalVolume" name="totalVolume">
+  <input type="submit" id="submit" value="計算">
+</form>
+{result}
+</body></html>
+"""
+
+
+class FakeDepCalculatorHandler(_QuietHandler):
+    """dep.php と同じ id のフォームを返し、POST では結果テーブル（tbody.record）を付けて返す"""
+
+    latency = None
+
+    def _page(self, result=""):
+        options = "".join(f"<option>{html.escape(m)}</option>" for m in SUPPORTED_METHODS)
+        return DEP_FORM.format(options=options, result=result).encode("utf-8")
+
+    def do_GET(self):
+        self.latency.sleep()
+        self._send(200, self._page(), "text/html; charset=utf-8")
+
+    def do_POST(self):
+        form = {k: v[0] for k, v in parse_qs(self._read_body().decode("utf-8")).items()}
+        self.latency.sleep()
+        try:
+            schedule = build_depreciation_schedule(
+                form.get("startingDate"),
+                form.get("closingDate"),
+                form.get("cluculateMethod"),
+                int(float(form.get("purchasePrice", "0"))),
+                int(float(form.get("usefulLife", "0"))),
+                current_volume=float(form["currentVolume"]) if form.get("currentVolume") else None,
+                total_volume=float(form["totalVolume"]) if form.get("totalVolume") else None,
+            )
+        except (TypeError, ValueError) as e:
+            self._send(200, self._page(f"<p class=\"error\">{html.escape(str(e))}</p>"), "text/html; charset=utf-8")
+            return
+        rows = "".join(
+            f"<tr><td>{row['year']}</td><td>{row['beginning_book_value']:,}</td><td>{row['depreciation']:,}</td>"
+            f"<td>{row['accumulated']:,}</td><td>{row['ending_book_value']:,}</td></tr>"
+            for row in schedule
+        )
+        table = f"<table><tbody class=\"record\">{rows}</tbody></table>"
+        self._send(200, self._page(table), "text/html; charset=utf-8")
+
+
+# --- Google Sheets v4 ---
+
+class _Call:
+    def __init__(self, latency, result):
+        self._latency = latency
+        self._result = result
+
+    def execute(self):
+        self._latency.sleep()
+        return self._result() if callable(self._result) else self._result
+
+
+class FakeSheetsService:
+    """
+    SheetsJournalWriter が使う spreadsheets().get / values().append / batchUpdate だけを持つ。
+    書き込まれた行はメモリに保持する。
+    """
+
+    def __init__(self, sheet_name="仕訳帳", sheet_id=0, latency=None):
+        self.sheet_name = sheet_name
+        self.sheet_id = sheet_id
+        self.latency = latency or Latency()
+        self.rows = []
+        self.requests = []
+        self.calls = {"get": 0, "values.append": 0, "batchUpdate": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self.calls[name] += 1
+
+    # service.spreadsheets() / service.spreadsheets().values() は同じオブジェクトを返す
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, spreadsheetId, fields=None):
+        self._count("get")
+        return _Call(self.latency, {"sheets": [{"properties": {"sheetId": self.sheet_id, "title": self.sheet_name}}]})
+
+    def append(self, spreadsheetId, range, valueInputOption, insertDataOption, body):
+        self._count("values.append")
+
+        def write():
+            with self._lock:
+                start = len(self.rows) + 1
+                self.rows.extend(body["values"])
+                end = len(self.rows)
+            return {"updates": {"updatedRange": f"'{self.sheet_name}'!A{start}:F{end}", "updatedRows": end - start + 1}}
+        return _Call(self.latency, write)
+
+    def batchUpdate(self, spreadsheetId, body):
+        self._count("batchUpdate")
+        with self._lock:
+            self.requests.extend(body["requests"])
+        return _Call(self.latency, {"replies": [{} for _ in body["requests"]]})
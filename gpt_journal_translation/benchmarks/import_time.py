@@ -0,0 +1,138 @@
+# --- import 時間・起動時間のベンチマーク ---
+#
+# 使い方（プロジェクト直下で実行）:
+#   python -m benchmarks.import_time --repeat 10 --out .benchmarks/import.json
+#   python -m benchmarks.import_time --out new.json --compare .benchmarks/import.json
+#
+# シナリオごとに新しい Python プロセスを起動し、
+#   import:*  モジュールを import するだけの時間（バッチ処理・API プロセスの読み込み）
+#   cold:*    起動から最初の処理が終わるまでの時間
+# の壁時計時間を repeat 回測って p50 / p95 を出す。あわせて別の1回を -X importtime で実行し、
+# 読み込みに時間がかかったトップレベルのパッケージを記録する。
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from app.services.profiler import percentile
+from benchmarks.common import result_meta, write_result
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SALES_ENTRY = {
+    "date": "2025-05-22",
+    "summary": "起動時間計測",
+    "customer": "計測",
+    "amount": 1000,
+    "entries": [{"debit": "現金預金", "credit": "売上", "amount": 1000}],
+}
+
+SCENARIOS = {
+    "import:journal_entry": ["-c", "import app.services.journal_entry"],
+    "import:batch_ingest": ["-c", "import app.services.batch_ingest"],
+    "import:api": ["-c", "import app.main"],
+    "cold:batch_cli": ["-m", "app.services.batch_ingest", "--help"],
+    "cold:api_first_entry": [
+        "-c",
+        "from app.services.journal_client import InProcessJournalClient; "
+        f"ok, _ = InProcessJournalClient().send('sales', {SALES_ENTRY!r}); assert ok",
+    ],
+}
+
+
+def parse_importtime(stderr: str, top=10) -> list:
+    """-X importtime の出力からトップレベルのパッケージを累積時間順に返す"""
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if name.startswith("  ") or not cumulative.strip().isdigit():
+            continue  # 入れ子の import は親に含まれる
+        name = name.strip()
+        packages[name] = packages.get(name, 0) + int(cumulative)
+    ordered = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{"module": name, "cumulative_ms": us / 1000} for name, us in ordered]
+
+
+def _run(command, env):
+    start = time.perf_counter()
+    completed = subprocess.run(command, cwd=PROJECT_ROOT, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        lines = completed.stderr.strip().splitlines()
+        raise RuntimeError(f"終了コード {completed.returncode}: {lines[-1] if lines else ''}")
+    return elapsed, completed.stderr
+
+
+def run_scenario(args, env, repeat) -> dict:
+    try:
+        # 内訳用の1回（-X importtime は計測のオーバーヘッドがあるため時間には含めない）
+        _, stderr = _run([sys.executable, "-X", "importtime", *args], env)
+        durations = [_run([sys.executable, *args], env)[0] for _ in range(repeat)]
+    except RuntimeError as e:
+        return {"error": str(e)}
+    packages = parse_importtime(stderr)
+    ordered = sorted(durations)
+    return {
+        "count": len(ordered),
+        "mean_sec": sum(ordered) / len(ordered),
+        "p50_sec": percentile(ordered, 50),
+        "p95_sec": percentile(ordered, 95),
+        "max_sec": ordered[-1],
+        "top_imports": packages,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="import 時間と起動時間を計測する")
+    parser.add_argument("--repeat", type=int, default=10, help="シナリオごとの計測回数")
+    parser.add_argument("--only", action="append", choices=sorted(SCENARIOS), help="計測するシナリオ（複数指定可）")
+    parser.add_argument("--out", help="結果 JSON の出力先")
+    parser.add_argument("--compare", metavar="BASELINE", help="以前の結果 JSON と比較する")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="journal-import-bench-")
+    env = {
+        **os.environ,
+        "JOURNAL_DB_PATH": os.path.join(workdir, "journal.sqlite3"),
+    }
+
+    # .pyc を作っておき、初回だけコンパイル時間が入らないようにする
+    subprocess.run([sys.executable, "-m", "compileall", "-q", "app"], cwd=PROJECT_ROOT, env=env)
+
+    scenarios = {}
+    for name in args.only or SCENARIOS:
+        scenarios[name] = run_scenario(SCENARIOS[name], env, args.repeat)
+        stats = scenarios[name]
+        if "error" in stats:
+            print(f"❌ {name}: {stats['error']}")
+            continue
+        slowest = ", ".join(f"{p['module']} {p['cumulative_ms']:.0f}ms" for p in stats["top_imports"][:3])
+        print(f"⏱ {name:<22} p50={stats['p50_sec'] * 1000:.0f}ms p95={stats['p95_sec'] * 1000:.0f}ms（{slowest}）")
+
+    result = {
+        "meta": result_meta({"repeat": args.repeat, "scenarios": list(scenarios)}),
+        "scenarios": scenarios,
+    }
+    if args.out:
+        write_result(result, args.out)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"📈 比較: {baseline['meta'].get('commit')} → {result['meta'].get('commit')}")
+        for name, stats in scenarios.items():
+            before = baseline["scenarios"].get(name)
+            if "error" in stats or not before or "error" in before:
+                continue
+            change = (stats["p50_sec"] - before["p50_sec"]) / before["p50_sec"] * 100
+            print(f"  {name:<22} p50 {before['p50_sec'] * 1000:.0f}ms → {stats['p50_sec'] * 1000:.0f}ms ({change:+.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
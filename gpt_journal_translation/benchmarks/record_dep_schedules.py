@@ -0,0 +1,48 @@
+# --- dep.php の償却表の記録（tests/fixtures/dep_php_schedules.json の更新）---
+#
+# 使い方（プロジェクト直下で実行、Chrome と dep.php への接続が必要）:
+#   python -m benchmarks.record_dep_schedules
+#   python -m benchmarks.record_dep_schedules --only declining_balance_200_full_year
+#
+# tests/fixtures/dep_php_schedules.json の各ケースの入力で dep.php の結果テーブルを取得し、
+# rows を dep.php の値（年度・減価償却費）に置き換えて source を "dep.php" にする。
+# tests/test_depreciation_engine.py はこの表とネイティブの計算を DEPRECIATION_TOLERANCE 以内で比べる。
+
+import argparse
+import json
+import os
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATH = os.path.join(BENCHMARK_DIR, "..", "tests", "fixtures", "dep_php_schedules.json")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="dep.php の償却表を記録する")
+    parser.add_argument("--path", default=DEFAULT_PATH, help="記録する JSON")
+    parser.add_argument("--only", action="append", help="記録するケース名（複数指定可）")
+    args = parser.parse_args(argv)
+
+    from app.services import journal_entry
+
+    with open(args.path, encoding="utf-8") as f:
+        cases = json.load(f)
+    for case in cases:
+        if args.only and case["name"] not in args.only:
+            continue
+        try:
+            schedule = journal_entry.fetch_depreciation_schedule_from_site(**case["input"])
+        except Exception as e:
+            print(f"❌ {case['name']}: dep.php から取得できませんでした: {e}")
+            continue
+        case["rows"] = [{"year": row["year"], "depreciation": row["depreciation"]} for row in schedule]
+        case["source"] = "dep.php"
+        print(f"✅ {case['name']}: {len(case['rows'])}年分を記録しました")
+
+    with open(args.path, "w", encoding="utf-8") as f:
+        json.dump(cases, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    print(f"📝 保存しました: {args.path}")
+
+
+if __name__ == "__main__":
+    main()
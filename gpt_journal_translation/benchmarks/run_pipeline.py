@@ -0,0 +1,289 @@
+# --- パイプライン全体のオフライン・ベンチマーク ---
+#
+# 使い方（プロジェクト直下で実行）:
+#   python -m benchmarks.run_pipeline --iterations 20 --out .benchmarks/result.json
+#   python -m benchmarks.run_pipeline --gpt-latency-ms 800 --vision-latency-ms 300 --concurrency 4
+#   python -m benchmarks.run_pipeline --out new.json --compare .benchmarks/result.json --fail-on-regression 10
+#
+# 録画済みの書類（benchmarks/cases.json：OCRテキストと GPT 応答、画像があれば画像）を
+# journal_entry の OCR → GPT → 減価償却 → FastAPI → スプレッドシート の順に流し、
+# ステージ別・撮影全体（end_to_end）の p50 / p90 / p95 / p99 とスループットを JSON で出力する。
+# Vision・OpenAI・dep.php・Sheets は benchmarks/fakes.py の代役（遅延を指定可能）を使い、
+# FastAPI は inprocess モード（一時ディレクトリの SQLite）で本物のハンドラを呼ぶ。
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from benchmarks.common import result_meta, write_result
+from benchmarks.fakes import (
+    FakeDepCalculatorHandler,
+    FakeOpenAIHandler,
+    FakeSheetsService,
+    FakeVisionClient,
+    Latency,
+    content_key,
+    start_server,
+)
+
+DEFAULT_CASES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cases.json")
+COMPARED_STAGES = ("end_to_end", "ocr", "rules", "gpt", "depreciation", "fastapi", "sheets_enqueue", "sheets_flush")
+
+
+def load_cases(path) -> list:
+    with open(path, encoding="utf-8") as f:
+        cases = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    for case in cases:
+        if case.get("image"):
+            case["image"] = os.path.join(base, case["image"])
+    return cases
+
+
+def synthetic_frame(seed, width=1600, height=1200):
+    """画像のない書類用に、印字行を模した決定的な画像を作る（エンコード・送信サイズの計測用）"""
+    rng = np.random.default_rng(seed)
+    frame = np.full((height, width, 3), 245, dtype=np.uint8)
+    y = 80
+    while y < height - 80:
+        x = 80
+        while x < width - 120:
+            w = int(rng.integers(20, 90))
+            cv2.rectangle(frame, (x, y), (x + w, y + 28), (40, 40, 40), -1)
+            x += w + int(rng.integers(8, 30))
+        y += 48
+    noise = rng.normal(0, 6, frame.shape).astype(np.int16)
+    return np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def load_frame(case, index):
+    if case.get("image"):
+        frame = cv2.imread(case["image"])
+        if frame is None:
+            raise ValueError(f"画像を読み込めません: {case['image']}")
+        return frame
+    return synthetic_frame(index)
+
+
+def configure_environment(args, workdir, openai_url, dep_url):
+    """journal_entry は読み込み時に環境変数を読むため、import より前に設定する"""
+    os.environ.update({
+        "OPENAI_BASE_URL": f"{openai_url}/v1",
+        "OPENAI_API_KEY_PROJECT_VISION": "benchmark",
+        "OPENAI_PROJECT_ID": "benchmark",
+        "GPT_MAX_CONCURRENCY": str(args.gpt_concurrency),
+        "GPT_MAX_RETRIES": "5",
+        "PROMPT_MODE": args.prompt_mode,
+        "RULES_ENABLED": "0" if args.no_rules else "1",
+        "OCR_BACKEND": "vision",
+        "DEPRECIATION_BACKEND": args.depreciation_backend,
+        "DEP_CALCULATOR_URL": dep_url,
+        "JOURNAL_DISPATCH_MODE": "inprocess",
+        "JOURNAL_DB_PATH": os.path.join(workdir, "journal.sqlite3"),
+        "GPT_CACHE_PATH": os.path.join(workdir, "gpt_responses.sqlite3"),
+        "OCR_CACHE_PATH": os.path.join(workdir, "ocr_results.sqlite3"),
+        "PIPELINE_PROFILE_DIR": "",
+        "PIPELINE_METRICS_PATH": "",
+    })
+    if args.warm_caches:
+        os.environ["DEPRECIATION_CACHE_PATH"] = os.path.join(workdir, "depreciation_schedules.sqlite3")
+        os.environ["OCR_CACHE_ENABLED"] = "1"
+        os.environ["GPT_CACHE_BYPASS"] = "0"
+    else:
+        # 毎回外部サービスまで届くよう、キャッシュはすべて素通りさせる
+        os.environ["DEPRECIATION_CACHE_PATH"] = ""
+        os.environ["DEPRECIATION_CACHE_MEMORY_SIZE"] = "0"
+        os.environ["OCR_CACHE_ENABLED"] = "0"
+        os.environ["GPT_CACHE_BYPASS"] = "1"
+
+
+def run_capture(journal_entry, case, frame, use_cache):
+    """撮影1回分（確認の Y/N は常に Y とみなす）"""
+    with journal_entry.profiler.capture(case["name"]):
+        ocr_text = journal_entry.extract_text_from_frame(frame) if frame is not None else case["ocr_text"]
+        gpt_data = journal_entry.build_journal_proposal(ocr_text, use_cache=use_cache)
+        if gpt_data is None:
+            raise RuntimeError("GPTの出力を仕訳にできませんでした")
+        if not journal_entry.send_to_fastapi(gpt_data.get("type"), gpt_data):
+            raise RuntimeError("FastAPIへの送信に失敗しました")
+        transaction = journal_entry.convert_gpt_entries_to_transaction(gpt_data)
+        journal_entry.append_multi_entry_transaction(transaction)
+
+
+def run_round(journal_entry, jobs, concurrency, use_cache):
+    failures = []
+
+    def run(job):
+        case, frame = job
+        try:
+            run_capture(journal_entry, case, frame, use_cache)
+        except Exception as e:
+            failures.append({"case": case["name"], "error": str(e)})
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(run, jobs))
+    return failures
+
+
+def compare(current, baseline) -> list:
+    """ステージ別 p50 / p95 / p99 の変化率（%）を返す"""
+    rows = []
+    for stage in COMPARED_STAGES:
+        now, before = current["stages"].get(stage), baseline["stages"].get(stage)
+        if not now or not before:
+            continue
+        row = {"stage": stage}
+        for key in ("p50_sec", "p95_sec", "p99_sec"):
+            row[key] = now[key]
+            row[f"{key}_change_pct"] = (now[key] - before[key]) / before[key] * 100 if before[key] else None
+        rows.append(row)
+    return rows
+
+
+def print_comparison(rows, current, baseline):
+    print(f"📈 比較: {baseline['meta'].get('commit')} → {current['meta'].get('commit')}")
+    for row in rows:
+        changes = ", ".join(
+            f"{key[:-4]}={row[key] * 1000:.1f}ms ({row[f'{key}_change_pct']:+.1f}%)"
+            if row[f"{key}_change_pct"] is not None else f"{key[:-4]}={row[key] * 1000:.1f}ms"
+            for key in ("p50_sec", "p95_sec", "p99_sec")
+        )
+        print(f"  {row['stage']:<15} {changes}")
+    before = baseline["throughput"]["captures_per_sec"]
+    now = current["throughput"]["captures_per_sec"]
+    if before:
+        print(f"  throughput      {now:.2f}/s ({(now - before) / before * 100:+.1f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="外部サービスの代役を使ってパイプライン全体を計測する")
+    parser.add_argument("--cases", default=DEFAULT_CASES, help="書類と GPT 応答の録画（JSON）")
+    parser.add_argument("--iterations", type=int, default=10, help="全書類を何周流すか")
+    parser.add_argument("--warmup", type=int, default=1, help="計測に含めない周回数")
+    parser.add_argument("--concurrency", type=int, default=1, help="同時に処理する撮影数")
+    parser.add_argument("--text-only", action="store_true", help="画像を使わず録画済みOCRテキストから始める")
+    parser.add_argument("--warm-caches", action="store_true", help="OCR・GPT・償却表のキャッシュを有効にする")
+    parser.add_argument("--prompt-mode", default="two_stage", choices=("two_stage", "single"))
+    parser.add_argument("--no-rules", action="store_true", help="ルールによる仕訳を使わず、すべて GPT に送る")
+    parser.add_argument("--depreciation-backend", default="native", choices=("native", "site", "verify"),
+                        help="site / verify は Chrome で dep.php の代役ページを操作する")
+    parser.add_argument("--vision-latency-ms", type=float, default=250)
+    parser.add_argument("--gpt-latency-ms", type=float, default=600)
+    parser.add_argument("--gpt-error-rate", type=float, default=0.0, help="OpenAI 代役が 429 を返す割合")
+    parser.add_argument("--gpt-concurrency", type=int, default=4)
+    parser.add_argument("--dep-latency-ms", type=float, default=150)
+    parser.add_argument("--sheets-latency-ms", type=float, default=200)
+    parser.add_argument("--sheets-max-batch", type=int, default=20)
+    parser.add_argument("--jitter-pct", type=float, default=20, help="各遅延のゆらぎ（平均に対する ±%%）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="結果 JSON の出力先")
+    parser.add_argument("--compare", metavar="BASELINE", help="以前の結果 JSON と比較する")
+    parser.add_argument("--fail-on-regression", type=float, metavar="PCT",
+                        help="end_to_end の p95 が PCT%% を超えて悪化したら終了コード 1")
+    parser.add_argument("--verbose", action="store_true", help="パイプラインの出力を表示する")
+    args = parser.parse_args(argv)
+
+    def latency(mean_ms, offset):
+        return Latency(mean_ms, mean_ms * args.jitter_pct / 100, seed=args.seed + offset)
+
+    cases = load_cases(args.cases)
+    workdir = tempfile.mkdtemp(prefix="journal-bench-")
+    openai_server, openai_url = start_server(
+        FakeOpenAIHandler, cases=cases, latency=latency(args.gpt_latency_ms, 1), error_rate=args.gpt_error_rate
+    )
+    dep_server, dep_url = start_server(FakeDepCalculatorHandler, latency=latency(args.dep_latency_ms, 2))
+    configure_environment(args, workdir, openai_url, dep_url)
+
+    # 環境変数を設定してから読み込む
+    from app.services import journal_entry, vision_ocr
+    from app.services.profiler import PipelineProfiler
+    from app.services.sheets_writer import SheetsJournalWriter
+
+    frames = [None] * len(cases)
+    texts = {}
+    if not args.text_only:
+        for i, case in enumerate(cases):
+            frames[i] = load_frame(case, i)
+            texts[content_key(vision_ocr.encode_frame(frames[i]))] = case["ocr_text"]
+    vision = FakeVisionClient(texts, latency=latency(args.vision_latency_ms, 3))
+    vision_ocr._client = vision
+
+    sheets = FakeSheetsService(sheet_name=journal_entry.SHEET_NAME, latency=latency(args.sheets_latency_ms, 4))
+    writer = SheetsJournalWriter(
+        None, "benchmark", sheet_name=journal_entry.SHEET_NAME,
+        max_batch=args.sheets_max_batch, flush_interval=0, service=sheets, profiler=journal_entry.profiler,
+    )
+    journal_entry._sheets_writer = writer
+
+    jobs = list(zip(cases, frames))
+    print(f"🏁 {len(cases)}件の書類 × {args.iterations}周（ウォームアップ {args.warmup}周、同時実行 {args.concurrency}）")
+    output = io.StringIO()
+    with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+        for _ in range(args.warmup):
+            run_round(journal_entry, jobs, args.concurrency, args.warm_caches)
+        writer.flush()
+
+        # ウォームアップ分を除いて計測し直す
+        journal_entry.profiler = PipelineProfiler()
+        writer.profiler = journal_entry.profiler
+        retries_before = journal_entry.gpt_gateway.retries
+        failures = []
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            failures.extend(run_round(journal_entry, jobs, args.concurrency, args.warm_caches))
+        writer.flush()
+        elapsed = time.perf_counter() - start
+
+    captures = len(jobs) * args.iterations
+    result = {
+        "meta": result_meta({k: v for k, v in vars(args).items() if k not in ("out", "compare", "verbose")}),
+        "throughput": {
+            "captures": captures,
+            "failed": len(failures),
+            "elapsed_sec": elapsed,
+            "captures_per_sec": captures / elapsed if elapsed else 0.0,
+        },
+        "stages": journal_entry.profiler.summary(),
+        "services": {
+            "vision": {"calls": vision.calls, "images": vision.images},
+            "openai": {"retries": journal_entry.gpt_gateway.retries - retries_before},
+            "sheets": {**sheets.calls, **writer.stats()},
+        },
+        "failures": failures[:20],
+    }
+
+    openai_server.shutdown()
+    dep_server.shutdown()
+
+    if args.out:
+        write_result(result, args.out)
+
+    end_to_end = result["stages"].get("end_to_end", {})
+    print(f"📊 {captures}件 / {elapsed:.2f}秒（{result['throughput']['captures_per_sec']:.2f}件/秒、失敗 {len(failures)}件）")
+    print("   end_to_end " + ", ".join(f"p{p}={end_to_end.get(f'p{p}_sec', 0) * 1000:.1f}ms" for p in (50, 95, 99)))
+    for failure in failures[:5]:
+        print(f"❌ {failure['case']}: {failure['error']}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare(result, baseline)
+        print_comparison(rows, result, baseline)
+        if args.fail_on_regression is not None:
+            change = next((row["p95_sec_change_pct"] for row in rows if row["stage"] == "end_to_end"), None)
+            if change is not None and change > args.fail_on_regression:
+                print(f"❌ end_to_end の p95 が {change:.1f}% 悪化しました（許容 {args.fail_on_regression}%）")
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+import pytest
+
+from app.services import journal_store
+from app.services.journal_store import JournalStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """一時ディレクトリの JournalStore を get_journal_store() の返り値にする"""
+    store = JournalStore(str(tmp_path / "journal.sqlite3"))
+    monkeypatch.setattr(journal_store, "_store", store)
+    return store
@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.handlers import batch
+from app.main import app
+from app.metrics import validation_failures_total
+from app.schemas import SalesRequest
+
+
+@pytest.fixture
+def client(store):
+    return TestClient(app)
+
+
+def sales(amount):
+    return SalesRequest(
+        type="sales", date="2025-04-01", summary="商品の売上", customer="A商店", amount=amount,
+        entries=[{"debit": "売掛金", "credit": "売上", "amount": amount}],
+    ).model_dump()
+
+
+def failures(route):
+    return validation_failures_total._values.get((("route", route),), 0)
+
+
+def test_batch_reports_non_object_items_per_item(client, store):
+    before = failures("/journal/batch")
+    response = client.post("/journal/batch", json=[sales(1000), {"type": "x"}, 5, "sales"])
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["status"], body["accepted"], body["rejected"]) == ("partial", 1, 3)
+    assert [r["status"] for r in body["results"]] == ["success", "error", "error", "error"]
+    assert failures("/journal/batch") - before == 3
+    assert len(store.list_entries()["items"]) == 1
+
+
+def test_ndjson_through_the_app(client, store, monkeypatch):
+    event_loop_calls = []
+    process_item = batch.process_item
+
+    def record_loop(*args, **kwargs):
+        try:
+            asyncio.get_running_loop()
+            event_loop_calls.append(args[0])
+        except RuntimeError:
+            pass
+        return process_item(*args, **kwargs)
+    monkeypatch.setattr(batch, "process_item", record_loop)
+    monkeypatch.setattr(batch, "NDJSON_COMMIT_SIZE", 2)
+
+    lines = [json.dumps(sales(1000)), "{broken", json.dumps({"type": "sales"}), "7", json.dumps(sales(2000))]
+    before = failures("/journal/batch/ndjson")
+    response = client.post("/journal/batch/ndjson", content="\n".join(lines).encode("utf-8"),
+                           headers={"Content-Type": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [r.get("status") for r in results[:-1]] == ["success", "error", "error", "error", "success"]
+    assert [r["index"] for r in results[:-1]] == [0, 1, 2, 3, 4]
+    assert results[-1] == {"summary": {"accepted": 2, "rejected": 3}}
+    assert failures("/journal/batch/ndjson") - before == 3
+    assert event_loop_calls == []  # SQLite への書き込みはイベントループの外
+    assert len(store.list_entries()["items"]) == 2
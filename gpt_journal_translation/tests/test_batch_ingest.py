@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+from app.services import batch_ingest, journal_entry
+from app.services.vision_ocr import NO_TEXT
+
+
+def journal(n):
+    return {"type": "sales", "date": "2025-04-01", "summary": f"売上{n}",
+            "entries": [{"debit": "売掛金", "credit": "売上", "amount": 1000 * n}]}
+
+
+def run_multi(monkeypatch, journals, accepted):
+    monkeypatch.setattr(journal_entry, "split_ocr_text", lambda text: ["1", "2", "3"])
+    monkeypatch.setattr(journal_entry, "build_journal_proposals", lambda segments, use_cache=True: journals)
+    monkeypatch.setattr(journal_entry, "send_batch_to_fastapi", lambda items: {"accepted": accepted})
+    item = {"file": "a.jpg", "ocr_text": "3件の取引", "status": "pending", "approved": False, "timings": {}}
+    return batch_ingest.BatchPipeline().process(item)
+
+
+def test_multi_is_ok_and_approved_only_when_every_transaction_is_accepted(monkeypatch):
+    item = run_multi(monkeypatch, [journal(1), journal(2), journal(3)], accepted=3)
+    assert (item["status"], item["approved"]) == ("ok", True)
+
+
+def test_multi_with_missing_journal_is_partial_and_not_approved(monkeypatch):
+    # 1件は GPT で仕訳にできず、残り2件は受理された
+    item = run_multi(monkeypatch, [journal(1), None, journal(3)], accepted=2)
+    assert (item["status"], item["approved"]) == ("partial", False)
+
+
+def test_empty_ocr_is_skipped():
+    item = {"file": "a.jpg", "ocr_text": NO_TEXT, "status": "pending", "approved": False, "timings": {}}
+    assert batch_ingest.BatchPipeline().process(item)["status"] == "ocr_empty"
+
+
+def test_gpt_starts_while_ocr_chunks_are_still_running(monkeypatch):
+    cv2 = pytest.importorskip("cv2")
+    events = []
+    lock = threading.Lock()
+
+    def record(event):
+        with lock:
+            events.append(event)
+
+    def slow_ocr(frames):
+        time.sleep(0.1)
+        record("ocr_end")
+        return [f"OCR:{frame}" for frame in frames]
+
+    def slow_gpt(text, use_cache=True):
+        record("gpt_start")
+        time.sleep(0.05)
+        return journal(1)
+
+    monkeypatch.setattr(cv2, "imread", lambda path: path)
+    monkeypatch.setattr(journal_entry, "extract_texts_from_frames", slow_ocr)
+    monkeypatch.setattr(journal_entry, "split_ocr_text", lambda text: [text])
+    monkeypatch.setattr(journal_entry, "build_journal_proposal", slow_gpt)
+    monkeypatch.setattr(journal_entry, "convert_gpt_entries_to_transaction", lambda data: {})
+    monkeypatch.setattr(journal_entry, "send_to_fastapi", lambda kind, data: True)
+
+    pipeline = batch_ingest.BatchPipeline(ocr_concurrency=1, gpt_concurrency=1, api_concurrency=1, ocr_batch_size=1)
+    items = pipeline.run([f"{n}.jpg" for n in range(6)])
+
+    assert [item["status"] for item in items] == ["ok"] * 6
+    # 最初の塊の OCR が終わればすぐに GPT が始まり、残りの OCR の塊と重なる
+    first_gpt = events.index("gpt_start")
+    assert events[:first_gpt].count("ocr_end") <= 2
+    assert first_gpt < len(events) - 1 - events[::-1].index("ocr_end")
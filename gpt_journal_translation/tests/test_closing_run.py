@@ -0,0 +1,76 @@
+import pytest
+
+from app.schemas import AssetPurchaseRequest, DepreciationRequest
+from app.services.closing_run import run_closing
+
+
+def purchase(name="備品", amount=400000, date="2024-04-01"):
+    return AssetPurchaseRequest(
+        type="asset_purchase", date=date, summary=f"{name}の購入", asset_name=name, amount=amount,
+        method="定額法", life=4, entries=[{"debit": name, "credit": "現金預金", "amount": amount}],
+    )
+
+
+def photo_depreciation(name="備品", amount=400000, acquired="2024-04-01", closing="2025-03-31"):
+    # 写真から作った減価償却の仕訳（/journal/depreciation と同じ）
+    return DepreciationRequest(
+        type="depreciation", date=closing, summary=f"{name}の減価償却", asset_name=name,
+        acquisition_date=acquired, closing_date=closing, calc_closing_date=closing, method="定額法",
+        amount=amount, life=4, target_year=closing,
+        entries=[{"debit": "減価償却費", "credit": "減価償却累計額", "amount": amount / 4}],
+    )
+
+
+def depreciation_journals(store):
+    return store.list_entries(type_="depreciation")["items"]
+
+
+def test_closing_is_idempotent(store):
+    store.record(purchase())
+    store.record(purchase("車両運搬具", 1200000))
+    first = run_closing("2025-03-31", store=store)
+    again = run_closing("2025-03-31", store=store)
+    assert (first.depreciated, again.depreciated) == (2, 0)
+    assert len(depreciation_journals(store)) == 2
+    assert store.trial_balance()["balanced"]
+
+
+def test_photo_depreciation_is_not_posted_again(store):
+    store.record(purchase())
+    store.record(purchase("車両運搬具", 1200000))
+    store.record(photo_depreciation())
+
+    result = run_closing("2025-03-31", store=store)
+    assert result.depreciated == 1
+    assert [entry.asset_name for entry in result.entries] == ["車両運搬具"]
+    assets = {asset["asset_name"]: asset for asset in store.list_fixed_assets(as_of="2025-03-31")}
+    assert assets["備品"]["accumulated"] == 100000
+    assert assets["備品"]["last_closing_date"] == "2025-03-31"
+
+
+def test_existing_photo_depreciation_is_linked_on_upgrade(store):
+    store.record(purchase())
+    # 結び付けを追加する前に保存された仕訳
+    store.record(photo_depreciation(), link_asset=False)
+    store.link_depreciation_journals()
+    assert run_closing("2025-03-31", store=store).depreciated == 0
+    assert len(depreciation_journals(store)) == 1
+
+
+def test_closing_rolls_back_every_asset_on_failure(store, monkeypatch):
+    for i in range(3):
+        store.record(purchase(amount=400000 + i * 1000))
+    record_depreciation = store.record_depreciation
+    calls = []
+
+    def fail_on_third(*args):
+        calls.append(args)
+        if len(calls) == 3:
+            raise RuntimeError("disk full")
+        return record_depreciation(*args)
+    monkeypatch.setattr(store, "record_depreciation", fail_on_third)
+
+    with pytest.raises(RuntimeError):
+        run_closing("2025-03-31", store=store)
+    assert depreciation_journals(store) == []
+    assert all(asset["last_closing_date"] is None for asset in store.list_fixed_assets())
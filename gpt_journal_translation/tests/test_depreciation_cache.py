@@ -0,0 +1,25 @@
+from app.services.depreciation_cache import DepreciationScheduleCache, make_schedule_key
+
+PARAMS = ("2024-04-01", "2025-03-31", "定額法", "200000", 4)
+
+
+def test_key_includes_engine_version():
+    assert make_schedule_key("native", "v1", *PARAMS) != make_schedule_key("native", "v2", *PARAMS)
+    assert make_schedule_key("native", "v1", *PARAMS) == make_schedule_key("native", "v1", "2024-04-01", "2025-03-31", "定額法", 200000.0, "4")
+
+
+def test_returned_schedule_is_a_copy(tmp_path):
+    cache = DepreciationScheduleCache(path=str(tmp_path / "schedules.sqlite3"))
+    key = make_schedule_key("native", "v1", *PARAMS)
+    computed = cache.get_or_compute(key, lambda: [{"year": "2025", "depreciation": 50000}])
+    computed[0]["depreciation"] = 0
+
+    first = cache.get(key)
+    first[0]["depreciation"] = 1
+    first.append({"year": "2026", "depreciation": 1})
+    assert cache.get(key) == [{"year": "2025", "depreciation": 50000}]
+
+    # ディスクから読んだ表も同じ
+    reopened = DepreciationScheduleCache(path=str(tmp_path / "schedules.sqlite3"))
+    reopened.get(key)[0]["depreciation"] = 1
+    assert reopened.get(key) == [{"year": "2025", "depreciation": 50000}]
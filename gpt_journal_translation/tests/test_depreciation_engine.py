@@ -0,0 +1,64 @@
+import json
+import os
+
+import pytest
+
+from app.services.depreciation_engine import MEMO_VALUE, build_depreciation_schedule, find_depreciation_for_year
+
+# dep.php の結果テーブル（source: "dep.php" は benchmarks.record_dep_schedules で記録したもの、
+# "hand" は耐用年数省令の償却率・保証率から手計算した参照値）
+SCHEDULES_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "dep_php_schedules.json")
+TOLERANCE = float(os.getenv("DEPRECIATION_TOLERANCE", "1"))
+
+with open(SCHEDULES_PATH, encoding="utf-8") as f:
+    RECORDED = json.load(f)
+
+
+@pytest.mark.parametrize("case", RECORDED, ids=lambda case: case["name"])
+def test_schedule_matches_recorded_table(case):
+    schedule = build_depreciation_schedule(**case["input"])
+    assert len(schedule) >= len(case["rows"])
+    for row, expected in zip(schedule, case["rows"]):
+        assert row["year"] == expected["year"]
+        assert abs(row["depreciation"] - expected["depreciation"]) <= TOLERANCE, (row, expected)
+
+
+@pytest.mark.parametrize("case", [c for c in RECORDED if c["input"]["method"] != "生産高比例法"], ids=lambda case: case["name"])
+def test_schedule_ends_at_memo_value(case):
+    schedule = build_depreciation_schedule(**case["input"])
+    assert schedule[-1]["ending_book_value"] == MEMO_VALUE
+    assert schedule[-1]["accumulated"] == case["input"]["price"] - MEMO_VALUE
+
+
+def test_find_depreciation_for_year():
+    schedule = build_depreciation_schedule("2024-04-01", "2025-03-31", "定額法", 1000000, 5)
+    assert find_depreciation_for_year(schedule, "2026-03-31") == 200000
+    assert find_depreciation_for_year(schedule, "2040-03-31") is None
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"method": "250%定率法"},
+    {"life": 0},
+    {"price": 1},
+    {"starting_date": "2025-04-01"},  # 取得日が初年度決算日より後
+])
+def test_invalid_input(kwargs):
+    params = {"starting_date": "2024-04-01", "calc_closing_date": "2025-03-31", "method": "定額法", "price": 1000000, "life": 5}
+    with pytest.raises(ValueError):
+        build_depreciation_schedule(**{**params, **kwargs})
+
+
+def test_verify_mode_falls_back_to_native_when_site_fails(monkeypatch):
+    pytest.importorskip("dotenv")
+    from app.services import journal_entry
+    from app.services.depreciation_cache import DepreciationScheduleCache
+
+    def unreachable(*args, **kwargs):
+        raise ConnectionError("dep.php に接続できません")
+
+    monkeypatch.setattr(journal_entry, "DEPRECIATION_BACKEND", "verify")
+    monkeypatch.setattr(journal_entry, "_depreciation_cache", DepreciationScheduleCache())
+    monkeypatch.setattr(journal_entry, "fetch_depreciation_schedule_from_site", unreachable)
+    amount = journal_entry.calculate_depreciation_by_year(
+        "2024-04-01", "2025-03-31", "定額法", 1000000, 5, "2026-03-31")
+    assert amount == 200000
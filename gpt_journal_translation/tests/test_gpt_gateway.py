@@ -0,0 +1,142 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from app.services.gpt_gateway import GptGateway, _retry_after_seconds
+
+
+def status_error(cls, status, headers=None):
+    request = httpx.Request("POST", "https://api.openai.test/v1/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return cls("error", response=response, body=None)
+
+
+def completion(text="ok"):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+        usage=SimpleNamespace(prompt_tokens=3, completion_tokens=5),
+    )
+
+
+class FakeCompletions:
+    """outcomes を順に返す（例外なら送出、数値ならその秒数待ってから "ok"）"""
+
+    def __init__(self, outcomes=()):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+        self.threads = set()
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        self.threads.add(threading.current_thread().name)
+        outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+        if isinstance(outcome, Exception):
+            raise outcome
+        if isinstance(outcome, (int, float)):
+            await asyncio.sleep(outcome)
+            return completion()
+        return completion(outcome)
+
+
+def gateway(outcomes=(), **kwargs):
+    completions = FakeCompletions(outcomes)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    options = {"base_delay": 0.001, "max_delay": 0.05, "timeout": 1.0}
+    options.update(kwargs)
+    return GptGateway(client=client, **options), completions
+
+
+@pytest.mark.parametrize("error", [
+    status_error(openai.RateLimitError, 429),
+    status_error(openai.InternalServerError, 500),
+    status_error(openai.InternalServerError, 503),
+])
+def test_retries_rate_limit_and_server_errors(error):
+    gw, completions = gateway([error, error, "done"])
+    text, tokens = gw.chat_sync([{"role": "user", "content": "hi"}])
+    assert text == "done"
+    assert tokens == {"prompt_tokens": 3, "completion_tokens": 5}
+    assert completions.calls == 3
+    assert gw.retries == 2
+
+
+def test_does_not_retry_client_errors():
+    gw, completions = gateway([status_error(openai.BadRequestError, 400)])
+    with pytest.raises(openai.BadRequestError):
+        gw.chat_sync([])
+    assert completions.calls == 1
+    assert gw.retries == 0
+
+
+def test_gives_up_after_max_retries():
+    error = status_error(openai.RateLimitError, 429)
+    gw, completions = gateway([error] * 5, max_retries=2)
+    with pytest.raises(openai.RateLimitError):
+        gw.chat_sync([])
+    assert completions.calls == 3
+
+
+def test_timeout_is_retried_then_raised():
+    gw, completions = gateway([1.0, 1.0], timeout=0.02, max_retries=1)
+    with pytest.raises(asyncio.TimeoutError):
+        gw.chat_sync([])
+    assert completions.calls == 2
+
+    gw, completions = gateway([1.0, "late"], timeout=0.02)
+    assert gw.chat_sync([])[0] == "late"
+    assert gw.retries == 1
+
+
+def test_retry_after_header_is_respected():
+    assert _retry_after_seconds(status_error(openai.RateLimitError, 429, {"retry-after-ms": "250"})) == 0.25
+    assert _retry_after_seconds(status_error(openai.RateLimitError, 429, {"retry-after": "2"})) == 2.0
+    assert _retry_after_seconds(status_error(openai.RateLimitError, 429)) is None
+
+    gw, _ = gateway(base_delay=0.1, max_delay=10.0)
+    error = status_error(openai.RateLimitError, 429, {"retry-after": "3"})
+    for attempt in range(5):
+        assert 3.0 <= gw._backoff(attempt, error) <= 3.1
+    # 上限を超える Retry-After は max_delay に切り詰める
+    error = status_error(openai.RateLimitError, 429, {"retry-after": "600"})
+    assert gw._backoff(0, error) <= 10.1
+
+
+def test_backoff_is_jittered_and_capped():
+    gw, _ = gateway(base_delay=1.0, max_delay=4.0)
+    delays = [gw._backoff(10, asyncio.TimeoutError()) for _ in range(200)]
+    assert all(0 <= d <= 4.0 for d in delays)
+    assert len(set(delays)) > 1
+    assert max(gw._backoff(0, asyncio.TimeoutError()) for _ in range(200)) <= 1.0
+
+
+def test_chat_from_caller_loops_and_chat_sync_share_gateway_loop():
+    gw, completions = gateway()
+    assert asyncio.run(gw.chat([]))[0] == "ok"
+    assert asyncio.run(gw.chat([]))[0] == "ok"
+    assert gw.chat_sync([])[0] == "ok"
+    assert [text for text, _ in asyncio.run(gw.chat_many([[], [], []]))] == ["ok"] * 3
+    assert completions.threads == {"gpt-gateway"}
+    assert completions.calls == 6
+
+
+def test_chat_many_respects_max_concurrency():
+    gw, completions = gateway([0.02] * 6, max_concurrency=2)
+    active = peak = 0
+    create = completions.create
+
+    async def tracking_create(**kwargs):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        try:
+            return await create(**kwargs)
+        finally:
+            active -= 1
+
+    completions.create = tracking_create
+    assert len(asyncio.run(gw.chat_many([[]] * 6))) == 6
+    assert peak == 2
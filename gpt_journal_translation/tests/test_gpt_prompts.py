@@ -0,0 +1,37 @@
+import json
+
+from app.services import journal_entry, prompts
+
+TOKENS = {"prompt_tokens": 0, "completion_tokens": 0}
+
+
+def fake_gpt(monkeypatch, *responses):
+    answers = iter(responses)
+    monkeypatch.setattr(journal_entry, "ask_gpt_messages", lambda messages, json_mode=False: (next(answers), TOKENS))
+
+
+def test_each_prompt_path_has_its_own_version():
+    versions = prompts.PROMPT_VERSIONS
+    assert len(set(versions.values())) == len(versions) == 3
+    keys = {journal_entry.make_cache_key("文房具 500円", version, "gpt-4o") for version in versions.values()}
+    assert len(keys) == 3
+
+
+def test_two_stage_rejects_non_object_json(monkeypatch):
+    fake_gpt(monkeypatch, '["sales"]')
+    assert json.loads(journal_entry.ask_gpt_two_stage("商品を売り上げた")) == {"type": "unknown"}
+
+    fake_gpt(monkeypatch, '{"type": "sales"}', '[1, 2]')
+    result = journal_entry.ask_gpt_two_stage("商品を売り上げた")
+    assert result == "[1, 2]"
+    assert journal_entry._journal_from_gpt_result(result, "商品を売り上げた", "key", "v", cached=True) is None
+
+
+def test_two_stage_sets_type_on_object(monkeypatch):
+    fake_gpt(monkeypatch, '{"type": "sales"}', '{"date": "2025-04-01", "amount": 1000}')
+    assert json.loads(journal_entry.ask_gpt_two_stage("商品を売り上げた")) == {"date": "2025-04-01", "amount": 1000, "type": "sales"}
+
+
+def test_multi_rejects_non_object_json(monkeypatch):
+    fake_gpt(monkeypatch, '"transactions"')
+    assert journal_entry.ask_gpt_multi(["a", "b"]) == [None, None]
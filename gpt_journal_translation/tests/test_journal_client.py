@@ -0,0 +1,75 @@
+import json
+import logging
+
+from app import logging_config
+from app.services.journal_client import InProcessJournalClient
+
+
+def test_inprocess_client_configures_logging(store, capfd, monkeypatch):
+    root = logging.getLogger("journal")
+    monkeypatch.setattr(root, "handlers", [])
+    client = InProcessJournalClient()
+    ok, _ = client.send("sales", {
+        "date": "2025-04-01", "summary": "商品の売上", "customer": "A商店", "amount": 1000,
+        "entries": [{"debit": "売掛金", "credit": "売上", "amount": 1000}],
+    })
+    logging_config.shutdown_logging()
+
+    assert ok
+    logs = [json.loads(line) for line in capfd.readouterr().out.splitlines() if line.startswith("{")]
+    assert any(log["level"] == "INFO" and log["route"] == "/journal/sales" for log in logs)
+
+
+class StatusServer:
+    """POST を受けた回数を数え、statuses の順にステータスを返す HTTP サーバー"""
+
+    def __init__(self, statuses):
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        server = self
+        self.statuses = list(statuses)
+        self.posts = 0
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                status = server.statuses[min(server.posts, len(server.statuses) - 1)]
+                server.posts += 1
+                body = b'{"status": "success"}'
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+
+
+def send_with_statuses(statuses):
+    from app.services.journal_client import HttpJournalClient
+
+    server = StatusServer(statuses)
+    try:
+        client = HttpJournalClient(server.url, retries=3, backoff=0)
+        ok, _ = client.send("sales", {"amount": 1000})
+        return ok, server.posts
+    finally:
+        server.close()
+
+
+def test_http_client_does_not_resend_after_gateway_timeout():
+    assert send_with_statuses([504, 200]) == (False, 1)
+    assert send_with_statuses([502, 200]) == (False, 1)
+
+
+def test_http_client_retries_when_server_refused():
+    assert send_with_statuses([503, 429, 200]) == (True, 3)
@@ -0,0 +1,61 @@
+from app.services import journal_entry
+
+
+class Recorder:
+    def __init__(self, accept=True):
+        self.accept = accept
+        self.sent = []
+        self.written = []
+
+
+def fake_pipeline(monkeypatch, recorder, accepted_indexes=None):
+    journal = {"type": "expense", "date": "2025-04-01", "summary": "文房具",
+               "entries": [{"debit": "消耗品費", "credit": "現金預金", "amount": 500}]}
+    monkeypatch.setattr(journal_entry, "split_ocr_text", lambda text: [text])
+    monkeypatch.setattr(journal_entry, "build_journal_proposal", lambda text, use_cache=True: dict(journal))
+
+    def send(type_, data):
+        recorder.sent.append(data)
+        return recorder.accept
+
+    def send_batch(items):
+        recorder.sent.extend(items)
+        results = [{"index": i, "status": "success" if i in accepted_indexes else "error"} for i in range(len(items))]
+        return {"accepted": len(accepted_indexes), "results": results}
+
+    class Writer:
+        def flush(self):
+            return 0
+
+    monkeypatch.setattr(journal_entry, "send_to_fastapi", send)
+    monkeypatch.setattr(journal_entry, "send_batch_to_fastapi", send_batch)
+    monkeypatch.setattr(journal_entry, "append_multi_entry_transaction", recorder.written.append)
+    monkeypatch.setattr(journal_entry, "get_sheets_writer", Writer)
+
+
+def test_proposals_are_not_sent_before_approval(monkeypatch):
+    recorder = Recorder()
+    fake_pipeline(monkeypatch, recorder)
+    proposals = journal_entry.proposals_from_text("文房具 500円 現金で購入")
+    assert len(proposals) == 1
+    assert recorder.sent == [] and recorder.written == []
+
+    assert journal_entry.record_approved_proposals(proposals) == proposals
+    assert len(recorder.sent) == 1 and len(recorder.written) == 1
+
+
+def test_rejected_by_fastapi_is_not_written(monkeypatch):
+    recorder = Recorder(accept=False)
+    fake_pipeline(monkeypatch, recorder)
+    proposals = journal_entry.proposals_from_text("文房具 500円 現金で購入")
+    assert journal_entry.record_approved_proposals(proposals) == []
+    assert recorder.written == []
+
+
+def test_batch_writes_only_accepted(monkeypatch):
+    recorder = Recorder()
+    fake_pipeline(monkeypatch, recorder, accepted_indexes={1})
+    proposals = journal_entry.proposals_from_text("a") + journal_entry.proposals_from_text("b")
+    accepted = journal_entry.record_approved_proposals(proposals)
+    assert accepted == [proposals[1]]
+    assert len(recorder.sent) == 2 and recorder.written == [proposals[1]["transaction"]]
@@ -0,0 +1,99 @@
+import sqlite3
+
+import pytest
+
+from app.handlers import batch
+from app.schemas import SalesRequest
+from app.services.journal_store import JournalStore
+
+
+def sales(amount, date="2025-04-01"):
+    return SalesRequest(
+        type="sales", date=date, summary="商品売上", customer="丸山商店", amount=amount,
+        entries=[{"debit": "現金預金", "credit": "売上", "amount": amount}],
+    )
+
+
+def count_rows(path, table="journal"):
+    # 別の接続から見える（コミット済みの）行数
+    with sqlite3.connect(path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def trace_statements(store):
+    statements = []
+    store._conn().set_trace_callback(statements.append)
+    return statements
+
+
+def test_batch_commits_once(store):
+    statements = trace_statements(store)
+    with store.batch():
+        for amount in (1000, 2000, 3000):
+            store.record(sales(amount))
+            assert store._conn().in_transaction
+        assert count_rows(store.path) == 0
+    assert count_rows(store.path) == 3
+    assert [s for s in statements if s in ("BEGIN IMMEDIATE", "COMMIT")] == ["BEGIN IMMEDIATE", "COMMIT"]
+    assert not store._conn().in_transaction
+
+
+def test_batch_exception_rolls_back_every_item(store):
+    with pytest.raises(RuntimeError):
+        with store.batch():
+            store.record(sales(1000))
+            store.record(sales(2000))
+            raise RuntimeError("途中で失敗")
+    assert count_rows(store.path) == 0
+    assert count_rows(store.path, "journal_lines") == 0
+    assert count_rows(store.path, "account_balances") == 0
+    assert not store._conn().in_transaction
+
+
+def test_nested_failure_only_rolls_back_that_item(store):
+    with store.batch():
+        store.record(sales(1000))
+        with pytest.raises(RuntimeError):
+            with store.batch():
+                store.record(sales(2000))
+                raise RuntimeError("この1件だけ取り消す")
+        store.record(sales(3000))
+    amounts = [item["amount"] for item in store.list_entries()["items"]]
+    assert amounts == [1000, 3000]
+
+
+def test_single_record_commits(store):
+    store.record(sales(1000))
+    assert count_rows(store.path) == 1
+    assert not store._conn().in_transaction
+
+
+def test_handle_batch_commits_once_and_keeps_valid_items(store):
+    statements = trace_statements(store)
+    items = [
+        sales(1000).model_dump(),
+        {"type": "sales", "date": "2025-04-01"},  # 必須項目がない
+        sales(2000).model_dump(),
+    ]
+    response = batch.handle_batch(items)
+    assert (response.status, response.accepted, response.rejected) == ("partial", 2, 1)
+    assert statements.count("COMMIT") == 1
+    assert count_rows(store.path) == 2
+
+
+def test_trial_balance_matches_lines(store):
+    with store.batch():
+        store.record(sales(1000, "2025-04-01"))
+        store.record(sales(2000, "2025-05-01"))
+    balance = store.trial_balance(period_from="2025-05", period_to="2025-05")
+    accounts = {a["account"]: a for a in balance["accounts"]}
+    assert accounts["売上"]["credit_total"] == 2000
+    assert balance["balanced"]
+
+
+def test_reopen_sees_committed_rows(tmp_path):
+    path = str(tmp_path / "journal.sqlite3")
+    first = JournalStore(path)
+    with first.batch():
+        first.record(sales(1000))
+    assert len(JournalStore(path).list_entries()["items"]) == 1
@@ -0,0 +1,63 @@
+import pytest
+
+from app.services.journal_validation import normalize_date, parse_number, repair_journal, validate_journal
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("150,000円", 150000),
+    ("１２０００", 12000),
+    ("5年", 5),
+    ("未計算", 0),
+    ("12.5", 12.5),
+    ("不明", "不明"),
+    (3000, 3000),
+])
+def test_parse_number(value, expected):
+    assert parse_number(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2025年5月22日", "2025-05-22"),
+    ("2025/5/2", "2025-05-02"),
+    ("令和7年5月22日", "2025-05-22"),
+    ("令和元年5月1日", "2019-05-01"),
+    ("2025年2月30日", "2025年2月30日"),
+    ("来月", "来月"),
+])
+def test_normalize_date(value, expected):
+    assert normalize_date(value) == expected
+
+
+def test_repair_fills_fields_from_ocr_text_and_passes_validation():
+    ocr_text = "2025年4月10日 丸山商店に商品 150,000円を掛けで販売した"
+    data = {"type": "sales", "amount": "150,000円",
+            "entries": [{"debit": "売掛金", "credit": "売上", "amount": "15000"}]}
+    repairs = repair_journal(data, ocr_text)
+
+    assert data["date"] == "2025-04-10"
+    assert data["customer"] == "丸山商店"
+    assert data["amount"] == 150000
+    assert data["entries"][0]["amount"] == 150000  # 1行の明細は取引金額に合わせる
+    assert data["summary"]
+    assert any(repair.startswith("customer") for repair in repairs)
+    assert validate_journal(data) == {}
+
+
+def test_repair_depreciation_method_alias_and_defaults():
+    data = {"type": "depreciation", "summary": "備品の減価償却", "acquisition_date": "令和6年4月1日",
+            "calc_closing_date": "2025/3/31", "target_year": "2026年3月31日", "method": "定率法",
+            "amount": "400,000", "life": "5年"}
+    repair_journal(data)
+    assert data["method"] == "200%定率法"
+    assert (data["date"], data["closing_date"], data["asset_name"]) == ("2026-03-31", "2025-03-31", "備品")
+    assert data["life"] == 5
+    assert data["entries"] == [{"debit": "減価償却費", "credit": "減価償却累計額", "amount": 0}]
+    assert validate_journal(data) == {}
+
+
+def test_validate_reports_each_failed_field():
+    data = {"type": "purchase", "date": "5月1日", "summary": "商品の仕入", "amount": 1000,
+            "entries": [{"debit": "仕入", "credit": "買掛金", "amount": 900}]}
+    errors = validate_journal(data)
+    assert set(errors) == {"supplier", "date", "entries"}
+    assert validate_journal({"type": "refund"}) == {"type": "未対応の取引タイプです: 'refund'"}
@@ -0,0 +1,80 @@
+import json
+import logging
+
+from fastapi.testclient import TestClient
+
+from app.logging_config import JsonFormatter, SamplingFilter
+from app.main import app
+from app.metrics import Counter, Histogram
+
+
+def test_counter_text_format():
+    counter = Counter("demo_total", "説明")
+    counter.inc(route="/journal/sales", status=200)
+    counter.inc(2, route="/journal/sales", status=200)
+    counter.inc(route='/a"b')
+    assert counter.render() == [
+        "# HELP demo_total 説明",
+        "# TYPE demo_total counter",
+        'demo_total{route="/a\\"b"} 1',
+        'demo_total{route="/journal/sales",status="200"} 3',
+    ]
+
+
+def test_histogram_text_format():
+    histogram = Histogram("demo_seconds", "説明", (0.1, 1.0))
+    histogram.observe(0.05, route="/r")
+    histogram.observe(0.5, route="/r")
+    histogram.observe(3, route="/r")
+    assert histogram.render() == [
+        "# HELP demo_seconds 説明",
+        "# TYPE demo_seconds histogram",
+        'demo_seconds_bucket{le="0.1",route="/r"} 1',
+        'demo_seconds_bucket{le="1.0",route="/r"} 2',
+        'demo_seconds_bucket{le="+Inf",route="/r"} 3',
+        'demo_seconds_sum{route="/r"} 3.55',
+        'demo_seconds_count{route="/r"} 3',
+    ]
+
+
+def record(level, **fields):
+    record = logging.LogRecord("journal.entries", level, __file__, 1, "entry", None, None)
+    record.fields = fields
+    return record
+
+
+def test_sampling_filter_keeps_warnings():
+    assert not SamplingFilter(0.0).filter(record(logging.INFO))
+    assert SamplingFilter(1.0).filter(record(logging.INFO))
+    assert SamplingFilter(0.0).filter(record(logging.WARNING))
+
+
+def test_json_formatter_includes_fields():
+    payload = json.loads(JsonFormatter().format(record(logging.INFO, route="/journal/sales", amount=1000)))
+    assert payload["msg"] == "entry"
+    assert (payload["level"], payload["logger"]) == ("INFO", "journal.entries")
+    assert (payload["route"], payload["amount"]) == ("/journal/sales", 1000)
+
+
+def metric_lines(client, name):
+    return [line for line in client.get("/metrics").text.splitlines() if line.startswith(name + "{")]
+
+
+def test_metrics_are_labeled_with_the_mounted_path(store):
+    client = TestClient(app)
+    client.post("/journal/sales", json={"type": "sales"})
+    client.post("/journal/batch", json=[{"type": "sales"}])
+    client.get("/journal/accounts/現金預金/lines")
+    client.get("/reports/trial_balance")
+
+    requests = "\n".join(metric_lines(client, "journal_requests_total"))
+    assert 'route="/journal/sales",status="422"' in requests
+    assert 'route="/journal/batch",status="200"' in requests
+    assert 'route="/journal/accounts/{account}/lines",status="200"' in requests
+    assert 'route="/reports/trial_balance",status="200"' in requests
+    assert 'route="/sales"' not in requests
+    durations = "\n".join(metric_lines(client, "journal_request_duration_seconds_count"))
+    assert 'route="/journal/batch"' in durations
+    # 単体ルートの 422 と一括仕訳の明細の検証エラーが同じ表記のラベルに入る
+    failures = "\n".join(metric_lines(client, "journal_validation_failures_total"))
+    assert 'route="/journal/sales"' in failures and 'route="/journal/batch"' in failures
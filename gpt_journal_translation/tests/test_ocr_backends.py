@@ -0,0 +1,50 @@
+import pytest
+
+from app.services.ocr_backends import NO_TEXT, OcrRouter
+
+
+class BrokenTesseract:
+    name = "tesseract"
+
+    def recognize(self, frame):
+        raise RuntimeError("tesseract is not installed or it's not in your PATH")
+
+
+class FakeVision:
+    name = "vision"
+
+    def recognize(self, frame):
+        return f"vision:{frame}", 100.0
+
+    def recognize_many(self, frames):
+        return [self.recognize(frame) for frame in frames]
+
+
+class FakeTesseract(FakeVision):
+    name = "tesseract"
+
+    def recognize(self, frame):
+        return (f"local:{frame}", 95.0) if frame != "blurry" else (NO_TEXT, 0.0)
+
+
+def test_cascade_falls_back_to_vision_when_tesseract_fails():
+    router = OcrRouter("cascade", local=BrokenTesseract(), remote=FakeVision())
+    assert router.extract_text("a") == "vision:a"
+    assert router.extract_texts(["b", "c"]) == ["vision:b", "vision:c"]
+    stats = router.stats()
+    assert stats["tesseract"]["errors"] == 3
+    assert stats["tesseract"]["escalated"] == 3
+    assert stats["vision"]["frames"] == 3
+
+
+def test_tesseract_mode_does_not_fall_back():
+    router = OcrRouter("tesseract", local=BrokenTesseract(), remote=FakeVision())
+    with pytest.raises(RuntimeError):
+        router.extract_text("a")
+    assert router.stats()["tesseract"]["errors"] == 1
+
+
+def test_cascade_escalates_low_confidence_only():
+    router = OcrRouter("cascade", local=FakeTesseract(), remote=FakeVision())
+    assert router.extract_texts(["a", "blurry"]) == ["local:a", "vision:blurry"]
+    assert router.stats()["tesseract"]["errors"] == 0
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from app.services.ocr_cache import OcrResultCache, content_hash
+
+
+def slip(amount_digit: int, noise_seed=None):
+    """同じ様式で金額の1桁だけ違う伝票（金額欄の画素だけが違う）"""
+    frame = np.full((400, 300, 3), 255, np.uint8)
+    frame[40:60, 50:250] = 0                      # 見出し
+    frame[300:330, 200:215] = 0                   # 金額の1桁目
+    frame[300:330, 220:235] = 25 * amount_digit   # 金額の違う桁
+    if noise_seed is not None:
+        rng = np.random.default_rng(noise_seed)
+        frame = np.clip(frame.astype(int) + rng.integers(-3, 4, frame.shape), 0, 255).astype(np.uint8)
+    return frame
+
+
+def test_default_is_exact_match():
+    cache = OcrResultCache()
+    assert cache.match == "exact" and cache.max_distance == 0
+
+
+def test_exact_match_does_not_reuse_other_amount():
+    cache = OcrResultCache()
+    key, cached = cache.lookup(slip(3))
+    assert cached is None
+    cache.store(key, "合計 3,000円")
+
+    assert cache.lookup(slip(8))[1] is None
+    assert cache.lookup(slip(3, noise_seed=0))[1] is None
+    assert cache.lookup(slip(3))[1] == "合計 3,000円"
+    assert cache.stats()["hits"] == 1
+
+
+def test_exact_entries_persist(tmp_path):
+    path = str(tmp_path / "ocr.sqlite3")
+    cache = OcrResultCache(path=path)
+    key, _ = cache.lookup(slip(3))
+    cache.store(key, "合計 3,000円")
+
+    reopened = OcrResultCache(path=path)
+    assert reopened.lookup(slip(3))[1] == "合計 3,000円"
+    # perceptual の行とは混ざらない
+    assert OcrResultCache(path=path, match="perceptual")._entries == {}
+
+
+def test_content_hash_includes_shape():
+    frame = np.zeros((4, 6), np.uint8)
+    assert content_hash(frame) != content_hash(frame.reshape(6, 4))
+
+
+def test_perceptual_is_opt_in():
+    pytest.importorskip("cv2")
+    cache = OcrResultCache(match="perceptual", max_distance=6)
+    key, _ = cache.lookup(slip(3))
+    cache.store(key, "合計 3,000円")
+    assert cache.lookup(slip(3, noise_seed=1))[1] == "合計 3,000円"
+
+
+def test_unknown_match_mode():
+    with pytest.raises(ValueError):
+        OcrResultCache(match="fuzzy")
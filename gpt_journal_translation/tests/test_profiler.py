@@ -0,0 +1,45 @@
+import threading
+import time
+import tracemalloc
+
+from app.services.profiler import PipelineProfiler
+
+
+def test_profiled_captures_from_several_workers(tmp_path):
+    profiler = PipelineProfiler(dump_dir=str(tmp_path))
+    errors, spans = [], []
+
+    def work(n):
+        try:
+            with profiler.capture(f"w{n}"):
+                started = time.perf_counter()
+                with profiler.stage("ocr"):
+                    time.sleep(0.02)
+                spans.append((started, time.perf_counter()))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    # プロファイル中の撮影は重ならない
+    spans.sort()
+    assert all(end <= next_start for (_, end), (next_start, _) in zip(spans, spans[1:]))
+    assert len(list(tmp_path.glob("*.prof"))) == 4
+    assert len(list(tmp_path.glob("*.tracemalloc.txt"))) == 4
+    assert profiler.summary()["end_to_end"]["count"] == 4
+    assert not tracemalloc.is_tracing()
+
+
+def test_capture_without_dump_dir_records_failures():
+    profiler = PipelineProfiler()
+    try:
+        with profiler.capture():
+            raise ValueError("boom")
+    except ValueError:
+        pass
+    assert profiler.summary()["end_to_end"]["errors"] == 1
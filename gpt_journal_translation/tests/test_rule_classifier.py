@@ -0,0 +1,52 @@
+import pytest
+
+from app.services.rule_classifier import classify_by_rules
+from benchmarks.eval_rules import DEFAULT_CORPORA, compare, load_corpus
+
+MIN_CONFIDENCE = 0.9
+
+
+@pytest.mark.parametrize("case", load_corpus(DEFAULT_CORPORA), ids=lambda case: case.get("name"))
+def test_rules_match_gpt_labels_when_confident(case):
+    data, confidence, reasons = classify_by_rules(case["ocr_text"])
+    if data is not None and confidence >= MIN_CONFIDENCE:
+        assert compare(data, case["gpt"]) == []
+    if case.get("name", "").endswith("_fallback"):
+        assert data is None or confidence < MIN_CONFIDENCE, reasons
+
+
+@pytest.mark.parametrize("text, debit, credit", [
+    ("2025年8月10日 D社に商品30,000円を販売し、代金は来月受け取ることとした。", "売掛金", "売上"),
+    ("2025年8月12日 E社から商品40,000円を仕入れ、代金は後で支払う。", "仕入", "買掛金"),
+    ("2025年8月15日 C社から備品120,000円を購入し、代金は月末に支払う。", "備品", "未払金"),
+    ("2025年4月8日 丸山商店に商品を販売し、代金42,000円は普通預金に振り込まれた。", "現金預金", "売上"),
+])
+def test_payment_terms(text, debit, credit):
+    data, confidence, _ = classify_by_rules(text)
+    assert confidence >= MIN_CONFIDENCE
+    assert [(e["debit"], e["credit"]) for e in data["entries"]] == [(debit, credit)]
+
+
+@pytest.mark.parametrize("text", [
+    "2025年8月20日 F商店に商品18,000円を販売した。",                          # 支払方法の記述なし
+    "2025年8月21日 G社から商品50,000円を仕入れ、代金は相殺した。",            # 読み取れない支払条件
+])
+def test_no_cash_default_without_explicit_wording(text):
+    data, confidence, _ = classify_by_rules(text)
+    assert data is None or confidence < MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("method", ["250%定率法", "旧定率法", "旧定額法"])
+def test_unsupported_depreciation_methods_go_to_gpt(method):
+    text = (f"2022年4月1日に取得した機械（取得原価2,000,000円、耐用年数8年、{method}）について、"
+            "2025年3月31日の決算で減価償却を行う。")
+    data, confidence, _ = classify_by_rules(text)
+    assert data is None or confidence < MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("method, expected", [("定率法", "200%定率法"), ("200%定率法", "200%定率法"), ("定額法", "定額法")])
+def test_supported_depreciation_methods(method, expected):
+    text = (f"2022年4月1日に取得した機械（取得原価2,000,000円、耐用年数8年、{method}）について、"
+            "2025年3月31日の決算で減価償却を行う。")
+    data, confidence, _ = classify_by_rules(text)
+    assert confidence >= MIN_CONFIDENCE and data["method"] == expected
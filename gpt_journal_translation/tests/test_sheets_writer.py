@@ -0,0 +1,56 @@
+import pytest
+
+from app.services.sheets_writer import SheetsJournalWriter, updated_range_start_row
+from benchmarks.fakes import FakeSheetsService
+
+
+def transaction(summary, lines=1):
+    return {
+        "date": "2025-04-01",
+        "summary": summary,
+        "debit_entries": [{"account": "消耗品費", "amount": 1000}] * lines,
+        "credit_entries": [{"account": "現金預金", "amount": 1000 * lines}],
+    }
+
+
+def make_writer(service):
+    return SheetsJournalWriter(None, "sheet", sheet_name=service.sheet_name, max_batch=100, flush_interval=0, service=service)
+
+
+def test_updated_range_start_row():
+    assert updated_range_start_row("'仕訳帳'!A15:F22") == 15
+    assert updated_range_start_row("Sheet1!A3") == 3
+    with pytest.raises(ValueError):
+        updated_range_start_row("")
+
+
+def test_flush_appends_after_rows_added_by_others():
+    service = FakeSheetsService()
+    writer = make_writer(service)
+    writer.enqueue(transaction("1件目"))
+    writer.flush()
+    # 他の人が行を追加してから書き込んでも上書きしない
+    service.rows.extend([["2025-04-02", "", "", "", "", "手入力"]] * 3)
+    writer.enqueue(transaction("2件目", lines=2))
+    writer.enqueue(transaction("3件目"))
+    writer.flush()
+
+    assert [row[5] for row in service.rows] == ["1件目", "手入力", "手入力", "手入力", "2件目", "", "3件目"]
+    ranges = [(r["updateBorders"]["range"]["startRowIndex"], r["updateBorders"]["range"]["endRowIndex"]) for r in service.requests]
+    assert ranges == [(0, 1), (4, 6), (6, 7)]
+    assert service.calls["values.append"] == 2
+
+
+def test_failed_append_requeues_and_close_does_not_raise():
+    service = FakeSheetsService()
+
+    def broken(**kwargs):
+        raise RuntimeError("quota")
+    service.append = broken
+    writer = make_writer(service)
+    writer.enqueue(transaction("送れない取引"))
+    with pytest.raises(RuntimeError):
+        writer.flush()
+    assert writer.stats()["queued"] == 1
+    writer.close()
+    assert writer.stats()["queued"] == 1
@@ -0,0 +1,59 @@
+from app.services.transaction_segmenter import is_complete_transaction, split_transactions
+
+
+def test_numbered_questions_are_split_with_context():
+    text = (
+        "次の取引を仕訳しなさい。会計期間は4月1日から3月31日\n"
+        "(1) 丸山商店に商品42,000円を販売し、代金は現金で受け取った。\n"
+        "(2) 大和食品から商品45,000円を仕入れ、代金は掛けとした。\n"
+        "(3) オフィス堂で事務用品5,500円を購入した。"
+    )
+    segments = split_transactions(text)
+    assert len(segments) == 3
+    assert all(segment.startswith("次の取引を仕訳しなさい。") for segment in segments)
+    assert "大和食品" in segments[1] and "(2)" not in segments[1]
+
+
+def test_circled_markers_are_split():
+    text = "①丸山商店に商品42,000円を販売した。\n②大和食品から商品45,000円を仕入れた。"
+    assert len(split_transactions(text)) == 2
+
+
+def test_dated_statement_lines_are_split_and_total_dropped():
+    text = (
+        "5/10 丸山商店に商品を販売 42,000円\n"
+        "5/12 大和食品から商品を仕入 45,000円\n"
+        "合計 87,000円"
+    )
+    segments = split_transactions(text)
+    assert segments == ["5/10 丸山商店に商品を販売 42,000円", "5/12 大和食品から商品を仕入 45,000円"]
+
+
+def test_receipt_with_due_date_is_one_transaction():
+    text = (
+        "請求書\n"
+        "2025/04/01\n"
+        "オフィス堂 事務用品を購入 3,300円\n"
+        "2025/04/30までにお支払いください"
+    )
+    assert split_transactions(text) == [text]
+
+
+def test_depreciation_question_with_numbered_conditions_is_one_transaction():
+    text = (
+        "2024年4月1日に備品500,000円を取得した。2025年3月31日の決算で減価償却を行う。\n"
+        "1. 償却方法は定額法、耐用年数5年\n"
+        "2. 記帳方法は間接法"
+    )
+    assert split_transactions(text) == [text]
+
+
+def test_single_sentence_is_unchanged():
+    text = "2025年4月8日 丸山商店に商品を販売し、代金42,000円は普通預金に振り込まれた。"
+    assert split_transactions(text) == [text]
+
+
+def test_is_complete_transaction():
+    assert is_complete_transaction("大和食品から商品45,000円を仕入れた")
+    assert not is_complete_transaction("償却方法は定額法、耐用年数5年")
+    assert not is_complete_transaction("2025/04/30までにお支払いください")
@@ -0,0 +1,32 @@
+import sys
+
+import pytest
+
+from app.services import vision_ocr
+from benchmarks.fakes import FakeVisionClient, content_key
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    # google.cloud.vision がなくても偽クライアントで動くこと
+    monkeypatch.setitem(sys.modules, "google", None)
+    frames = [np.full((40, 60, 3), n * 40, dtype=np.uint8) for n in range(3)]
+    texts = {content_key(vision_ocr.encode_frame(frame)): f"書類{n}" for n, frame in enumerate(frames[:2])}
+    client = FakeVisionClient(texts)
+    monkeypatch.setattr(vision_ocr, "_client", client)
+    return client, frames
+
+
+def test_batch_ocr_sends_plain_requests(fake_client):
+    client, frames = fake_client
+    assert vision_ocr.extract_texts_from_frames(frames) == ["書類0", "書類1", vision_ocr.NO_TEXT]
+    assert (client.calls, client.images) == (1, 3)
+
+
+def test_single_frame_ocr(fake_client):
+    client, frames = fake_client
+    assert vision_ocr.extract_text(frames[1]) == "書類1"
+    assert client.calls == 1
@@ -0,0 +1,155 @@
+import threading
+import time
+
+import pytest
+
+from app.services.webdriver_pool import WebDriverPool, result_rows_updated
+
+
+class FakeDriver:
+    def __init__(self, number):
+        self.number = number
+        self.healthy = True
+        self.quit_called = False
+
+    def execute_script(self, script, *args):
+        if not self.healthy:
+            raise RuntimeError("driver is not responding")
+        return 1
+
+    def quit(self):
+        self.quit_called = True
+
+
+class FakeFactory:
+    def __init__(self):
+        self.drivers = []
+
+    def __call__(self):
+        driver = FakeDriver(len(self.drivers))
+        self.drivers.append(driver)
+        return driver
+
+
+@pytest.fixture
+def factory():
+    return FakeFactory()
+
+
+def test_reuses_driver_and_replaces_it_after_max_uses(factory):
+    pool = WebDriverPool(size=1, max_uses=2, driver_factory=factory)
+    with pool.driver() as first:
+        pass
+    with pool.driver() as second:
+        assert second is first
+    assert first.quit_called
+    with pool.driver() as third:
+        assert third is not first
+    assert pool.stats()["created"] == 2
+
+
+def test_unhealthy_idle_driver_is_discarded(factory):
+    pool = WebDriverPool(size=1, driver_factory=factory)
+    with pool.driver() as first:
+        pass
+    first.healthy = False
+    with pool.driver() as second:
+        assert second is not first
+    assert first.quit_called
+    assert not second.quit_called
+
+
+def test_driver_is_not_returned_after_exception(factory):
+    pool = WebDriverPool(size=1, driver_factory=factory)
+    with pytest.raises(ValueError):
+        with pool.driver() as broken:
+            raise ValueError("scrape failed")
+    assert broken.quit_called
+    assert pool.stats()["idle"] == 0
+    with pool.driver() as driver:
+        assert driver is not broken
+
+
+def test_size_bounds_concurrent_drivers(factory):
+    pool = WebDriverPool(size=2, driver_factory=factory)
+    active = peak = 0
+    lock = threading.Lock()
+
+    def use():
+        nonlocal active, peak
+        with pool.driver():
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.02)
+            with lock:
+                active -= 1
+
+    threads = [threading.Thread(target=use) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak == 2
+    assert len(factory.drivers) <= 2
+
+
+def test_close_quits_idle_and_in_use_drivers(factory):
+    pool = WebDriverPool(size=2, driver_factory=factory)
+    pool.warm_up()
+    idle = list(factory.drivers)
+    with pool.driver() as in_use:
+        pool.close()
+        assert all(driver.quit_called for driver in idle if driver is not in_use)
+        assert not in_use.quit_called
+    assert in_use.quit_called
+    with pytest.raises(RuntimeError):
+        with pool.driver():
+            pass
+
+
+class FakeRow:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakePage:
+    """ページ遷移せずに同じページ内で結果テーブルを書き換える dep.php の代わり"""
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+
+    def find_elements(self, by, selector):
+        return list(self.rows)
+
+
+def test_result_rows_updated_detects_in_place_updates():
+    pytest.importorskip("selenium")
+    page = FakePage()
+    condition = result_rows_updated(page.find_elements(None, None))
+    assert condition(page) is False
+    page.rows = [FakeRow("2025 100,000 20,000")]
+    assert condition(page) == page.rows
+
+    # 同じ行要素の表示内容だけが変わった場合も更新とみなす
+    row = FakeRow("2025 100,000 20,000")
+    page = FakePage([row])
+    condition = result_rows_updated(page.find_elements(None, None))
+    assert condition(page) is False
+    row.text = "2025 200,000 40,000"
+    assert condition(page) == [row]
+
+
+def test_result_rows_updated_works_with_webdriver_wait():
+    pytest.importorskip("selenium")
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    page = FakePage()
+    condition = result_rows_updated([])
+    timer = threading.Timer(0.05, lambda: setattr(page, "rows", [FakeRow("2025 1 2")]))
+    timer.start()
+    try:
+        rows = WebDriverWait(page, 2, poll_frequency=0.01).until(condition)
+    finally:
+        timer.cancel()
+    assert [row.text for row in rows] == ["2025 1 2"]